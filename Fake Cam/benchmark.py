@@ -0,0 +1,319 @@
+"""Fake Cam pipeline benchmark on synthetic media.
+
+Runs the compositor, format conversion and broadcast sink against generated
+images and videos at several box sizes and rotations. A stand-in camera
+replaces pyvirtualcam, so no display or virtual camera device is needed.
+
+Usage: python benchmark.py [--frames N] [--quick] [--json PATH] [--csv PATH]
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from broadcast import BroadcastSink, FrameExchange, sleep_until
+from compositor import FormatConverter, Layer, LayerCompositor
+from profiles import frame_shape
+from scene import fit_box
+from sources import LoopCache, StillSource, VideoSource
+from timing import StageTimer
+
+OUTPUT_SIZE = (1280, 720)
+BOX_SCALES = (0.25, 0.5, 1.0)
+ROTATIONS = (0, 15, 90)
+FORMATS = ("BGR", "RGB", "I420", "NV12", "YUYV")
+
+
+class FakeCamera:
+    """In-process stand-in for ``pyvirtualcam.Camera``: checks and counts frames."""
+
+    device = "benchmark"
+
+    def __init__(self, width, height, fps, fmt="BGR", **kw):
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.fmt = str(getattr(fmt, "name", fmt))
+        self.expected = int(np.prod(frame_shape(self.fmt, width, height)))
+        self.frames_sent = 0
+        self.send_times = []
+
+    def send(self, frame):
+        if frame.dtype != np.uint8 or frame.size != self.expected:
+            raise ValueError(f"bad frame for {self.fmt}: {frame.dtype} {frame.shape}")
+        self.frames_sent += 1
+        self.send_times.append(time.perf_counter())
+
+    def close(self):
+        pass
+
+
+# --- SYNTHETIC MEDIA ---
+
+def make_image(width, height, seed=0):
+    """Gradient plus noise, including true-black regions."""
+    rng = np.random.default_rng(seed)
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    y = np.linspace(0, 255, height, dtype=np.float32)[:, None]
+    img = np.empty((height, width, 3), dtype=np.uint8)
+    img[:, :, 0] = x
+    img[:, :, 1] = y
+    img[:, :, 2] = (x + y) / 2
+    img = cv2.add(img, rng.integers(0, 32, img.shape, dtype=np.uint8))
+    img[height // 3: height // 2, width // 3: width // 2] = 0
+    return img
+
+
+def make_logo(size=160):
+    """BGRA disc with a soft alpha edge, like a logo PNG."""
+    logo = np.zeros((size, size, 4), dtype=np.uint8)
+    cv2.circle(logo, (size // 2, size // 2), size * 2 // 5, (0, 200, 255, 255), -1)
+    return cv2.GaussianBlur(logo, (15, 15), 0)
+
+
+def make_video(path, width, height, fps=30, seconds=2):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, (width, height))
+    base = make_image(width, height)
+    for i in range(int(fps * seconds)):
+        frame = np.roll(base, i * 8, axis=1)
+        cv2.putText(frame, str(i), (20, 60), cv2.FONT_HERSHEY_SIMPLEX, 2, (255, 255, 255), 3)
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def decode_all(path):
+    cap = cv2.VideoCapture(path)
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+# --- BENCHMARKS ---
+
+class _FrameList:
+    """Steps through pre-decoded frames; a dynamic layer source without a decode thread."""
+
+    fps = 30
+
+    def __init__(self, frames):
+        self.frames = frames
+        self.index = 0
+
+    def latest(self):
+        return self.frames[self.index % len(self.frames)]
+
+
+def bench_compose(name, frames, scale, rotation, n_frames, fmt="BGR"):
+    """Composite + convert + send as fast as possible; returns one result row."""
+    out_w, out_h = OUTPUT_SIZE
+    src_h, src_w = frames[0].shape[:2]
+    box = fit_box(src_w, src_h, out_w, out_h)
+    w, h = box["w"] * scale, box["h"] * scale
+
+    timer = StageTimer(window=n_frames)
+    compositor = LayerCompositor(out_w, out_h)
+    compositor.timer = timer
+    converter = FormatConverter(fmt, out_w, out_h)
+    cam = FakeCamera(out_w, out_h, 30, fmt)
+    # A dynamic layer even for images, so every frame pays the warp
+    source = _FrameList(frames)
+    layers = [Layer(source, box["cx"], box["cy"], w, h, rotation)]
+
+    compositor.compose(layers)  # geometry setup
+    t_start = time.perf_counter()
+    for i in range(n_frames):
+        source.index = i
+        frame = compositor.compose(layers)
+        t0 = time.perf_counter()
+        out = converter.convert(frame)
+        t1 = time.perf_counter()
+        cam.send(out)
+        timer.add("convert", t1 - t0)
+        timer.add("send", time.perf_counter() - t1)
+    elapsed = time.perf_counter() - t_start
+
+    row = {"source": name, "box_scale": scale, "rotation": rotation, "format": fmt,
+           "frames": n_frames, "fps": n_frames / elapsed}
+    for stage, s in timer.summary().items():
+        row[f"{stage}_p50"] = s["p50"]
+        row[f"{stage}_p95"] = s["p95"]
+    return row
+
+
+def bench_layers(name, layer_specs, n_frames, dirty=True):
+    """Multi-layer compose; ``dirty=False`` forces a full recomposite every frame."""
+    out_w, out_h = OUTPUT_SIZE
+    timer = StageTimer(window=n_frames)
+    compositor = LayerCompositor(out_w, out_h)
+    compositor.timer = timer
+    layers = [Layer(source, *box) for source, box in layer_specs]
+    videos = [l.source for l in layers if isinstance(l.source, _FrameList)]
+
+    compositor.compose(layers)
+    t_start = time.perf_counter()
+    for i in range(n_frames):
+        for video in videos:
+            video.index = i
+        if not dirty:
+            compositor.invalidate()
+        compositor.compose(layers)
+    elapsed = time.perf_counter() - t_start
+
+    row = {"scene": name, "mode": "dirty" if dirty else "full", "frames": n_frames, "fps": n_frames / elapsed}
+    for stage, s in timer.summary().items():
+        row[f"{stage}_p50"] = s["p50"]
+    return row
+
+
+def bench_decode(path, n_frames, cache_dir):
+    """Per-frame fetch cost: live decode vs. a baked memory-mapped loop."""
+    cap = cv2.VideoCapture(path)
+    # Bake at half size, as a box smaller than the clip would be
+    w = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)) // 2
+    h = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)) // 2
+    times = []
+    while len(times) < n_frames:
+        t0 = time.perf_counter()
+        ret, _ = cap.read()
+        if not ret:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            continue
+        times.append(time.perf_counter() - t0)
+    cap.release()
+
+    t0 = time.perf_counter()
+    loop = LoopCache(cache_dir).bake(path, w, h)
+    bake_s = time.perf_counter() - t0
+    baked = []
+    for i in range(n_frames):
+        t0 = time.perf_counter()
+        frame = loop.frames[i % len(loop.frames)]
+        frame.sum(dtype=np.uint32)  # touch the pages so the read is real
+        baked.append(time.perf_counter() - t0)
+
+    times.sort()
+    baked.sort()
+    return {"video": os.path.basename(path), "decode_p50": times[len(times) // 2] * 1000,
+            "decode_p95": times[int(len(times) * 0.95)] * 1000, "bake_s": bake_s,
+            "baked_fetch_p50": baked[len(baked) // 2] * 1000}
+
+
+def bench_broadcast(path, seconds, fps=30):
+    """Full threaded path with the real sink clock: decode thread -> compose -> exchange -> sink."""
+    out_w, out_h = OUTPUT_SIZE
+    timer = StageTimer()
+    video = VideoSource(path)
+    video.timer = timer
+    video.start()
+    compositor = LayerCompositor(out_w, out_h)
+    compositor.timer = timer
+    exchange = FrameExchange((out_h, out_w, 3))
+    sink = BroadcastSink(exchange, out_w, out_h, fps=fps, fmt="I420", camera_factory=FakeCamera, timer=timer)
+    sink.start()
+    box = fit_box(video.width, video.height, out_w, out_h)
+    layers = [Layer(video, box["cx"], box["cy"], box["w"], box["h"], 10)]
+
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        frame = compositor.compose(layers)
+        exchange.publish(frame)
+        sleep_until(time.perf_counter() + video.next_frame_delay())
+
+    cam = sink.cam
+    sink.stop()
+    video.stop()
+    gaps = np.diff(cam.send_times) * 1000 if len(cam.send_times) > 1 else np.zeros(1)
+    result = {"video": os.path.basename(path), "seconds": seconds, "fps": fps,
+              "interval_mean_ms": float(gaps.mean()), "interval_std_ms": float(gaps.std())}
+    result.update(sink.stats())
+    result["stages"] = timer.summary()
+    return result
+
+
+def print_table(rows, columns):
+    cells = [[f"{v:.2f}" if isinstance(v, float) else str(v) for v in (row.get(c, "") for c in columns)]
+             for row in rows]
+    widths = [max([len(c)] + [len(r[i]) for r in cells]) for i, c in enumerate(columns)]
+    print("  ".join(c.ljust(w) for c, w in zip(columns, widths)))
+    for r in cells:
+        print("  ".join(v.ljust(w) for v, w in zip(r, widths)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Fake Cam pipeline on synthetic media.")
+    parser.add_argument("--frames", type=int, default=120, help="frames per compositor run")
+    parser.add_argument("--quick", action="store_true", help="fewer sources and frames")
+    parser.add_argument("--json", metavar="PATH", help="write all results as JSON")
+    parser.add_argument("--csv", metavar="PATH", help="write compositor results as CSV")
+    args = parser.parse_args(argv)
+    n_frames = 30 if args.quick else args.frames
+
+    with tempfile.TemporaryDirectory(prefix="fakecam_bench_") as tmp:
+        videos = [make_video(os.path.join(tmp, "clip_720p.avi"), 1280, 720)]
+        if not args.quick:
+            videos.append(make_video(os.path.join(tmp, "clip_1080p.avi"), 1920, 1080))
+
+        sources = [("image_640x480", [make_image(640, 480)]),
+                   ("image_1920x1080", [make_image(1920, 1080)])]
+        sources += [(os.path.basename(v), decode_all(v)) for v in videos]
+
+        print(f"Compositor: {OUTPUT_SIZE[0]}x{OUTPUT_SIZE[1]} output, {n_frames} frames per run")
+        compose_rows = [bench_compose(name, frames, scale, rot, n_frames)
+                        for name, frames in sources for scale in BOX_SCALES for rot in ROTATIONS]
+        print_table(compose_rows, ["source", "box_scale", "rotation", "fps",
+                                   "warp_p50", "warp_p95", "mask_p50", "send_p50"])
+
+        print("\nPixel formats (full-size box, 15 deg):")
+        format_rows = [bench_compose(sources[-1][0], sources[-1][1], 1.0, 15, n_frames, fmt) for fmt in FORMATS]
+        print_table(format_rows, ["format", "fps", "convert_p50", "convert_p95"])
+
+        print("\nLayered scenes (dirty regions vs. full recomposite):")
+        out_w, out_h = OUTPUT_SIZE
+        clip = sources[-1][1]
+        logo = StillSource("logo", make_logo())
+        background = (_FrameList(clip), (out_w / 2, out_h / 2, out_w, out_h))
+        still_bg = (StillSource("bg", make_image(out_w, out_h)), (out_w / 2, out_h / 2, out_w, out_h))
+        inset = (_FrameList(clip), (out_w * 0.75, out_h * 0.7, out_w / 4, out_h / 4, 10))
+        badge = (logo, (out_w - 100, 100, 120, 120, 15))
+        scenes = [("video+logo+inset", [background, badge, inset]),
+                  ("still+logo+inset", [still_bg, badge, inset])]
+        layer_rows = [bench_layers(name, specs, n_frames, dirty) for name, specs in scenes for dirty in (True, False)]
+        print_table(layer_rows, ["scene", "mode", "fps", "fetch_p50", "warp_p50", "mask_p50"])
+
+        print("\nDecode vs. baked loop:")
+        decode_rows = [bench_decode(v, n_frames, os.path.join(tmp, "cache")) for v in videos]
+        print_table(decode_rows, ["video", "decode_p50", "decode_p95", "bake_s", "baked_fetch_p50"])
+
+        print("\nThreaded broadcast path (stand-in camera, 30 fps I420):")
+        broadcast = bench_broadcast(videos[0], 2 if args.quick else 5)
+        print_table([broadcast], ["video", "sent", "dropped", "duplicated", "late",
+                                  "interval_mean_ms", "interval_std_ms"])
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump({"compose": compose_rows, "formats": format_rows, "layers": layer_rows,
+                       "decode": decode_rows, "broadcast": broadcast}, fh, indent=2)
+    if args.csv:
+        rows = compose_rows + format_rows
+        fields = sorted({k for row in rows for k in row})
+        with open(args.csv, "w", newline="", encoding="utf-8") as fh:
+            writer = csv.DictWriter(fh, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+import threading
+import time
+import numpy as np
+from compositor import FormatConverter
+
+
+def sleep_until(deadline):
+    """Sleep until ``perf_counter()`` reaches ``deadline``.
+
+    ``time.sleep`` alone overshoots by a millisecond or more on most
+    platforms, so the last couple of milliseconds are yielded away instead.
+    """
+    while True:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            return
+        time.sleep(remaining - 0.002 if remaining > 0.003 else 0)
+
+
+class FrameExchange:
+    """Double buffer handing the newest composited frame to other threads.
+
+    The writer fills the back buffer and swaps; readers copy the front buffer
+    out under the lock, so a reader never sees a half-written frame.
+    """
+
+    def __init__(self, shape):
+        self.shape = shape
+        self._front = np.zeros(shape, dtype=np.uint8)
+        self._back = np.zeros(shape, dtype=np.uint8)
+        self._lock = threading.Lock()
+        self.seq = 0
+
+    def publish(self, frame):
+        np.copyto(self._back, frame)
+        with self._lock:
+            self._front, self._back = self._back, self._front
+            self.seq += 1
+
+    def read_into(self, out):
+        """Copy the newest frame into ``out`` and return its sequence number."""
+        with self._lock:
+            np.copyto(out, self._front)
+            return self.seq
+
+    def read_with(self, func):
+        """Call ``func(frame)`` on the newest frame under the lock, return its sequence number.
+
+        For readers that transform the frame anyway (resize, colour convert),
+        this saves the intermediate copy. ``func`` must not keep the array.
+        """
+        with self._lock:
+            func(self._front)
+            return self.seq
+
+
+class BroadcastSink:
+    """Feeds the virtual camera from a ``FrameExchange`` on its own frame clock.
+
+    Each tick sends whatever frame is newest. A tick that finds no new frame
+    resends the previous one (counted as duplicated); frames published
+    between two ticks that never got sent are counted as dropped.
+
+    ``fmt`` is a ``PIXEL_FORMATS`` name; frames are converted to it straight
+    out of the exchange. ``camera_factory`` replaces ``pyvirtualcam.Camera``
+    (same keyword arguments, but ``fmt`` is passed as the format name).
+    """
+
+    def __init__(self, exchange, width, height, fps=30, fmt="BGR", camera_factory=None, timer=None):
+        self.exchange = exchange
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.fmt = fmt
+        self.camera_factory = camera_factory
+        self.converter = FormatConverter(fmt, width, height)
+        self.timer = timer
+
+        self.sent = 0
+        self.dropped = 0
+        self.duplicated = 0
+        self.late = 0  # ticks missed because a send overran the frame budget
+
+        self.cam = None
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        """Open the camera (raises on failure) and start the send thread."""
+        if self.camera_factory is not None:
+            self.cam = self.camera_factory(width=self.width, height=self.height, fps=self.fps, fmt=self.fmt)
+        else:
+            import pyvirtualcam
+            self.cam = pyvirtualcam.Camera(width=self.width, height=self.height, fps=self.fps,
+                                           fmt=pyvirtualcam.PixelFormat[self.fmt])
+
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="BroadcastSink", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        if self.cam is not None:
+            self.cam.close()
+            self.cam = None
+
+    def stats(self):
+        return {"sent": self.sent, "dropped": self.dropped,
+                "duplicated": self.duplicated, "late": self.late}
+
+    def _run(self):
+        interval = 1.0 / self.fps
+        frame = self.converter.out
+        last_seq = None
+        next_t = time.perf_counter()
+
+        while self._running:
+            t0 = time.perf_counter()
+            seq = self.exchange.read_with(self.converter.convert)
+            t1 = time.perf_counter()
+            if last_seq is not None:
+                if seq == last_seq:
+                    self.duplicated += 1
+                elif seq > last_seq + 1:
+                    self.dropped += seq - last_seq - 1
+            last_seq = seq
+
+            self.cam.send(frame)
+            self.sent += 1
+            if self.timer is not None:
+                self.timer.add("convert", t1 - t0)
+                self.timer.add("send", time.perf_counter() - t1)
+
+            next_t += interval
+            now = time.perf_counter()
+            if now - next_t > interval:
+                # Fell more than a frame behind: count the missed ticks and
+                # restart the clock rather than bursting to catch up.
+                self.late += int((now - next_t) / interval)
+                next_t = now
+            sleep_until(next_t)
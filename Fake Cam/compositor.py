@@ -0,0 +1,332 @@
+import math
+import time
+import cv2
+import numpy as np
+from profiles import frame_shape
+
+
+class FormatConverter:
+    """Converts composited BGR frames into the camera's native pixel format.
+
+    The result is written into ``self.out``, allocated once, so the virtual
+    camera backend gets frames it does not have to convert itself.
+    """
+
+    _CVT = {"RGB": cv2.COLOR_BGR2RGB, "RGBA": cv2.COLOR_BGR2RGBA, "I420": cv2.COLOR_BGR2YUV_I420}
+
+    def __init__(self, fmt, width, height):
+        if fmt in ("I420", "NV12", "YUYV") and (width % 2 or height % 2):
+            raise ValueError(f"{fmt} needs even frame dimensions, got {width}x{height}")
+        self.fmt = fmt
+        self.width = width
+        self.height = height
+        self.out = np.zeros(frame_shape(fmt, width, height), dtype=np.uint8)
+        # NV12 and YUYV are repacked from planar I420 (OpenCV has no direct BGR -> NV12)
+        self._i420 = np.zeros((height * 3 // 2, width), dtype=np.uint8) if fmt in ("NV12", "YUYV") else None
+        self._yuyv = getattr(cv2, "COLOR_BGR2YUV_YUYV", None) if fmt == "YUYV" else None
+
+    def _planes(self):
+        w, h = self.width, self.height
+        flat = self._i420.reshape(-1)
+        y = self._i420[:h]
+        u = flat[w * h: w * h * 5 // 4].reshape(h // 2, w // 2)
+        v = flat[w * h * 5 // 4:].reshape(h // 2, w // 2)
+        return y, u, v
+
+    def convert(self, frame):
+        fmt, out = self.fmt, self.out
+        if fmt == "BGR":
+            np.copyto(out, frame)
+        elif fmt in self._CVT:
+            cv2.cvtColor(frame, self._CVT[fmt], dst=out)
+        elif fmt == "YUYV" and self._yuyv is not None:
+            cv2.cvtColor(frame, self._yuyv, dst=out.reshape(self.height, self.width, 2))
+        else:
+            cv2.cvtColor(frame, cv2.COLOR_BGR2YUV_I420, dst=self._i420)
+            y, u, v = self._planes()
+            h, w = self.height, self.width
+            if fmt == "NV12":
+                out[:h] = y
+                uv = out[h:].reshape(h // 2, w // 2, 2)
+                uv[:, :, 0] = u
+                uv[:, :, 1] = v
+            else:
+                # YUYV is 4:2:2; each I420 chroma row serves two output rows
+                px = out.reshape(h // 2, 2, w // 2, 4)
+                yy = y.reshape(h // 2, 2, w // 2, 2)
+                px[:, :, :, 0] = yy[:, :, :, 0]
+                px[:, :, :, 2] = yy[:, :, :, 1]
+                px[:, :, :, 1] = u[:, None, :]
+                px[:, :, :, 3] = v[:, None, :]
+        return out
+
+
+def build_matrix(src_w, src_h, cx, cy, w, h, rotation, mirror):
+    """Affine matrix mapping source pixels onto the output frame."""
+    sx = w / src_w
+    sy = h / src_h
+    if mirror: sx = -sx
+
+    rad = math.radians(rotation)
+    cos_a, sin_a = math.cos(rad), math.sin(rad)
+
+    # Pixel centres sit at integer coordinates, so the source centre is
+    # ((w-1)/2, (h-1)/2) and the box centre lands on (cx-0.5, cy-0.5).
+    a, b = cos_a * sx, -sin_a * sy
+    c, d = sin_a * sx, cos_a * sy
+    scx, scy = (src_w - 1) / 2.0, (src_h - 1) / 2.0
+    tx = (cx - 0.5) - (a * scx + b * scy)
+    ty = (cy - 0.5) - (c * scx + d * scy)
+    return np.array([[a, b, tx], [c, d, ty]], dtype=np.float64)
+
+
+class WarpPlan:
+    """Cached geometry for one source placed on the output frame.
+
+    Holds the source -> ROI matrix, the ROI clipped to the frame (``roi`` is
+    None when the box is entirely off-frame) and the coverage mask.
+    """
+
+    def __init__(self, out_w, out_h, src_w, src_h, cx, cy, w, h, rotation, mirror):
+        self.roi = None
+        M = build_matrix(src_w, src_h, cx, cy, w, h, rotation, mirror)
+        corners = np.array([[-0.5, -0.5], [src_w - 0.5, -0.5],
+                            [src_w - 0.5, src_h - 0.5], [-0.5, src_h - 0.5]])
+        pts = corners @ M[:, :2].T + M[:, 2]
+
+        x1 = max(int(math.floor(pts[:, 0].min())), 0)
+        y1 = max(int(math.floor(pts[:, 1].min())), 0)
+        x2 = min(int(math.ceil(pts[:, 0].max())) + 1, out_w)
+        y2 = min(int(math.ceil(pts[:, 1].max())) + 1, out_h)
+        if x2 <= x1 or y2 <= y1:
+            return
+
+        M[0, 2] -= x1
+        M[1, 2] -= y1
+        self.roi = (x1, y1, x2, y2)
+        self.matrix = M
+        self.size = (x2 - x1, y2 - y1)
+
+        # Unrotated boxes on whole pixels that fit the frame are a plain resize
+        # (and flip), which is far cheaper than a general warp
+        self.box = None
+        self.mirror = mirror
+        bx, by = cx - w / 2, cy - h / 2
+        if rotation % 360 == 0 and all(abs(v - round(v)) < 1e-6 for v in (bx, by, w, h)):
+            bx, by, bw, bh = (int(round(v)) for v in (bx, by, w, h))
+            if bx >= 0 and by >= 0 and bx + bw <= out_w and by + bh <= out_h:
+                self.box = (bx - x1, by - y1, bw, bh)
+
+        if self.box is not None:
+            ox, oy, bw, bh = self.box
+            self.mask = np.zeros(self.size[::-1], dtype=np.uint8)
+            self.mask[oy:oy + bh, ox:ox + bw] = 255
+        else:
+            # Coverage comes from warping a solid source with the same matrix, so
+            # it matches the sampled pixels exactly instead of guessing from colour.
+            solid = np.full((src_h, src_w), 255, dtype=np.uint8)
+            self.mask = cv2.warpAffine(solid, M, self.size, flags=cv2.INTER_NEAREST,
+                                       borderMode=cv2.BORDER_CONSTANT, borderValue=0)
+
+    def warp(self, src, dst, border=cv2.BORDER_REPLICATE):
+        if self.box is None:
+            cv2.warpAffine(src, self.matrix, self.size, dst=dst, flags=cv2.INTER_LINEAR,
+                           borderMode=border, borderValue=0)
+            return
+        ox, oy, bw, bh = self.box
+        view = dst[oy:oy + bh, ox:ox + bw]
+        if src.shape[:2] == (bh, bw):
+            np.copyto(view, src)
+        else:
+            cv2.resize(src, (bw, bh), dst=view, interpolation=cv2.INTER_LINEAR)
+        if self.mirror:
+            cv2.flip(view, 1, dst=view)
+
+
+# --- LAYERS ---
+
+class Layer:
+    """One source in a multi-layer scene, with its own box transform.
+
+    ``source`` is any of the sources in sources.py. Sources without a frame
+    rate (stills) are static: they are warped once per geometry change and
+    the cached result is reused. ``baked`` optionally holds a ``BakedLoop``
+    of the source pre-scaled to the box; it is used while its size matches.
+    """
+
+    def __init__(self, source, cx, cy, w, h, rotation=0.0, mirror=False, name=""):
+        self.source = source
+        self.baked = None
+        self.cx, self.cy, self.w, self.h = cx, cy, w, h
+        self.rotation = rotation
+        self.mirror = mirror
+        self.name = name or getattr(source, "path", "")
+
+    @property
+    def is_static(self):
+        return getattr(self.source, "fps", None) is None
+
+    def bake_size(self):
+        return (int(round(self.w)), int(round(self.h)))
+
+    def _active(self):
+        baked = self.baked
+        if baked is not None and (baked.width, baked.height) == self.bake_size():
+            return baked
+        return self.source
+
+    def latest(self):
+        return self._active().latest()
+
+    def next_frame_delay(self):
+        """Seconds until this layer has a new frame; None for static layers."""
+        if self.is_static:
+            return None
+        return self._active().next_frame_delay()
+
+    def stop(self):
+        self.source.stop()
+        baked, self.baked = self.baked, None
+        if baked is not None:
+            baked.stop()
+
+
+def _intersect(a, b):
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    return (x1, y1, x2, y2) if x2 > x1 and y2 > y1 else None
+
+
+def merge_rects(rects):
+    """Union overlapping rectangles so no pixel is recomposited twice."""
+    rects = [r for r in rects if r is not None]
+    merged = True
+    while merged:
+        merged = False
+        out = []
+        for r in rects:
+            for i, o in enumerate(out):
+                if _intersect(r, o) is not None:
+                    out[i] = (min(r[0], o[0]), min(r[1], o[1]), max(r[2], o[2]), max(r[3], o[3]))
+                    merged = True
+                    break
+            else:
+                out.append(r)
+        rects = out
+    return rects
+
+
+class _LayerState:
+    """Warped pixels of one layer over its ROI, plus how to blend them."""
+
+    def __init__(self, layer, key, plan, channels):
+        self.layer = layer  # held so id(layer) can't be reused while cached
+        self.key = key
+        self.plan = plan
+        self.alpha = channels == 4
+        if plan.roi is None:
+            return
+        w, h = plan.size
+        self.patch = np.zeros((h, w, 3), dtype=np.uint8)
+        if self.alpha:
+            self._bgra = np.zeros((h, w, 4), dtype=np.uint8)
+            self.weight = np.zeros((h, w), dtype=np.float32)
+            self.inv_weight = np.zeros((h, w), dtype=np.float32)
+
+    def render(self, src):
+        if self.plan.roi is None:
+            return
+        if not self.alpha:
+            self.plan.warp(src, self.patch)
+            return
+        # Outside the source the alpha is 0, so edges come out antialiased
+        self.plan.warp(src, self._bgra, border=cv2.BORDER_CONSTANT)
+        cv2.cvtColor(self._bgra, cv2.COLOR_BGRA2BGR, dst=self.patch)
+        np.multiply(self._bgra[:, :, 3], 1.0 / 255, out=self.weight, casting="unsafe")
+        np.subtract(1.0, self.weight, out=self.inv_weight)
+
+    def blend(self, frame, rect):
+        part = _intersect(self.plan.roi, rect)
+        if part is None:
+            return
+        x1, y1, x2, y2 = part
+        ox, oy = self.plan.roi[:2]
+        sub = (slice(y1 - oy, y2 - oy), slice(x1 - ox, x2 - ox))
+        dst = frame[y1:y2, x1:x2]
+        if self.alpha:
+            dst[:] = cv2.blendLinear(self.patch[sub], dst, self.weight[sub], self.inv_weight[sub])
+        else:
+            cv2.copyTo(self.patch[sub], self.plan.mask[sub], dst)
+
+
+class LayerCompositor:
+    """Composites a z-ordered list of layers with dirty-region updates.
+
+    Each tick only the regions under layers that changed are rebuilt: moving
+    layers (old and new position), video layers and added/removed layers.
+    Static layers are pre-warped once per geometry change. Layers with an
+    alpha channel (BGRA PNGs) are alpha blended; others use their coverage.
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.frame = np.zeros((height, width, 3), dtype=np.uint8)
+        self._states = {}
+        self._order = None
+        self.timer = None  # optional timing.StageTimer
+
+    def invalidate(self):
+        self._order = None
+
+    def compose(self, layers):
+        """Render ``layers`` (bottom to top) into ``self.frame`` and return it."""
+        t0 = time.perf_counter()
+        frames = [layer.latest() for layer in layers]
+        t1 = time.perf_counter()
+        order = tuple(id(layer) for layer in layers)
+        dirty = []
+        states = {}
+
+        for layer, src in zip(layers, frames):
+            if src is None or layer.w < 1 or layer.h < 1:
+                continue
+            src_h, src_w = src.shape[:2]
+            key = (src_w, src_h, layer.cx, layer.cy, layer.w, layer.h, layer.rotation, layer.mirror)
+
+            state = self._states.get(id(layer))
+            if state is None or state.layer is not layer or state.key != key:
+                if state is not None:
+                    dirty.append(state.plan.roi)
+                plan = WarpPlan(self.width, self.height, *key)
+                state = _LayerState(layer, key, plan, src.shape[2] if src.ndim == 3 else 1)
+                state.render(src)
+                dirty.append(plan.roi)
+            elif not layer.is_static:
+                state.render(src)
+                dirty.append(state.plan.roi)
+            states[id(layer)] = state
+
+        for lid, state in self._states.items():
+            if lid not in states:
+                dirty.append(state.plan.roi)  # layer removed or went empty
+
+        if order != self._order:
+            dirty = [(0, 0, self.width, self.height)]  # z-order changed: rebuild all
+        self._states = states
+        self._order = order
+
+        t2 = time.perf_counter()
+        visible = [states[id(layer)] for layer in layers if id(layer) in states]
+        for rect in merge_rects(dirty):
+            x1, y1, x2, y2 = rect
+            self.frame[y1:y2, x1:x2] = 0
+            for state in visible:
+                if state.plan.roi is not None:
+                    state.blend(self.frame, rect)
+
+        if self.timer is not None:
+            self.timer.add("fetch", t1 - t0)
+            self.timer.add("warp", t2 - t1)
+            self.timer.add("mask", time.perf_counter() - t2)
+        return self.frame
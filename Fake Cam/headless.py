@@ -0,0 +1,219 @@
+"""Headless Fake Cam: feeds the virtual camera from a scene file, no GUI.
+
+Usage: python headless.py scene.json   (or scene.toml)
+
+Only the decode -> composite -> send path runs. Heavy modules are imported
+once the scene has been read, and Tkinter/PIL are never imported. Edits to
+the scene file are picked up while running.
+"""
+import argparse
+import os
+import signal
+import sys
+import time
+
+from scene import fit_box, load_scene
+
+SCENE_POLL_INTERVAL = 0.5  # seconds between scene file mtime checks
+
+
+class HeadlessFakeCam:
+    def __init__(self, scene_path, timer=None):
+        self.scene_path = scene_path
+        self.timer = timer  # optional timing.StageTimer
+        self.scene = None
+        self._scene_mtime = None
+
+        self.sources = {}  # media path -> source, shared by layers using the same file
+        self.baked = {}    # (media path, w, h) -> BakedLoop
+        self.layers = []
+        self.compositor = None
+        self.converter = None
+        self.cam = None
+        self.running = False
+
+    # --- SCENE ---
+
+    def reload_scene(self):
+        """Load the scene if it changed on disk. Returns True when it was (re)applied."""
+        try:
+            mtime = os.stat(self.scene_path).st_mtime_ns
+        except OSError as e:
+            if self.scene is None:
+                raise
+            print(f"Scene file unavailable, keeping current scene: {e}")
+            return False
+        if mtime == self._scene_mtime:
+            return False
+        self._scene_mtime = mtime
+
+        try:
+            self.apply_scene(load_scene(self.scene_path))
+        except (OSError, ValueError, RuntimeError) as e:
+            if self.scene is None:
+                raise
+            print(f"Ignoring invalid scene update: {e}")
+            return False
+        return True
+
+    def apply_scene(self, scene):
+        """Switch to ``scene``. Its sources are opened first; if one fails the
+        current scene (camera, compositor, sources) is left untouched."""
+        from compositor import Layer
+
+        out = scene["output"]
+        sources, opened, baked = {}, [], {}
+        try:
+            for entry in scene["layers"]:
+                media = entry["media"]
+                if media not in sources:
+                    sources[media] = self.sources.get(media)
+                    if sources[media] is None:
+                        sources[media] = self.open_source(media)
+                        opened.append(sources[media])
+
+            layers = []
+            for entry in scene["layers"]:
+                source = sources[entry["media"]]
+                box = entry["box"] or fit_box(source.width, source.height, out["width"], out["height"])
+                layer = Layer(source, box["cx"], box["cy"], box["w"], box["h"],
+                              entry["rotation"], entry["mirror"], name=entry["media"])
+                if scene["bake"] and not layer.is_static:
+                    key = (entry["media"],) + layer.bake_size()
+                    if key not in baked:
+                        baked[key] = self.baked.get(key) or self.bake(entry["media"], *key[1:])
+                    layer.baked = baked[key]
+                layers.append(layer)
+
+            old = self.scene
+            if old is None or out != old["output"]:
+                self.open_camera(out)
+        except Exception:
+            for source in opened:
+                source.stop()
+            for key, loop in baked.items():
+                if loop is not None and loop is not self.baked.get(key):
+                    loop.stop()
+            raise
+
+        for media, source in self.sources.items():
+            if media not in sources:
+                source.stop()
+        for key, loop in self.baked.items():
+            if key not in baked and loop is not None:
+                loop.stop()
+        self.sources, self.baked = sources, baked
+        self.layers = layers
+        self.scene = scene
+
+        for layer in layers:
+            print(f"Layer: {os.path.basename(layer.name)} "
+                  f"box=({layer.cx:.0f}, {layer.cy:.0f}, {layer.w:.0f}x{layer.h:.0f}) "
+                  f"rot={layer.rotation:.0f} mirror={layer.mirror}")
+
+    # --- PIPELINE ---
+
+    def open_camera(self, output):
+        """Open the camera for ``output``; the current one keeps running until the new one is up."""
+        import pyvirtualcam
+        from compositor import FormatConverter, LayerCompositor
+
+        compositor = LayerCompositor(output["width"], output["height"])
+        converter = FormatConverter(output["format"], output["width"], output["height"])
+        cam = pyvirtualcam.Camera(width=output["width"], height=output["height"], fps=output["fps"],
+                                  fmt=pyvirtualcam.PixelFormat[output["format"]])
+        old, self.cam = self.cam, cam
+        self.compositor, self.converter = compositor, converter
+        self.compositor.timer = self.timer
+        if old is not None:
+            old.close()
+        print(f"Virtual camera: {self.cam.device} {output['width']}x{output['height']}"
+              f"@{output['fps']} {output['format']}")
+
+    def open_source(self, media):
+        from sources import open_source
+
+        source = open_source(media)
+        source.timer = self.timer
+        source.start()
+        return source
+
+    def bake(self, media, width, height):
+        from sources import LoopCache
+
+        # Blocking: until the bake is done the previous frame keeps being sent
+        loop = LoopCache().bake(media, width, height)
+        if loop is None:
+            print(f"Bake skipped for {os.path.basename(media)}: clip unreadable or too large for the loop cache")
+        else:
+            loop.start()
+        return loop
+
+    def run(self):
+        self.reload_scene()
+        self.running = True
+        next_poll = time.perf_counter() + SCENE_POLL_INTERVAL
+
+        from broadcast import sleep_until
+
+        next_t = time.perf_counter()
+        try:
+            while self.running:
+                now = time.perf_counter()
+                if now >= next_poll:
+                    self.reload_scene()
+                    next_poll = now + SCENE_POLL_INTERVAL
+
+                frame = self.compositor.compose(self.layers)
+                t0 = time.perf_counter()
+                out = self.converter.convert(frame)
+                t1 = time.perf_counter()
+                self.cam.send(out)
+                if self.timer is not None:
+                    self.timer.add("convert", t1 - t0)
+                    self.timer.add("send", time.perf_counter() - t1)
+
+                next_t += 1.0 / self.scene["output"]["fps"]
+                if time.perf_counter() > next_t + 0.1:
+                    next_t = time.perf_counter()  # stalled (e.g. a re-bake); don't burst
+                sleep_until(next_t)
+        finally:
+            for source in self.sources.values():
+                source.stop()
+            if self.cam is not None:
+                self.cam.close()
+
+    def stop(self, *_):
+        self.running = False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Feed the Fake Cam virtual camera from a scene file.")
+    parser.add_argument("scene", help="scene file (.json or .toml)")
+    parser.add_argument("--stats", metavar="PATH", help="write per-stage timings on exit (.json or .csv)")
+    args = parser.parse_args(argv)
+
+    timer = None
+    if args.stats:
+        from timing import StageTimer
+        timer = StageTimer()
+
+    app = HeadlessFakeCam(args.scene, timer=timer)
+    signal.signal(signal.SIGINT, app.stop)
+    signal.signal(signal.SIGTERM, app.stop)
+    try:
+        app.run()
+    except (OSError, ValueError, RuntimeError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if timer is not None:
+            if args.stats.lower().endswith(".csv"):
+                timer.export_csv(args.stats)
+            else:
+                timer.export_json(args.stats)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
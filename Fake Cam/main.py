@@ -1,13 +1,19 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 import cv2
-import pyvirtualcam
-from pyvirtualcam import PixelFormat
 import os
 import ctypes
 import numpy as np
 import math
+import threading
+import time
 from PIL import Image, ImageTk 
+from broadcast import BroadcastSink, FrameExchange, sleep_until
+from compositor import Layer, LayerCompositor
+from profiles import FRAME_RATES, PIXEL_FORMATS, RESOLUTIONS
+from scene import save_scene
+from sources import IMAGE_EXTENSIONS, LoopCache, open_source
+from timing import StageTimer
 
 # Make the app DPI aware on Windows
 try:
@@ -15,32 +21,70 @@ try:
 except Exception:
     pass
 
+class PreviewRenderer:
+    """Draws the latest rendered frame onto the canvas, allocation free.
+
+    One RGBA buffer backs a PIL image (shared memory, no copy) which is pasted
+    into a single reused PhotoImage. The preview can be smaller than the
+    broadcast frame; it is downscaled straight out of the exchange.
+    """
+
+    def __init__(self, canvas, item, out_w, out_h, scale=1.0):
+        self.scale = scale
+        self.size = (max(1, round(out_w * scale)), max(1, round(out_h * scale)))
+        pw, ph = self.size
+
+        self.small = np.zeros((ph, pw, 3), dtype=np.uint8) if scale != 1.0 else None
+        self.rgba = np.zeros((ph, pw, 4), dtype=np.uint8)
+        self.image = Image.frombuffer("RGBA", self.size, self.rgba, "raw", "RGBA", 0, 1)
+        self.photo = ImageTk.PhotoImage("RGBA", self.size)
+        self.seq = None
+
+        canvas.itemconfig(item, image=self.photo)
+
+    def _convert(self, frame):
+        if self.small is not None:
+            cv2.resize(frame, self.size, dst=self.small, interpolation=cv2.INTER_AREA)
+            frame = self.small
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGBA, dst=self.rgba)
+
+    def draw(self, exchange):
+        """Show the newest frame; returns False if nothing new was rendered."""
+        if exchange.seq == self.seq:
+            return False
+        self.seq = exchange.read_with(self._convert)
+        self.photo.paste(self.image)
+        return True
+
+
 class FakeCamApp:
-    # Set fixed 16:9 Landscape dimensions for the virtual camera output
-    FIXED_WIDTH = 1280
-    FIXED_HEIGHT = 720
+    # Default output profile for the virtual camera (selectable in the toolbar)
+    DEFAULT_RESOLUTION = "1280x720"
+    OUTPUT_FPS = 30
+    PIXEL_FORMAT = "BGR"
+    # Broadcast and preview run on independent clocks
+    PREVIEW_FPS = 15
+    PREVIEW_SCALES = {"Preview 100%": 1.0, "Preview 75%": 0.75, "Preview 50%": 0.5}
 
     def __init__(self, root):
         self.root = root
         self.root.title("Fake Cam")
         self.root.configure(bg="#2c2c2c")
         
-        # Use fixed dimensions
-        self.width = self.FIXED_WIDTH
-        self.height = self.FIXED_HEIGHT
-        
-        self.file_path = None
-        self.source_image = None
-        self.cap = None
-        
-        # State: [center_x, center_y, width, height] - Initialized to full frame
-        self.box_cx = self.width / 2
-        self.box_cy = self.height / 2
-        self.box_w = 0 # Will be set on upload to fit the new frame
-        self.box_h = 0
+        # Active output profile
+        self.width, self.height = RESOLUTIONS[self.DEFAULT_RESOLUTION]
+        self.fps = self.OUTPUT_FPS
+        self.pixel_format = self.PIXEL_FORMAT
         
-        self.rotation = 0.0 
-        self.mirror = False
+        # Scene layers, bottom to top. The list is replaced, never mutated, so
+        # the render thread can iterate its own snapshot.
+        self.layers = []
+        self.selected = None  # layer the handles act on (box_* properties below)
+
+        # Bake mode: videos decoded once, pre-scaled to their box, played from a mapped file
+        self.bake_enabled = False
+        self.loop_cache = None
+        self._bakes = {}  # layer -> (size, cancel event) of its pending or finished bake
         
         # Configuration
         self.SNAP_EDGE_DIST = 25   
@@ -52,11 +96,50 @@ class FakeCamApp:
         self.start_state = {} 
         
         self.is_broadcasting = False
-        self.cam = None
+        self.sink = None
+
+        # Per-stage frame timings (decode, fetch, warp, mask, convert, send, preview)
+        self.timer = StageTimer()
+        self.show_stats = False
+        self._stats_tick = 0
+
+        # Render thread -> exchange -> (broadcast sink, Tk preview)
+        self.build_pipeline()
+
+        # Canvas preview; box state stays in output pixels and is mapped by preview_scale
+        self.preview_scale = 1.0
+        self.preview = None
+        self._overlay_key = None
+
+        self.rendering = True
+        self.render_thread = threading.Thread(target=self.render_loop, name="Render", daemon=True)
 
         self.create_ui()
+        self.set_preview_scale(self.preview_scale)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.render_thread.start()
         self.update_loop()
 
+    # --- SELECTED LAYER ---
+    # The interaction code works on box_cx/box_cy/box_w/box_h/rotation/mirror;
+    # they read and write the selected layer.
+
+    def _layer_attr(name):
+        def getter(self):
+            return getattr(self.selected, name) if self.selected else 0
+        def setter(self, value):
+            if self.selected:
+                setattr(self.selected, name, value)
+        return property(getter, setter)
+
+    box_cx = _layer_attr("cx")
+    box_cy = _layer_attr("cy")
+    box_w = _layer_attr("w")
+    box_h = _layer_attr("h")
+    rotation = _layer_attr("rotation")
+    mirror = _layer_attr("mirror")
+    del _layer_attr
+
     def create_ui(self):
         style = ttk.Style()
         style.theme_use('clam') 
@@ -65,19 +148,52 @@ class FakeCamApp:
         style.map('TButton', background=[('active', '#6a6a6a')])
         style.configure('Broadcast.TButton', background='#cc3333', foreground='white', font=('Arial', 10, 'bold'))
         style.map('Broadcast.TButton', background=[('active', '#e64d4d')])
+        style.configure('Stats.TLabel', background='#3a3a3a', foreground='#aaaaaa', font=('Arial', 9))
         
         toolbar = ttk.Frame(self.root, style='TFrame')
         toolbar.pack(side=tk.TOP, fill=tk.X, padx=0, pady=0)
         
-        ttk.Button(toolbar, text="📂 Upload Media", command=self.upload_file).pack(side=tk.LEFT, padx=10, pady=8)
+        ttk.Button(toolbar, text="📂 Add Layer", command=self.upload_file).pack(side=tk.LEFT, padx=10, pady=8)
+        ttk.Button(toolbar, text="✖ Remove", command=self.remove_layer).pack(side=tk.LEFT, padx=5, pady=8)
+        ttk.Button(toolbar, text="▲", width=3, command=lambda: self.move_layer(1)).pack(side=tk.LEFT, padx=2, pady=8)
+        ttk.Button(toolbar, text="▼", width=3, command=lambda: self.move_layer(-1)).pack(side=tk.LEFT, padx=2, pady=8)
         
         self.mirror_btn = ttk.Button(toolbar, text="↔ Mirror: OFF", command=self.toggle_mirror)
         self.mirror_btn.pack(side=tk.LEFT, padx=5, pady=8)
+
+        self.bake_btn = ttk.Button(toolbar, text="🔥 Bake Loop: OFF", command=self.toggle_bake)
+        self.bake_btn.pack(side=tk.LEFT, padx=5, pady=8)
+
+        ttk.Button(toolbar, text="💾 Export Scene", command=self.export_scene).pack(side=tk.LEFT, padx=5, pady=8)
+
+        self.stats_btn = ttk.Button(toolbar, text="📊 Stats: OFF", command=self.toggle_stats)
+        self.stats_btn.pack(side=tk.LEFT, padx=5, pady=8)
+        ttk.Button(toolbar, text="Export Stats", command=self.export_stats).pack(side=tk.LEFT, padx=5, pady=8)
+
+        # Output profile: resolution, frame rate and the pixel format sent to the camera
+        self.res_choice = ttk.Combobox(toolbar, values=list(RESOLUTIONS), state="readonly", width=10)
+        self.res_choice.set(self.DEFAULT_RESOLUTION)
+        self.fps_choice = ttk.Combobox(toolbar, values=[str(f) for f in FRAME_RATES], state="readonly", width=4)
+        self.fps_choice.set(str(self.fps))
+        self.fmt_choice = ttk.Combobox(toolbar, values=list(PIXEL_FORMATS), state="readonly", width=6)
+        self.fmt_choice.set(self.pixel_format)
+        for choice in (self.res_choice, self.fps_choice, self.fmt_choice):
+            choice.bind("<<ComboboxSelected>>", lambda e: self.apply_profile())
+            choice.pack(side=tk.LEFT, padx=3, pady=8)
         
         self.broadcast_btn = ttk.Button(toolbar, text="📡 Start Broadcast", command=self.toggle_broadcast, 
                                        style='Broadcast.TButton')
         self.broadcast_btn.pack(side=tk.RIGHT, padx=10, pady=8)
 
+        self.stats_label = ttk.Label(toolbar, text="", style='Stats.TLabel')
+        self.stats_label.pack(side=tk.RIGHT, padx=5, pady=8)
+
+        self.preview_choice = ttk.Combobox(toolbar, values=list(self.PREVIEW_SCALES), state="readonly", width=13)
+        self.preview_choice.current(0)
+        self.preview_choice.bind("<<ComboboxSelected>>",
+                                 lambda e: self.set_preview_scale(self.PREVIEW_SCALES[self.preview_choice.get()]))
+        self.preview_choice.pack(side=tk.RIGHT, padx=5, pady=8)
+
         self.canvas_frame = tk.Frame(self.root, bg="#1a1a1a")
         self.canvas_frame.pack(expand=True, fill=tk.BOTH, padx=10, pady=10)
         
@@ -100,6 +216,9 @@ class FakeCamApp:
                 shp = self.canvas.create_rectangle(0,0,0,0, fill=color, outline="#2c2c2c")
             self.ui_items[h] = shp
 
+        self.stats_text = self.canvas.create_text(10, 10, anchor=tk.NW, text="", fill="#00ff88",
+                                                  font=("Courier", 10), state=tk.HIDDEN)
+
         self.canvas.bind("<ButtonPress-1>", self.on_mouse_down)
         self.canvas.bind("<B1-Motion>", self.on_mouse_drag)
         self.canvas.bind("<ButtonRelease-1>", self.on_mouse_up)
@@ -137,7 +256,8 @@ class FakeCamApp:
     # --- INPUT LOGIC (Unchanged) ---
 
     def hit_test(self, mx, my):
-        HANDLE_TOLERANCE = 15 
+        if self.selected is None: return None
+        HANDLE_TOLERANCE = 15 / self.preview_scale  # constant size on screen
         
         rot_x, rot_y = self.get_handle_pos('rot', self.box_cx, self.box_cy, self.box_w, self.box_h, self.rotation)
         if math.hypot(mx - rot_x, my - rot_y) < HANDLE_TOLERANCE: return 'rot'
@@ -162,9 +282,32 @@ class FakeCamApp:
             
         return None
 
+    def to_output(self, event):
+        # Canvas pixels -> output frame pixels
+        return event.x / self.preview_scale, event.y / self.preview_scale
+
+    def layer_at(self, mx, my):
+        # Topmost layer whose (rotated) box contains the point
+        for layer in reversed(self.layers):
+            rmx, rmy = self.rotate_point(mx, my, layer.cx, layer.cy, -layer.rotation)
+            if abs(rmx - layer.cx) < layer.w / 2 and abs(rmy - layer.cy) < layer.h / 2:
+                return layer
+        return None
+
+    def select_layer(self, layer):
+        self.selected = layer
+        self.mirror_btn.config(text=f"↔ Mirror: {'ON' if self.mirror else 'OFF'}")
+
     def on_mouse_down(self, event):
-        self.active_handle = self.hit_test(event.x, event.y)
-        self.drag_start_pos = (event.x, event.y)
+        mx, my = self.to_output(event)
+        self.active_handle = self.hit_test(mx, my)
+        if self.active_handle in (None, 'move'):
+            # Clicking elsewhere picks whichever layer is on top there
+            layer = self.layer_at(mx, my)
+            if layer is not None and layer is not self.selected:
+                self.select_layer(layer)
+                self.active_handle = 'move'
+        self.drag_start_pos = (mx, my)
         self.start_state = {
             "cx": self.box_cx, "cy": self.box_cy,
             "w": self.box_w, "h": self.box_h,
@@ -175,7 +318,7 @@ class FakeCamApp:
         if not self.active_handle: return
 
         st = self.start_state
-        mx, my = event.x, event.y
+        mx, my = self.to_output(event)
         
         # --- ROTATION LOGIC (Unchanged) ---
         if self.active_handle == 'rot':
@@ -267,9 +410,14 @@ class FakeCamApp:
 
     def on_mouse_up(self, event):
         self.active_handle = None
+        # A resize invalidates the baked frames; re-bake once the drag is over
+        layer = self.selected
+        if self.bake_enabled and layer and not layer.is_static and \
+                self._bakes.get(layer, (None,))[0] != layer.bake_size():
+            self.start_bake(layer)
 
     def update_cursor(self, event):
-        hit = self.hit_test(event.x, event.y)
+        hit = self.hit_test(*self.to_output(event))
         if hit == 'move': self.canvas.config(cursor="fleur")
         elif hit == 'rot': self.canvas.config(cursor="exchange")
         elif hit:
@@ -283,72 +431,123 @@ class FakeCamApp:
         else:
             self.canvas.config(cursor="arrow")
 
-    # --- PROCESSING: UPDATED UPLOAD LOGIC ---
+    # --- LAYERS ---
 
     def upload_file(self):
         path = filedialog.askopenfilename(filetypes=[("Media", "*.png;*.jpg;*.jpeg;*.mp4;*.avi;*.mov")])
-        if path:
-            self.file_path = path
-            
-            if self.is_broadcasting:
-                 self.toggle_broadcast() 
-
-            if self.cap: self.cap.release()
-            self.cap = None
-            self.source_image = None
-            
-            if self.file_path.lower().endswith(('.png', '.jpg', '.jpeg')):
-                self.source_image = cv2.imread(self.file_path)
-            else:
-                self.cap = cv2.VideoCapture(self.file_path)
-                if self.cap.isOpened():
-                    ret, _ = self.cap.read()
-                    if ret:
-                        self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-                    else:
-                        messagebox.showerror("Error", "Could not read video stream.")
-                        self.cap = None
-            
-            self.rotation = 0
-            self.mirror = False
-            self.mirror_btn.config(text="↔ Mirror: OFF")
-            
-            # 1. Get Source Dimensions
-            source_w, source_h = 0, 0
-            if self.source_image is not None: 
-                source_h, source_w = self.source_image.shape[:2]
-            elif self.cap is not None and self.cap.isOpened():
-                source_w = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
-                source_h = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
-            
-            # 2. Set Canvas/Camera to FIXED Landscape (16:9) Dimensions
-            self.width = self.FIXED_WIDTH
-            self.height = self.FIXED_HEIGHT
-
-            # 3. Fit Source Media Box within the FIXED 16:9 Frame
-            if source_w > 0:
-                
-                # Calculate the scale factor to fit the source within the fixed frame
-                scale_w = self.width / source_w
-                scale_h = self.height / source_h
-                scale = min(scale_w, scale_h) # Use the smaller scale factor to ensure it fits entirely (pillarbox/letterbox)
-
-                self.box_w = source_w * scale
-                self.box_h = source_h * scale
-
-                self.canvas.config(width=self.width, height=self.height)
-                self.canvas_frame.config(width=self.width, height=self.height)
-                # Adjust root window size (toolbar + canvas + padding)
-                self.root.geometry(f"{self.width + 20}x{self.height + 70}") 
-
-                # Center the box
-                self.box_cx = self.width / 2
-                self.box_cy = self.height / 2
+        if not path:
+            return
+        try:
+            source = open_source(path)
+        except IOError as e:
+            kind = "image" if path.lower().endswith(IMAGE_EXTENSIONS) else "video stream"
+            messagebox.showerror("Error", f"Could not read {kind}.\n{e}")
+            return
+        source.timer = self.timer
+        source.start()
+
+        # Fit the new layer within the active output profile's frame (pillarbox/letterbox)
+        scale = min(self.width / source.width, self.height / source.height)
+        layer = Layer(source, self.width / 2, self.height / 2, source.width * scale, source.height * scale,
+                      name=path)
+        self.layers = self.layers + [layer]
+        self.select_layer(layer)
+        self.start_bake(layer)
+
+    def remove_layer(self):
+        layer = self.selected
+        if layer is None:
+            return
+        self.cancel_bake(layer)
+        self.layers = [l for l in self.layers if l is not layer]
+        layer.stop()
+        self.select_layer(self.layers[-1] if self.layers else None)
+
+    def move_layer(self, step):
+        # Raise (+1) or lower (-1) the selected layer in the z-order
+        if self.selected is None:
+            return
+        layers = list(self.layers)
+        i = layers.index(self.selected)
+        j = min(max(i + step, 0), len(layers) - 1)
+        layers.insert(j, layers.pop(i))
+        self.layers = layers
 
     def toggle_mirror(self):
+        if self.selected is None:
+            return
         self.mirror = not self.mirror
         self.mirror_btn.config(text=f"↔ Mirror: {'ON' if self.mirror else 'OFF'}")
 
+    # --- BAKE MODE ---
+
+    def toggle_bake(self):
+        self.bake_enabled = not self.bake_enabled
+        self.bake_btn.config(text=f"🔥 Bake Loop: {'ON' if self.bake_enabled else 'OFF'}")
+        for layer in self.layers:
+            if self.bake_enabled:
+                self.start_bake(layer)
+            else:
+                self.cancel_bake(layer)
+
+    def cancel_bake(self, layer):
+        job = self._bakes.pop(layer, None)
+        if job is not None:
+            job[1].set()
+        # Detach first so the render thread picks the live source from its next frame on
+        baked, layer.baked = layer.baked, None
+        if baked is not None:
+            baked.stop()
+
+    def start_bake(self, layer):
+        # Live decoding keeps playing until the bake is ready
+        if not self.bake_enabled or layer.is_static:
+            return
+        w, h = layer.bake_size()
+        if w < 1 or h < 1:
+            return
+        self.cancel_bake(layer)
+        if self.loop_cache is None:
+            self.loop_cache = LoopCache()
+
+        cancel = threading.Event()
+        self._bakes[layer] = ((w, h), cancel)
+        path = layer.source.path
+
+        def work():
+            loop = self.loop_cache.bake(path, w, h, cancel=cancel)
+            if loop is not None and not cancel.is_set():
+                loop.start()
+                layer.baked = loop
+
+        threading.Thread(target=work, name="LoopBake", daemon=True).start()
+
+    # --- SCENE EXPORT ---
+
+    def get_scene(self):
+        # Same format headless.py reads
+        return {
+            "layers": [{"media": os.path.abspath(layer.source.path),
+                        "box": {"cx": layer.cx, "cy": layer.cy, "w": layer.w, "h": layer.h},
+                        "rotation": layer.rotation,
+                        "mirror": layer.mirror} for layer in self.layers],
+            "bake": self.bake_enabled,
+            "output": {"width": self.width, "height": self.height, "fps": self.fps,
+                       "format": self.pixel_format},
+        }
+
+    def export_scene(self):
+        if not self.layers:
+            messagebox.showerror("Error", "Add a layer before exporting a scene.")
+            return
+        path = filedialog.asksaveasfilename(defaultextension=".json",
+                                            filetypes=[("JSON scene", "*.json"), ("TOML scene", "*.toml")])
+        if path:
+            try:
+                save_scene(path, self.get_scene())
+            except OSError as e:
+                messagebox.showerror("Error", f"Could not write scene: {e}")
+
     def toggle_broadcast(self):
         if not self.is_broadcasting:
             if self.width <= 0 or self.height <= 0:
@@ -356,103 +555,181 @@ class FakeCamApp:
                 return
 
             try:
-                # Use the fixed width/height for the virtual cam
-                self.cam = pyvirtualcam.Camera(width=self.width, height=self.height, fps=30, fmt=PixelFormat.BGR)
+                # The sink sends on its own thread and clock, reading the latest rendered frame
+                self.sink = BroadcastSink(self.exchange, self.width, self.height,
+                                          fps=self.fps, fmt=self.pixel_format, timer=self.timer)
+                self.sink.start()
                 self.is_broadcasting = True
                 self.broadcast_btn.config(text="⏹ Stop Broadcast", style='Broadcast.TButton')
             except Exception as e:
+                self.sink = None
                 messagebox.showerror("Error", f"Failed to start virtual camera: {e}")
         else:
             self.is_broadcasting = False
-            if self.cam: self.cam.close(); self.cam = None
+            if self.sink: self.sink.stop(); self.sink = None
             self.broadcast_btn.config(text="📡 Start Broadcast", style='Broadcast.TButton')
+            self.stats_label.config(text="")
+
+    def on_close(self):
+        self.rendering = False
+        if self.is_broadcasting:
+            self.toggle_broadcast()
+        for layer in self.layers:
+            self.cancel_bake(layer)
+            layer.stop()
+        self.root.destroy()
+
+    def source_delay(self):
+        # Follow the fastest clip's native frame rate; stills render at the output rate
+        delays = [d for d in (layer.next_frame_delay() for layer in self.layers) if d is not None]
+        return min(delays) if delays else 1.0 / self.fps
+
+    def build_pipeline(self):
+        # Swapped as one tuple so the render thread never pairs a compositor
+        # with an exchange of a different size
+        self.compositor = LayerCompositor(self.width, self.height)
+        self.compositor.timer = self.timer
+        self.exchange = FrameExchange((self.height, self.width, 3))
+        self.pipeline = (self.compositor, self.exchange)
+
+    def apply_profile(self):
+        width, height = RESOLUTIONS[self.res_choice.get()]
+        fps, fmt = int(self.fps_choice.get()), self.fmt_choice.get()
+
+        was_broadcasting = self.is_broadcasting
+        if was_broadcasting:
+            self.toggle_broadcast()
+
+        if (width, height) != (self.width, self.height):
+            # Keep the box in the same place relative to the new frame
+            sx, sy = width / self.width, height / self.height
+            for layer in self.layers:
+                layer.cx *= sx
+                layer.cy *= sy
+                layer.w *= min(sx, sy)
+                layer.h *= min(sx, sy)
+            self.width, self.height = width, height
+            self.build_pipeline()
+            self.set_preview_scale(self.preview_scale)
+            for layer in self.layers:
+                self.start_bake(layer)
+
+        self.fps = fps
+        self.pixel_format = fmt
+        if was_broadcasting:
+            self.toggle_broadcast()
+
+    def render_loop(self):
+        last_error = None
+        while self.rendering:
+            delay = 1.0 / self.fps
+            try:
+                compositor, exchange = self.pipeline
+                # Only regions under changed or playing layers are recomposited
+                final = compositor.compose(self.layers)
+                exchange.publish(final)
+                delay = self.source_delay()
+                last_error = None
+            except Exception as e:
+                # Keep rendering: a layer changed under us recovers on the next tick
+                error = f"{type(e).__name__}: {e}"
+                if error != last_error:
+                    print(f"Render error: {error}")
+                last_error = error
+            sleep_until(time.perf_counter() + delay)
+
+    # --- PREVIEW ---
+
+    def resize_canvas(self):
+        pw, ph = self.preview.size
+        self.canvas.config(width=pw, height=ph)
+        self.canvas_frame.config(width=pw, height=ph)
+        # Adjust root window size (toolbar + canvas + padding)
+        self.root.geometry(f"{pw + 20}x{ph + 70}")
+
+    def set_preview_scale(self, scale):
+        self.preview_scale = scale
+        self.preview = PreviewRenderer(self.canvas, self.vid_container, self.width, self.height, scale)
+        self._overlay_key = None
+        self.resize_canvas()
+
+    def update_overlay(self):
+        # Handles belong to the selected layer only
+        key = (self.selected, self.box_cx, self.box_cy, self.box_w, self.box_h, self.rotation, self.preview_scale)
+        if key == self._overlay_key:
+            return
+        self._overlay_key = key
 
-    def get_source_frame(self):
-        frame = None
-        if self.cap:
-            if self.cap.isOpened():
-                ret, frame = self.cap.read()
-                if not ret:
-                    self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
-                    ret, frame = self.cap.read()
-        elif self.source_image is not None:
-            frame = self.source_image.copy()
-        return frame
-
-    def update_loop(self):
-        # The final frame is always the FIXED_WIDTH x FIXED_HEIGHT size, and starts black
-        final = np.zeros((self.height, self.width, 3), dtype=np.uint8)
-        src = self.get_source_frame()
-        
-        if src is not None:
-            if self.mirror: src = cv2.flip(src, 1)
-            
-            bw, bh = int(self.box_w), int(self.box_h)
-            if bw > 0 and bh > 0:
-                src_scaled = cv2.resize(src, (bw, bh))
-                diag = int(math.hypot(bw, bh))
-                
-                # ... (Rest of image processing logic is unchanged) ...
-                
-                padded = cv2.copyMakeBorder(src_scaled, 
-                                          (diag-bh)//2, (diag-bh)//2, 
-                                          (diag-bw)//2, (diag-bw)//2, 
-                                          cv2.BORDER_CONSTANT, value=(0,0,0))
-                
-                M = cv2.getRotationMatrix2D((diag//2, diag//2), -self.rotation, 1.0)
-                rotated = cv2.warpAffine(padded, M, (diag, diag))
-                
-                tx = int(self.box_cx - diag//2)
-                ty = int(self.box_cy - diag//2)
-                h_rot, w_rot = rotated.shape[:2]
-                
-                x1, y1 = max(tx, 0), max(ty, 0)
-                x2, y2 = min(tx + w_rot, self.width), min(ty + h_rot, self.height)
-                
-                ox1, oy1 = max(0, -tx), max(0, -ty)
-                ox2, oy2 = ox1 + (x2 - x1), oy1 + (y2 - y1)
-                
-                if x2 > x1 and y2 > y1:
-                    roi = final[y1:y2, x1:x2]
-                    fg = rotated[oy1:oy2, ox1:ox2]
-                    gray = cv2.cvtColor(fg, cv2.COLOR_BGR2GRAY)
-                    _, mask = cv2.threshold(gray, 1, 255, cv2.THRESH_BINARY)
-                    roi_bg = cv2.bitwise_and(roi, roi, mask=cv2.bitwise_not(mask))
-                    fg_fg = cv2.bitwise_and(fg, fg, mask=mask)
-                    final[y1:y2, x1:x2] = cv2.add(roi_bg, fg_fg)
-
-        cv2image = cv2.cvtColor(final, cv2.COLOR_BGR2RGB)
-        img = Image.fromarray(cv2image)
-        imgtk = ImageTk.PhotoImage(image=img)
-        self.canvas.itemconfig(self.vid_container, image=imgtk)
-        self.canvas.image = imgtk
-
-        if src is not None:
-            for item in self.ui_items.values():
-                self.canvas.tag_raise(item)
-
-            corners = self.get_corners(self.box_cx, self.box_cy, self.box_w, self.box_h, self.rotation)
-            flat_corners = [c for pt in corners for c in pt]
-            self.canvas.coords(self.ui_items['outline'], *flat_corners)
-            
-            rx, ry = self.get_handle_pos('rot', self.box_cx, self.box_cy, self.box_w, self.box_h, self.rotation)
-            top_mid = self.get_handle_pos('n', self.box_cx, self.box_cy, self.box_w, self.box_h, self.rotation)
-            self.canvas.coords(self.ui_items['rot_line'], top_mid[0], top_mid[1], rx, ry)
-            
-            HANDLE_SIZE = 8 
-            for h_name in ['nw', 'n', 'ne', 'e', 'se', 's', 'sw', 'w', 'rot']:
-                hx, hy = self.get_handle_pos(h_name, self.box_cx, self.box_cy, self.box_w, self.box_h, self.rotation)
-                sz = HANDLE_SIZE
-                self.canvas.coords(self.ui_items[h_name], hx-sz, hy-sz, hx+sz, hy+sz)
-        else:
+        if self.selected is None:
             for item in self.ui_items.values():
                 self.canvas.coords(item, -20, -20, -10, -10)
+            return
 
-        if self.is_broadcasting and self.cam:
-            self.cam.send(final)
-            self.cam.sleep_until_next_frame()
+        k = self.preview_scale
+        corners = self.get_corners(self.box_cx, self.box_cy, self.box_w, self.box_h, self.rotation)
+        flat_corners = [c * k for pt in corners for c in pt]
+        self.canvas.coords(self.ui_items['outline'], *flat_corners)
+
+        rx, ry = self.get_handle_pos('rot', self.box_cx, self.box_cy, self.box_w, self.box_h, self.rotation)
+        top_mid = self.get_handle_pos('n', self.box_cx, self.box_cy, self.box_w, self.box_h, self.rotation)
+        self.canvas.coords(self.ui_items['rot_line'], top_mid[0] * k, top_mid[1] * k, rx * k, ry * k)
+
+        HANDLE_SIZE = 8
+        for h_name in ['nw', 'n', 'ne', 'e', 'se', 's', 'sw', 'w', 'rot']:
+            hx, hy = self.get_handle_pos(h_name, self.box_cx, self.box_cy, self.box_w, self.box_h, self.rotation)
+            hx, hy, sz = hx * k, hy * k, HANDLE_SIZE
+            self.canvas.coords(self.ui_items[h_name], hx-sz, hy-sz, hx+sz, hy+sz)
+
+    # --- STATS ---
+
+    def toggle_stats(self):
+        self.show_stats = not self.show_stats
+        self.stats_btn.config(text=f"📊 Stats: {'ON' if self.show_stats else 'OFF'}")
+        self.canvas.itemconfig(self.stats_text, state=tk.NORMAL if self.show_stats else tk.HIDDEN)
+        self.canvas.tag_raise(self.stats_text)
+
+    def update_stats_overlay(self):
+        # Refreshed twice a second; sorting the sample windows every tick is wasted work
+        self._stats_tick += 1
+        if not self.show_stats or self._stats_tick % max(1, self.PREVIEW_FPS // 2):
+            return
+        lines = self.timer.format_lines()
+        if self.sink:
+            st = self.sink.stats()
+            lines.append(f"output   dropped {st['dropped']}  dup {st['duplicated']}  late {st['late']}")
+        self.canvas.itemconfig(self.stats_text, text="\n".join(lines) or "no samples yet")
+
+    def export_stats(self):
+        path = filedialog.asksaveasfilename(defaultextension=".json",
+                                            filetypes=[("JSON", "*.json"), ("CSV", "*.csv")])
+        if not path:
+            return
+        try:
+            if path.lower().endswith(".csv"):
+                self.timer.export_csv(path)
+            else:
+                extra = {"profile": {"width": self.width, "height": self.height,
+                                     "fps": self.fps, "format": self.pixel_format}}
+                if self.sink:
+                    extra["output"] = self.sink.stats()
+                self.timer.export_json(path, extra)
+        except OSError as e:
+            messagebox.showerror("Error", f"Could not write stats: {e}")
 
-        self.root.after(30, self.update_loop)
+    def update_loop(self):
+        # Preview only: show the latest rendered frame at PREVIEW_FPS
+        t0 = time.perf_counter()
+        if self.preview.draw(self.exchange):
+            self.timer.add("preview", time.perf_counter() - t0)
+        self.update_overlay()
+        self.update_stats_overlay()
+
+        if self.is_broadcasting and self.sink:
+            st = self.sink.stats()
+            self.stats_label.config(text=f"sent {st['sent']}  dropped {st['dropped']}  "
+                                         f"dup {st['duplicated']}  late {st['late']}")
+
+        self.root.after(int(1000 / self.PREVIEW_FPS), self.update_loop)
 
 if __name__ == "__main__":
     root = tk.Tk()
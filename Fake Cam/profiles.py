@@ -0,0 +1,25 @@
+# Output profiles for the virtual camera. Kept free of heavy imports so
+# scene.py (and with it headless.py) can validate settings cheaply.
+
+RESOLUTIONS = {
+    "640x360": (640, 360),
+    "854x480": (854, 480),
+    "1280x720": (1280, 720),
+    "1920x1080": (1920, 1080),
+}
+FRAME_RATES = (15, 30, 60)
+# Names match pyvirtualcam.PixelFormat members
+PIXEL_FORMATS = ("BGR", "RGB", "RGBA", "I420", "NV12", "YUYV")
+
+
+def frame_shape(fmt, width, height):
+    """Array shape pyvirtualcam expects for one frame of ``fmt``."""
+    if fmt in ("BGR", "RGB"):
+        return (height, width, 3)
+    if fmt == "RGBA":
+        return (height, width, 4)
+    if fmt in ("I420", "NV12"):
+        return (height * 3 // 2, width)
+    if fmt == "YUYV":
+        return (height, width * 2)
+    raise ValueError(f"Unsupported pixel format: {fmt}")
@@ -0,0 +1,136 @@
+import json
+import os
+
+from profiles import PIXEL_FORMATS
+
+# Scene files describe what Fake Cam broadcasts, so the same setup can be
+# driven from the GUI or from headless.py. Both JSON and TOML are accepted;
+# the format follows the file extension. Layers are listed bottom to top.
+#
+#   bake = false
+#   [output]
+#   width = 1280
+#   height = 720
+#   fps = 30
+#   format = "BGR"              # BGR, RGB, RGBA, I420, NV12 or YUYV
+#
+#   [[layers]]
+#   media = "background.mp4"    # relative paths resolve against the scene file
+#   rotation = 0.0
+#   mirror = false
+#   [layers.box]                # omit to fit the media to the output frame
+#   cx = 640.0
+#   cy = 360.0
+#   w = 1280.0
+#   h = 720.0
+#
+#   [[layers]]
+#   media = "logo.png"          # PNG alpha is blended over the layers below
+#
+# A scene with a top-level ``media`` (and ``box``, ``rotation``, ``mirror``)
+# instead of ``layers`` is read as a single layer.
+
+DEFAULT_OUTPUT = {"width": 1280, "height": 720, "fps": 30, "format": "BGR"}
+
+
+def fit_box(source_w, source_h, width, height):
+    """Largest box with the source's aspect ratio that fits the frame, centred."""
+    scale = min(width / source_w, height / source_h)
+    return {"cx": width / 2, "cy": height / 2, "w": source_w * scale, "h": source_h * scale}
+
+
+def load_scene(path):
+    """Read and normalise a scene file. Raises ValueError on bad content."""
+    if path.lower().endswith(".toml"):
+        import tomllib
+        with open(path, "rb") as fh:
+            raw = tomllib.load(fh)
+    else:
+        with open(path, "r", encoding="utf-8") as fh:
+            raw = json.load(fh)
+
+    if not isinstance(raw, dict):
+        raise ValueError(f"{path}: scene must be a table")
+    layers = raw.get("layers")
+    if layers is None and raw.get("media"):
+        layers = [raw]
+    if not isinstance(layers, list) or not layers:
+        raise ValueError(f"{path}: scene needs a 'layers' list or a 'media' entry")
+
+    output = dict(DEFAULT_OUTPUT)
+    output.update(raw.get("output") or {})
+    if output["format"] not in PIXEL_FORMATS:
+        raise ValueError(f"{path}: unknown output format {output['format']!r}")
+
+    return {
+        "layers": [_load_layer(path, layer, i) for i, layer in enumerate(layers)],
+        "bake": bool(raw.get("bake", False)),
+        "output": {"width": int(output["width"]), "height": int(output["height"]),
+                   "fps": int(output["fps"]), "format": output["format"]},
+    }
+
+
+def _load_layer(path, raw, index):
+    if not isinstance(raw, dict) or not raw.get("media"):
+        raise ValueError(f"{path}: layer {index} needs a 'media' entry")
+
+    media = os.path.expanduser(str(raw["media"]))
+    if not os.path.isabs(media):
+        media = os.path.join(os.path.dirname(os.path.abspath(path)), media)
+
+    box = raw.get("box")
+    if box is not None:
+        try:
+            box = {k: float(box[k]) for k in ("cx", "cy", "w", "h")}
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"{path}: layer {index} box needs numeric cx, cy, w and h")
+
+    return {
+        "media": media,
+        "box": box,
+        "rotation": float(raw.get("rotation", 0.0)) % 360,
+        "mirror": bool(raw.get("mirror", False)),
+    }
+
+
+def save_scene(path, scene):
+    if path.lower().endswith(".toml"):
+        text = _dump_toml(scene)
+    else:
+        text = json.dumps(scene, indent=2) + "\n"
+    with open(path, "w", encoding="utf-8") as fh:
+        fh.write(text)
+
+
+def _toml_value(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    return json.dumps(str(value))  # JSON string escapes are valid TOML basic strings
+
+
+def _dump_toml(scene):
+    # Handles what scenes use: scalars, tables, arrays of tables and tables
+    # nested one level inside those
+    lines = []
+    _dump_table(lines, scene, "")
+    return "\n".join(lines).lstrip("\n") + "\n"
+
+
+def _dump_table(lines, table, prefix):
+    nested = []
+    for key, value in table.items():
+        if isinstance(value, (dict, list)):
+            nested.append((key, value))
+        elif value is not None:
+            lines.append(f"{key} = {_toml_value(value)}")
+    for key, value in nested:
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            lines += ["", f"[{name}]"]
+            _dump_table(lines, value, name + ".")
+        else:
+            for item in value:
+                lines += ["", f"[[{name}]]"]
+                _dump_table(lines, item, name + ".")
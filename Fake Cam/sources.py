@@ -0,0 +1,398 @@
+import hashlib
+import math
+import os
+import struct
+import tempfile
+import threading
+import time
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg')
+
+
+def load_image(path):
+    """Read a still as 8-bit BGR, or BGRA when the file carries an alpha channel."""
+    image = cv2.imread(path, cv2.IMREAD_UNCHANGED)
+    if image is None:
+        raise IOError(f"Could not read image: {path}")
+    if image.dtype == np.uint16:
+        image = (image >> 8).astype(np.uint8)
+    if image.ndim == 2:
+        image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    elif image.shape[2] == 2:
+        image = cv2.cvtColor(image[:, :, :1], cv2.COLOR_GRAY2BGR)  # grey + alpha: drop alpha
+    elif image.shape[2] == 4 and image[:, :, 3].min() == 255:
+        image = cv2.cvtColor(image, cv2.COLOR_BGRA2BGR)  # fully opaque, skip blending
+    return image
+
+
+def open_source(path):
+    """StillSource for images, VideoSource otherwise (not started)."""
+    if path.lower().endswith(IMAGE_EXTENSIONS):
+        return StillSource(path, load_image(path))
+    return VideoSource(path)
+
+
+class StillSource:
+    """A single image behind the same interface as the video sources."""
+
+    fps = None
+
+    def __init__(self, path, image):
+        self.path = path
+        self.image = image
+        self.height, self.width = image.shape[:2]
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def latest(self):
+        return self.image
+
+
+class VideoSource:
+    """Decodes a video file on a background thread into a bounded frame ring.
+
+    The first ``ring_size`` frames are kept decoded as the loop head, so the
+    wrap from the last frame back to the first never waits on a seek. Frames
+    are stamped at the clip's native FPS and ``latest()`` only hands out the
+    newest frame that is due.
+    """
+
+    def __init__(self, path, ring_size=8):
+        self.path = path
+        self.cap = cv2.VideoCapture(path)
+        if not self.cap.isOpened():
+            raise IOError(f"Could not open video: {path}")
+
+        self.width = int(self.cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+        self.height = int(self.cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        fps = self.cap.get(cv2.CAP_PROP_FPS)
+        self.fps = fps if 1 <= fps <= 240 else 30.0
+        self.frame_interval = 1.0 / self.fps
+
+        shape = (self.height, self.width, 3)
+        self._ring = np.zeros((ring_size,) + shape, dtype=np.uint8)
+        self._pts = [0.0] * ring_size
+        self._head = np.zeros((ring_size,) + shape, dtype=np.uint8)
+        self._head_len = 0
+        self._head_only = False  # whole clip fits in the loop head
+
+        # Ring indices: frames [read, write) are decoded and not yet released.
+        # The slot at ``read`` is the one currently on screen.
+        self._read = 0
+        self._write = 0
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+        self.timer = None  # optional timing.StageTimer
+
+        self._prefetch_head()
+
+    def _prefetch_head(self):
+        for i in range(len(self._head)):
+            ret, frame = self.cap.read(self._head[i])
+            if not ret:
+                break
+            if frame is not self._head[i]:
+                self._head[i] = frame
+            self._head_len += 1
+
+        if self._head_len == 0:
+            self.cap.release()
+            raise IOError(f"Could not read video stream: {self.path}")
+        if self._head_len < len(self._head):
+            self._head_only = True
+            self.cap.release()
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="VideoSource", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+        self.cap.release()
+
+    # --- PRODUCER ---
+
+    def _acquire_slot(self):
+        """Block until a ring slot is free, return its index or None when stopping."""
+        size = len(self._ring)
+        with self._cond:
+            while self._running and self._write - self._read >= size:
+                self._cond.wait(0.1)
+            if not self._running:
+                return None
+            return self._write % size
+
+    def _publish(self, slot, pts):
+        with self._cond:
+            self._pts[slot] = pts
+            self._write += 1
+            self._cond.notify_all()
+
+    def _run(self):
+        pts = time.perf_counter()
+        head_pos = 0
+        in_head = True
+        need_seek = False
+
+        while self._running:
+            slot = self._acquire_slot()
+            if slot is None:
+                break
+
+            if in_head:
+                self._ring[slot] = self._head[head_pos]
+                head_pos += 1
+                if head_pos >= self._head_len:
+                    head_pos = 0
+                    in_head = self._head_only
+                    if need_seek and not in_head:
+                        # The ring is full of head frames by now, which
+                        # covers the time the seek takes.
+                        self.cap.set(cv2.CAP_PROP_POS_FRAMES, self._head_len)
+                        need_seek = False
+            else:
+                t0 = time.perf_counter()
+                ret, frame = self.cap.read(self._ring[slot])
+                if self.timer is not None and ret:
+                    self.timer.add("decode", time.perf_counter() - t0)
+                if not ret:
+                    # End of clip: continue gaplessly from the prefetched head
+                    # and seek the capture past it once the head is queued.
+                    in_head = True
+                    need_seek = True
+                    continue
+                if frame is not self._ring[slot]:
+                    self._ring[slot] = frame
+
+            # Nobody consumed frames for a while (e.g. the window was stalled):
+            # restart the clock instead of fast-forwarding through stale frames.
+            now = time.perf_counter()
+            if pts < now - self.frame_interval * len(self._ring):
+                pts = now
+
+            self._publish(slot, pts)
+            pts += self.frame_interval
+
+    # --- CONSUMER ---
+
+    def latest(self):
+        """Newest due frame (the first head frame until decoding catches up).
+
+        The returned array is a ring slot; it stays valid until the next call.
+        """
+        size = len(self._ring)
+        now = time.perf_counter()
+        with self._cond:
+            if self._write == self._read:
+                return self._head[0]
+            advanced = False
+            while self._write - self._read > 1 and self._pts[(self._read + 1) % size] <= now:
+                self._read += 1
+                advanced = True
+            if advanced:
+                self._cond.notify_all()
+            return self._ring[self._read % size]
+
+    def next_frame_delay(self):
+        """Seconds until the next decoded frame becomes due."""
+        size = len(self._ring)
+        with self._cond:
+            if self._write - self._read > 1:
+                due = self._pts[(self._read + 1) % size]
+                return max(0.0, due - time.perf_counter())
+        return self.frame_interval
+
+
+# --- BAKED LOOPS ---
+
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".fakecam", "loops")
+CACHE_MAX_BYTES = 2 * 1024 ** 3
+
+
+class BakedLoop:
+    """Plays a baked clip from a memory-mapped frame file, without decoding.
+
+    Same playback interface as ``VideoSource``; ``latest()`` returns a
+    read-only view straight into the mapped file.
+    """
+
+    def __init__(self, path, frames, fps):
+        self.path = path
+        self.frames = frames
+        self.height, self.width = frames.shape[1:3]
+        self.fps = fps
+        self.frame_interval = 1.0 / fps
+        self._t0 = time.perf_counter()
+
+    def start(self):
+        self._t0 = time.perf_counter()
+
+    def stop(self):
+        # The mapping stays valid: a render thread may still hold this loop;
+        # it is unmapped once the last reference is gone
+        pass
+
+    def _position(self):
+        return (time.perf_counter() - self._t0) * self.fps
+
+    def latest(self):
+        return self.frames[int(self._position()) % len(self.frames)]
+
+    def next_frame_delay(self):
+        pos = self._position()
+        return (math.floor(pos) + 1 - pos) * self.frame_interval
+
+
+class LoopCache:
+    """Disk cache of clips decoded once and pre-scaled to a box size.
+
+    Each entry is a raw uint8 file: a fixed-size header followed by the
+    frames back to back. Entries are keyed on the clip's path, mtime and
+    target size, and evicted least-recently-used once ``max_bytes`` is hit.
+    An entry whose size doesn't match its header (cut short by a crash or a
+    full disk) is treated as a miss and deleted.
+    """
+
+    MAGIC = b"FCLP"
+    VERSION = 1
+    HEADER = struct.Struct("<4sHHIIId")  # magic, version, channels, frames, width, height, fps
+    HEADER_SIZE = 64
+    SUFFIX = ".fcloop"
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def entry_path(self, path, width, height):
+        st = os.stat(path)
+        key = f"{os.path.abspath(path)}|{st.st_mtime_ns}|{st.st_size}|{width}x{height}"
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, digest + self.SUFFIX)
+
+    def open(self, path, width, height):
+        """Return a ``BakedLoop`` for a cached bake, or None on a miss."""
+        entry = self.entry_path(path, width, height)
+        if not os.path.exists(entry):
+            return None
+        try:
+            with open(entry, "rb") as fh:
+                header = self.HEADER.unpack(fh.read(self.HEADER.size))
+                size = os.fstat(fh.fileno()).st_size
+        except struct.error:
+            self._discard(entry)
+            return None
+        except OSError:
+            return None
+
+        magic, version, channels, count, w, h, fps = header
+        if (magic != self.MAGIC or version != self.VERSION or count == 0 or (w, h) != (width, height)
+                or size != self.HEADER_SIZE + count * h * w * channels):
+            self._discard(entry)
+            return None
+
+        try:
+            frames = np.memmap(entry, dtype=np.uint8, mode="r", offset=self.HEADER_SIZE,
+                               shape=(count, h, w, channels))
+        except (OSError, ValueError):
+            return None
+        os.utime(entry)  # mark as recently used
+        return BakedLoop(entry, frames, fps)
+
+    def _discard(self, entry):
+        try:
+            os.remove(entry)
+        except OSError:
+            pass  # mapped by another process (Windows); the next bake replaces it
+
+    def bake(self, path, width, height, cancel=None):
+        """Decode ``path`` once, scaled to ``width`` x ``height``, and cache it.
+
+        Returns the ``BakedLoop``, or None if the clip would not fit in the
+        cache, could not be read or ``cancel`` was set part way through.
+        """
+        cached = self.open(path, width, height)
+        if cached is not None:
+            return cached
+
+        cap = cv2.VideoCapture(path)
+        if not cap.isOpened():
+            return None
+
+        # The frame count is 0 or wrong for many containers: it only decides
+        # what to evict up front; the size cap is enforced while writing
+        frame_bytes = width * height * 3
+        estimate = max(0, int(cap.get(cv2.CAP_PROP_FRAME_COUNT))) * frame_bytes
+        if estimate > self.max_bytes:
+            cap.release()
+            return None
+        self.evict(estimate)
+
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        fps = fps if 1 <= fps <= 240 else 30.0
+
+        entry = self.entry_path(path, width, height)
+        # A name of its own, so concurrent bakes of the same clip don't write into one file
+        fd, tmp = tempfile.mkstemp(suffix=".tmp", dir=self.directory)
+        scaled = np.empty((height, width, 3), dtype=np.uint8)
+        count = 0
+        done = False
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(b"\0" * self.HEADER_SIZE)
+                while True:
+                    if cancel is not None and cancel.is_set():
+                        return None
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    if self.HEADER_SIZE + (count + 1) * frame_bytes > self.max_bytes:
+                        return None  # longer than the frame count said, and too large to cache
+                    cv2.resize(frame, (width, height), dst=scaled, interpolation=cv2.INTER_AREA)
+                    fh.write(scaled.data)
+                    count += 1
+                if count == 0:
+                    return None
+                fh.seek(0)
+                fh.write(self.HEADER.pack(self.MAGIC, self.VERSION, 3, count, width, height, fps))
+            self.evict(self.HEADER_SIZE + count * frame_bytes)
+            os.replace(tmp, entry)
+            done = True
+        finally:
+            cap.release()
+            if not done:
+                os.remove(tmp)
+        return self.open(path, width, height)
+
+    def evict(self, incoming=0):
+        """Delete least-recently-used entries until ``incoming`` more bytes fit."""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith(self.SUFFIX):
+                full = os.path.join(self.directory, name)
+                st = os.stat(full)
+                entries.append((st.st_mtime, st.st_size, full))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, full in sorted(entries):
+            if total + incoming <= self.max_bytes:
+                break
+            try:
+                os.remove(full)
+            except OSError:
+                # Still mapped on Windows; leave it for the next eviction pass
+                continue
+            total -= size
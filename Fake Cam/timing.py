@@ -0,0 +1,72 @@
+import csv
+import json
+import threading
+from collections import deque
+
+# Stage names used across the pipeline, in pipeline order
+STAGES = ("decode", "fetch", "warp", "mask", "convert", "send", "preview")
+
+
+class StageTimer:
+    """Rolling per-stage frame timings with p50/p95/p99 summaries.
+
+    Stages are recorded from several threads (decode, render, sink, Tk);
+    each stage keeps its own bounded window of the most recent samples.
+    """
+
+    def __init__(self, window=600):
+        self.window = window
+        self._samples = {}
+        self._counts = {}
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            samples = self._samples.get(stage)
+            if samples is None:
+                samples = self._samples[stage] = deque(maxlen=self.window)
+                self._counts[stage] = 0
+            samples.append(seconds)
+            self._counts[stage] += 1
+
+    def summary(self):
+        """{stage: {count, mean, p50, p95, p99, max}} with times in milliseconds."""
+        with self._lock:
+            stages = [(stage, list(samples), self._counts[stage]) for stage, samples in self._samples.items()]
+        order = {name: i for i, name in enumerate(STAGES)}
+        stages.sort(key=lambda item: order.get(item[0], len(order)))
+
+        result = {}
+        for stage, samples, count in stages:
+            values = sorted(samples)
+            if not values:
+                continue
+            n = len(values)
+            result[stage] = {
+                "count": count,
+                "mean": sum(values) / n * 1000,
+                "p50": values[int(0.50 * (n - 1))] * 1000,
+                "p95": values[int(0.95 * (n - 1))] * 1000,
+                "p99": values[int(0.99 * (n - 1))] * 1000,
+                "max": values[-1] * 1000,
+            }
+        return result
+
+    def format_lines(self):
+        return [f"{stage:<8} p50 {s['p50']:6.2f}  p95 {s['p95']:6.2f}  p99 {s['p99']:6.2f} ms"
+                for stage, s in self.summary().items()]
+
+    def export_json(self, path, extra=None):
+        data = {"window": self.window, "stages": self.summary()}
+        if extra:
+            data.update(extra)
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump(data, fh, indent=2)
+
+    def export_csv(self, path):
+        with open(path, "w", newline="", encoding="utf-8") as fh:
+            writer = csv.writer(fh)
+            writer.writerow(["stage", "count", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"])
+            for stage, s in self.summary().items():
+                writer.writerow([stage, s["count"]] + [f"{s[k]:.3f}" for k in ("mean", "p50", "p95", "p99", "max")])
+
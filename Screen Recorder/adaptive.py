@@ -0,0 +1,115 @@
+from collections import namedtuple
+
+# x264 presets, fastest first
+PRESETS = ("ultrafast", "superfast", "veryfast", "faster", "fast", "medium", "slow", "slower", "veryslow")
+
+# One rung of the quality ladder. ``scale`` multiplies the output size,
+# ``fps_divisor`` keeps every n-th captured tick.
+Level = namedtuple("Level", "preset crf scale fps_divisor")
+
+
+def build_ladder(preset, crf, vfr, max_crf=35, scales=(0.75, 0.5), fps_divisors=(2, 4)):
+    """Levels from the configured quality down to the cheapest, one change per rung.
+
+    Order of sacrifice: faster x264 preset, then higher CRF, then a smaller
+    output, then fewer frames. Frame rate only drops with variable frame
+    rate output, where left-out ticks simply hold the previous frame.
+    """
+    level = Level(preset, crf, 1.0, 1)
+    ladder = [level]
+    for p in reversed(PRESETS[:PRESETS.index(preset)]):
+        level = level._replace(preset=p)
+        ladder.append(level)
+    for c in (crf + 3, crf + 6):
+        if c <= max_crf:
+            level = level._replace(crf=c)
+            ladder.append(level)
+    for s in scales:
+        level = level._replace(scale=s)
+        ladder.append(level)
+    if vfr:
+        for d in fps_divisors:
+            level = level._replace(fps_divisor=d)
+            ladder.append(level)
+    return ladder
+
+
+def describe(old, new):
+    names = {"preset": "preset", "crf": "crf", "scale": "scale", "fps_divisor": "fps divisor"}
+    return ", ".join(f"{names[k]} {getattr(old, k)} -> {getattr(new, k)}"
+                     for k in Level._fields if getattr(old, k) != getattr(new, k))
+
+
+class QualityController:
+    """Steps down the quality ladder while the encoder can't keep up, and back up with headroom.
+
+    ``observe`` is fed every written frame's latency (seconds from its
+    capture tick to leaving the encoder) and the running drop count. Each
+    ``window`` seconds it decides: a frame later than ``slow`` frame
+    intervals, new drops or a queue more than half full step one rung down;
+    a whole ``raise_after`` seconds under ``fast`` intervals with an empty
+    queue steps one rung up. After a change the next window is ignored,
+    since starting the new encoder causes a latency spike of its own.
+    """
+
+    def __init__(self, ladder, fps, depth=None, capacity=None, window=2.0, raise_after=30.0,
+                 slow=2.0, fast=0.5, log=print):
+        self.ladder = ladder
+        self.index = 0
+        self.interval = 1.0 / fps
+        self.depth = depth          # callable: frames waiting in the encode queue
+        self.capacity = capacity
+        self.window = window
+        self.raise_after = raise_after
+        self.slow = slow
+        self.fast = fast
+        self.log = log
+        self._window_end = None
+        self._hold = False
+        self._calm_since = None
+        self._drops = 0
+        self._latency = 0.0
+        self._max_depth = 0
+
+    @property
+    def level(self):
+        return self.ladder[self.index]
+
+    def observe(self, latency, drops, now):
+        """Record one frame; returns the new Level when the quality changes, else None."""
+        if self._window_end is None:
+            self._window_end, self._calm_since, self._drops = now + self.window, now, drops
+        self._latency = max(self._latency, latency)
+        if self.depth is not None:
+            self._max_depth = max(self._max_depth, self.depth())
+        if now < self._window_end:
+            return None
+
+        latency, depth, new_drops = self._latency, self._max_depth, drops - self._drops
+        self._window_end, self._drops = now + self.window, drops
+        self._latency, self._max_depth = 0.0, 0
+        if self._hold:
+            self._hold = False
+            self._calm_since = now
+            return None
+
+        crowded = self.capacity is not None and depth > self.capacity // 2
+        if latency > self.slow * self.interval or new_drops or crowded:
+            self._calm_since = now
+            if self.index + 1 < len(self.ladder):
+                return self._step(+1, f"latency {latency * 1000:.0f} ms, {new_drops} dropped, queue {depth}")
+            return None
+        if latency > self.fast * self.interval or depth > 1:
+            self._calm_since = now
+        elif self.index > 0 and now - self._calm_since >= self.raise_after:
+            self._calm_since = now
+            return self._step(-1, f"latency {latency * 1000:.0f} ms for {self.raise_after:.0f} s")
+        return None
+
+    def _step(self, direction, reason):
+        old = self.level
+        self.index += direction
+        self._hold = True
+        self.log(f"Quality {'down' if direction > 0 else 'up'} to level {self.index}: "
+                 f"{describe(old, self.level)} ({reason})")
+        return self.level
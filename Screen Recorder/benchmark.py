@@ -0,0 +1,146 @@
+"""Screen Recorder benchmark on a synthetic screen.
+
+Runs recorder.py against generated frames (capture.SyntheticSource: static,
+scrolling and full-motion patterns) at several screen sizes and recorder
+configurations, so throughput and CPU cost can be compared on a machine
+without a display. Each run is a real recorder process stopped with SIGINT;
+results come from the segment stats files it writes, CPU time from the
+process tree (POSIX only).
+
+Usage: python benchmark.py [--duration S] [--fps N] [--quick] [--json PATH] [--csv PATH]
+"""
+import argparse
+import csv
+import json
+import os
+import resource
+import signal
+import subprocess
+import sys
+import tempfile
+import time
+
+from capture import PATTERNS
+
+SIZES = {"720p": (1280, 720), "1080p": (1920, 1080), "4k": (3840, 2160)}
+
+# Recorder settings per configuration (on top of the recorder defaults)
+CONFIGS = {
+    "vfr": {},
+    "cfr": {"idle_skip": False},
+    "downscale": {"python_downscale": True},
+    "imageio": {"writer": "imageio", "idle_skip": False},
+}
+
+RECORDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "recorder.py")
+
+
+def children_cpu():
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def bench_recorder(tmp, pattern, size_name, config, duration, fps, adaptive=False):
+    """One recorder run; returns a result row."""
+    out_dir = os.path.join(tmp, f"{pattern}_{size_name}_{config}")
+    settings = {"fps": fps, "segment_duration": 0, "output_dir": out_dir, "stats_interval": 0,
+                "adaptive": adaptive, "sources": [{"synthetic": pattern, "size": list(SIZES[size_name])}]}
+    settings.update(CONFIGS[config])
+    config_path = out_dir + ".json"
+    with open(config_path, "w", encoding="utf-8") as fh:
+        json.dump(settings, fh)
+
+    cpu0, t0 = children_cpu(), time.perf_counter()
+    proc = subprocess.Popen([sys.executable, RECORDER, "--config", config_path],
+                            stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True)
+    time.sleep(duration)
+    proc.send_signal(signal.SIGINT)
+    output = proc.communicate()[0]
+    wall, cpu = time.perf_counter() - t0, children_cpu() - cpu0
+    if proc.returncode != 0:
+        raise RuntimeError(f"recorder failed ({pattern} {size_name} {config}):\n{output}")
+
+    reports = []
+    for name in sorted(os.listdir(out_dir)):
+        if name.endswith(".json"):
+            with open(os.path.join(out_dir, name), encoding="utf-8") as fh:
+                reports.append(json.load(fh))
+    counters = {}
+    for report in reports:
+        for k, v in report["counters"].items():
+            counters[k] = counters.get(k, 0) + v
+    # Rates over the capture clock's ticks; an idle tail is not part of any segment's span
+    recorded = (counters.get("captured", 0) + counters.get("missed", 0)) / fps or duration
+    stages = reports[-1]["stages"] if reports else {}
+    row = {
+        "pattern": pattern, "size": size_name, "config": config,
+        "capture_fps": counters.get("captured", 0) / recorded,
+        "written_fps": (counters.get("encoded", 0) + counters.get("duplicated", 0)) / recorded,
+        "skipped": counters.get("skipped", 0),
+        "dropped": counters.get("missed", 0) + counters.get("dropped_convert", 0) + counters.get("dropped_encode", 0),
+        "cpu_pct": cpu / wall * 100,
+        "mb_per_min": sum(r["size"] for r in reports) / recorded * 60 / 1e6,
+    }
+    for stage in ("grab", "convert", "encode", "latency"):
+        if stage in stages:
+            row[f"{stage}_p95"] = stages[stage]["p95"]
+    return row
+
+
+def print_table(rows, columns):
+    cells = [[f"{v:.2f}" if isinstance(v, float) else str(v) for v in (row.get(c, "") for c in columns)]
+             for row in rows]
+    widths = [max([len(c)] + [len(r[i]) for r in cells]) for i, c in enumerate(columns)]
+    print("  ".join(c.ljust(w) for c, w in zip(columns, widths)))
+    for r in cells:
+        print("  ".join(v.ljust(w) for v, w in zip(r, widths)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark recorder configurations on a synthetic screen.")
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds per run")
+    parser.add_argument("--fps", type=float, default=10)
+    parser.add_argument("--sizes", default=",".join(SIZES), help=f"comma-separated, from {', '.join(SIZES)}")
+    parser.add_argument("--patterns", default=",".join(PATTERNS), help=f"comma-separated, from {', '.join(PATTERNS)}")
+    parser.add_argument("--configs", default=",".join(CONFIGS), help=f"comma-separated, from {', '.join(CONFIGS)}")
+    parser.add_argument("--adaptive", action="store_true", help="let the quality controller react")
+    parser.add_argument("--quick", action="store_true", help="720p only, 3 s runs")
+    parser.add_argument("--json", metavar="PATH", help="write all results as JSON")
+    parser.add_argument("--csv", metavar="PATH", help="write all results as CSV")
+    args = parser.parse_args(argv)
+
+    sizes = ["720p"] if args.quick else args.sizes.split(",")
+    duration = 3.0 if args.quick else args.duration
+    patterns, configs = args.patterns.split(","), args.configs.split(",")
+    for name, known in ((sizes, SIZES), (patterns, PATTERNS), (configs, CONFIGS)):
+        unknown = [n for n in name if n not in known]
+        if unknown:
+            parser.error(f"unknown: {', '.join(unknown)}")
+
+    print(f"Recorder: {args.fps:g} fps target, {duration:g} s per run")
+    rows = []
+    with tempfile.TemporaryDirectory(prefix="recorder_bench_") as tmp:
+        for size in sizes:
+            for pattern in patterns:
+                for config in configs:
+                    rows.append(bench_recorder(tmp, pattern, size, config, duration, args.fps, args.adaptive))
+                    print(f"  {size} {pattern} {config}: {rows[-1]['written_fps']:.1f} fps written, "
+                          f"{rows[-1]['cpu_pct']:.0f}% CPU", flush=True)
+    print()
+    print_table(rows, ["size", "pattern", "config", "capture_fps", "written_fps", "skipped", "dropped",
+                       "cpu_pct", "mb_per_min", "grab_p95", "convert_p95", "encode_p95", "latency_p95"])
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(rows, fh, indent=2)
+    if args.csv:
+        fields = sorted({k for row in rows for k in row})
+        with open(args.csv, "w", newline="", encoding="utf-8") as fh:
+            writer = csv.DictWriter(fh, fieldnames=fields)
+            writer.writeheader()
+            writer.writerows(rows)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
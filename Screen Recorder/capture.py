@@ -0,0 +1,233 @@
+import re
+import shutil
+import subprocess
+import sys
+
+import mss
+import numpy as np
+from mss.exception import ScreenShotError
+
+# Make window and monitor coordinates physical pixels on Windows
+try:
+    import ctypes
+    ctypes.windll.shcore.SetProcessDpiAwareness(1)
+except Exception:
+    pass
+
+
+class MonitorSource:
+    """Grabs a monitor, or a sub-rectangle of it, with mss.
+
+    ``region`` is (left, top, width, height) relative to the monitor; only
+    those pixels are read from the screen. ``open`` must run on the
+    capturing thread (mss handles are per thread).
+    """
+
+    def __init__(self, monitor=1, region=None, name=None):
+        self.monitor_index = monitor
+        self.region = region
+        self.name = name or (f"mon{monitor}" if region is None else f"mon{monitor}_region")
+        self.sct = None
+        self.box = None
+
+    def resolve(self):
+        """Screen rectangle to grab, as an mss monitor dict."""
+        with mss.mss() as sct:
+            return self._box(sct)
+
+    def _box(self, sct):
+        mon = sct.monitors[self.monitor_index]
+        if self.region is None:
+            return dict(mon)
+        left, top, width, height = self.region
+        if left < 0 or top < 0 or left + width > mon["width"] or top + height > mon["height"]:
+            raise ValueError(f"region {self.region} is outside monitor {self.monitor_index} "
+                             f"({mon['width']}x{mon['height']})")
+        return {"left": mon["left"] + left, "top": mon["top"] + top, "width": width, "height": height}
+
+    @property
+    def size(self):
+        """(width, height); fixed from the first call on, so buffers can be sized up front."""
+        if self.box is None:
+            self.box = self.resolve()
+        return self.box["width"], self.box["height"]
+
+    def open(self):
+        self.sct = mss.mss()
+        if self.box is None:
+            self.box = self._box(self.sct)
+
+    def grab(self):
+        return self.sct.grab(self.box)
+
+    def close(self):
+        if self.sct is not None:
+            self.sct.close()
+            self.sct = None
+
+
+class WindowSource(MonitorSource):
+    """Grabs the screen area of the first window whose title contains ``title``.
+
+    The capture size is fixed when recording starts. On Windows the window
+    is followed if it moves; elsewhere its position is looked up once. A
+    grab that fails after the first one repeats the last frame.
+    """
+
+    def __init__(self, title, name=None):
+        super().__init__(name=name or "win_" + re.sub(r"\W+", "_", title).strip("_")[:32])
+        self.title = title
+        self.follow = sys.platform == "win32"
+
+    def _box(self, sct):
+        left, top, width, height = find_window(self.title)
+        desk = sct.monitors[0]
+        return _on_desktop(desk, left, top, min(width, desk["width"]), min(height, desk["height"]))
+
+    def open(self):
+        super().open()
+        self.last = None
+        self.failing = False
+
+    def grab(self):
+        if self.follow:
+            try:
+                left, top = find_window(self.title)[:2]
+                # The grab size stays fixed, whatever size the window has now
+                self.box = _on_desktop(self.sct.monitors[0], left, top, self.box["width"], self.box["height"])
+            except LookupError:
+                pass  # window closed or hidden: keep grabbing the last area
+        try:
+            self.last = self.sct.grab(self.box)
+            self.failing = False
+        except ScreenShotError as e:
+            if self.last is None:
+                raise
+            if not self.failing:
+                print(f"Grab failed for {self.name}, repeating the last frame: {e}")
+            self.failing = True
+        return self.last
+
+
+def _on_desktop(desk, left, top, width, height):
+    """Grab rectangle moved (not resized) to lie on the desktop; mss fails on areas outside it."""
+    left = min(max(left, desk["left"]), desk["left"] + desk["width"] - width)
+    top = min(max(top, desk["top"]), desk["top"] + desk["height"] - height)
+    return {"left": left, "top": top, "width": width, "height": height}
+
+
+def find_window(title):
+    """(left, top, width, height) of the first visible window whose title contains ``title``."""
+    if sys.platform == "win32":
+        return _find_window_win32(title)
+    if shutil.which("xdotool"):
+        return _find_window_xdotool(title)
+    raise RuntimeError("window capture needs Windows, or xdotool on X11")
+
+
+def _find_window_win32(title):
+    from ctypes import wintypes
+
+    user32 = ctypes.windll.user32
+    found = []
+
+    @ctypes.WINFUNCTYPE(wintypes.BOOL, wintypes.HWND, wintypes.LPARAM)
+    def callback(hwnd, _):
+        if user32.IsWindowVisible(hwnd):
+            length = user32.GetWindowTextLengthW(hwnd)
+            buf = ctypes.create_unicode_buffer(length + 1)
+            user32.GetWindowTextW(hwnd, buf, length + 1)
+            if title.lower() in buf.value.lower():
+                found.append(hwnd)
+                return False
+        return True
+
+    user32.EnumWindows(callback, 0)
+    if not found:
+        raise LookupError(f"no window with {title!r} in its title")
+    rect = wintypes.RECT()
+    user32.GetWindowRect(found[0], ctypes.byref(rect))
+    return rect.left, rect.top, rect.right - rect.left, rect.bottom - rect.top
+
+
+def _find_window_xdotool(title):
+    ids = subprocess.run(["xdotool", "search", "--onlyvisible", "--name", re.escape(title)],
+                         capture_output=True, text=True).stdout.split()
+    if not ids:
+        raise LookupError(f"no window with {title!r} in its title")
+    out = subprocess.run(["xdotool", "getwindowgeometry", "--shell", ids[0]],
+                         capture_output=True, text=True).stdout
+    geo = dict(line.split("=", 1) for line in out.splitlines() if "=" in line)
+    return int(geo["X"]), int(geo["Y"]), int(geo["WIDTH"]), int(geo["HEIGHT"])
+
+
+# --- SYNTHETIC SOURCE ---
+
+PATTERNS = ("static", "scroll", "motion")
+
+
+class SyntheticSource:
+    """Generated frames in place of the screen, for benchmarks without a display.
+
+    "static" returns the same desktop-like picture every time, "scroll"
+    moves a page of text-like blocks up ``speed`` rows per frame, and
+    "motion" changes every pixel on every frame (worst case for idle
+    skipping and the encoder). Frames are views into pregenerated images,
+    so generating them costs next to nothing.
+    """
+
+    def __init__(self, pattern="static", size=(1280, 720), name=None, speed=8, seed=0):
+        if pattern not in PATTERNS:
+            raise ValueError(f"unknown pattern {pattern!r}, expected one of {PATTERNS}")
+        self.pattern = pattern
+        self.width, self.height = size
+        self.name = name or f"synthetic_{pattern}"
+        self.speed = speed
+        self.seed = seed
+        self.image = None
+        self.n = 0
+
+    @property
+    def size(self):
+        return self.width, self.height
+
+    def open(self):
+        rng = np.random.default_rng(self.seed)
+        w, h = self.width, self.height
+        if self.pattern == "motion":
+            # Smooth gradient plus noise, panned sideways: nothing stays put
+            ramp = np.linspace(0, 160, w + 256, dtype=np.float32)
+            image = np.empty((h, w + 256, 4), dtype=np.uint8)
+            image[..., :3] = (ramp[None, :, None] + rng.integers(0, 64, (h, w + 256, 3))).clip(0, 255)
+            image[..., 3] = 255
+        else:
+            # Light page with dark "text" blocks; twice as tall, so it can scroll
+            rows = 2 * h if self.pattern == "scroll" else h
+            image = np.full((rows, w, 4), 235, dtype=np.uint8)
+            for _ in range(rows * w // 4000):
+                x, y = rng.integers(0, w - 40), rng.integers(0, rows - 12)
+                image[y:y + 10, x:x + rng.integers(8, 40), :3] = rng.integers(0, 90)
+        self.image = image
+
+    def grab(self):
+        self.n += 1
+        if self.pattern == "scroll":
+            top = self.n * self.speed % self.height
+            return self.image[top:top + self.height]
+        if self.pattern == "motion":
+            left = self.n * 7 % 256
+            return self.image[:, left:left + self.width]
+        return self.image
+
+    def close(self):
+        self.image = None
+
+
+def make_source(spec):
+    """Source from a SOURCES entry: {"monitor": n, "region": (l, t, w, h)}, {"window": title}
+    or {"synthetic": pattern, "size": (w, h)}."""
+    if "synthetic" in spec:
+        return SyntheticSource(spec["synthetic"], tuple(spec.get("size", (1280, 720))), name=spec.get("name"))
+    if "window" in spec:
+        return WindowSource(spec["window"], name=spec.get("name"))
+    return MonitorSource(spec.get("monitor", 1), spec.get("region"), name=spec.get("name"))
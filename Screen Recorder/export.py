@@ -0,0 +1,130 @@
+"""Cut a wall-clock time range out of the recorded segments, without re-encoding.
+
+Usage: python export.py 14:30 14:35 -o clip.mp4
+       python export.py "2025-01-01 14:30:00" "2025-01-01 15:10" -o clip.mp4 --source mon2
+
+Segments are looked up in the recordings manifest (manifest.py) and joined
+with ffmpeg's concat demuxer and stream copy, so even long ranges export in
+seconds. Only when adaptive quality recorded the range at more than one
+size is it re-encoded, at the largest of them.
+
+Stream copy cuts on keyframes: the clip starts at the last keyframe at or
+before the requested start (up to KEYFRAME_INTERVAL early with the ffmpeg
+writer; the imageio writer only marks a segment's first frame, so up to a
+whole segment early), and can run slightly past the requested end. The
+range printed at the end is the one the exported file actually covers.
+"""
+import argparse
+import datetime
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+import manifest
+from writers import ffmpeg_exe
+
+
+def parse_time(text):
+    """Epoch seconds from "HH:MM[:SS]" (today) or an ISO date and time."""
+    try:
+        clock = datetime.time.fromisoformat(text)
+        moment = datetime.datetime.combine(datetime.date.today(), clock)
+    except ValueError:
+        moment = datetime.datetime.fromisoformat(text)
+    return moment.timestamp()
+
+
+def fmt(ts):
+    return datetime.datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+
+
+def concat_list(directory, segments, start, end):
+    """Lines for ffmpeg's concat demuxer; returns (lines, actual start)."""
+    lines = []
+    actual_start = segments[0]["start"]
+    for seg in segments:
+        path = os.path.abspath(os.path.join(directory, seg["file"]))
+        lines.append("file '{}'".format(path.replace("'", "'\\''")))
+        offset = start - seg["start"]
+        if offset > 0:
+            # Stream copy can only start on a keyframe
+            inpoint = max(k for k in seg["keyframes"] if k <= offset)
+            lines.append(f"inpoint {inpoint:.3f}")
+            actual_start = seg["start"] + inpoint
+        if end < seg["end"]:
+            lines.append(f"outpoint {end - seg['start']:.3f}")
+    return lines, actual_start
+
+
+def probe_duration(path):
+    """Duration in seconds ffmpeg reports for ``path``, or None."""
+    result = subprocess.run([ffmpeg_exe(), "-hide_banner", "-i", path], capture_output=True, text=True)
+    match = re.search(r"Duration: (\d+):(\d+):(\d+(?:\.\d+)?)", result.stderr)
+    if match is None:
+        return None
+    hours, minutes, seconds = match.groups()
+    return int(hours) * 3600 + int(minutes) * 60 + float(seconds)
+
+
+def export(directory, start, end, output, source=None):
+    segments = manifest.find(directory, start, end, source)
+    if not segments:
+        raise LookupError(f"no recording between {fmt(start)} and {fmt(end)}")
+    for prev, seg in zip(segments, segments[1:]):
+        if seg["start"] - prev["end"] > 1.0 / seg["fps"]:
+            print(f"Note: nothing recorded from {fmt(prev['end'])} to {fmt(seg['start'])}")
+
+    # Adaptive quality may have lowered the encoded size of some segments;
+    # stream copy can't join those, so they are re-encoded at the largest size
+    codec = ["-c", "copy"]
+    sizes = {(seg["width"], seg["height"]) for seg in segments if "width" in seg}
+    if len(sizes) > 1:
+        width, height = max(sizes, key=lambda s: s[0] * s[1])
+        print(f"Note: segments were recorded at {len(sizes)} sizes; re-encoding at {width}x{height}")
+        codec = ["-vf", f"scale={width}:{height}:flags=bicubic", "-c:v", "libx264", "-pix_fmt", "yuv420p"]
+
+    lines, actual_start = concat_list(directory, segments, start, end)
+    with tempfile.NamedTemporaryFile("w", suffix=".txt", delete=False, encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+        list_file = f.name
+    try:
+        cmd = [ffmpeg_exe(), "-hide_banner", "-loglevel", "error", "-y",
+               "-f", "concat", "-safe", "0", "-i", list_file] + codec + ["-movflags", "+faststart", output]
+        result = subprocess.run(cmd)
+    finally:
+        os.remove(list_file)
+    if result.returncode != 0:
+        raise RuntimeError(f"ffmpeg exited with status {result.returncode}")
+    duration = probe_duration(output)
+    actual_end = actual_start + duration if duration is not None else min(end, segments[-1]["end"])
+    print(f"Exported {fmt(actual_start)} - {fmt(actual_end)} "
+          f"from {len(segments)} segment(s) to {output}")
+    if actual_start < start or actual_end > end:
+        print(f"Note: cut on keyframes, {start - actual_start:.2f}s before the requested start "
+              f"and {max(0.0, actual_end - end):.2f}s past the requested end")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export a time range of the screen recordings without re-encoding.")
+    parser.add_argument("start", help='start time, "HH:MM[:SS]" today or "YYYY-MM-DD HH:MM[:SS]"')
+    parser.add_argument("end", help="end time, same formats")
+    parser.add_argument("-o", "--output", required=True, help="output file (.mp4)")
+    parser.add_argument("--dir", default="recordings", help="recordings folder (default: recordings)")
+    parser.add_argument("--source", help="source name, when several sources were recorded")
+    args = parser.parse_args(argv)
+
+    try:
+        start, end = parse_time(args.start), parse_time(args.end)
+        if end <= start:
+            raise ValueError("end must be after start")
+        export(args.dir, start, end, args.output, args.source)
+    except (LookupError, OSError, RuntimeError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,33 @@
+import numpy as np
+
+
+class ChangeDetector:
+    """Cheap "did the screen change?" test on grabbed BGRA frames.
+
+    Compares every ``row_step``-th row of the frame with the same rows of the
+    last frame that was kept, as 32-bit pixels, so a typical desktop frame
+    is decided after reading a fraction of it. The sampled rows are copied,
+    so the grab buffer itself can be reused. Changes confined to skipped
+    rows are picked up by the next sampled change or at the latest by the
+    heartbeat: a frame is always kept once ``heartbeat`` seconds have passed
+    since the last one.
+    """
+
+    def __init__(self, heartbeat=2.0, row_step=4):
+        self.heartbeat = heartbeat
+        self.row_step = row_step
+        self._last = None
+        self._last_t = None
+
+    def changed(self, frame, t):
+        """True if ``frame`` (h, w, 4 uint8, or an mss ScreenShot) should be kept at time ``t``."""
+        sample = np.asarray(frame)[::self.row_step].view(np.uint32)
+        last = self._last
+        if last is None or last.shape != sample.shape or t - self._last_t >= self.heartbeat:
+            return True
+        return not np.array_equal(sample, last)
+
+    def mark(self, frame, t):
+        """Record ``frame`` as kept; only call once it was actually queued."""
+        self._last = np.asarray(frame)[::self.row_step].view(np.uint32).copy()
+        self._last_t = t
@@ -0,0 +1,95 @@
+import json
+import os
+
+MANIFEST_NAME = "manifest.jsonl"
+
+
+# --- MANIFEST ---
+# One JSON object per line, only ever appended to. A segment line:
+#   {"file": "screen_20250101_120000.mp4", "source": null, "start": 1735732800.0,
+#    "end": 1735732860.0, "frames": 412, "fps": 10, "width": 1280, "height": 720,
+#    "size": 1843200, "keyframes": [0.0, 2.0, 4.0, ...]}
+# start/end are wall-clock epoch seconds, keyframes are seconds from the
+# segment start. width/height are the encoded frame size, which adaptive
+# quality may lower from one segment to the next (absent in older lines).
+# A segment is announced with {"started": "<file>", "source": ...,
+# "start": ...} when its writer opens (fragmented segments can be read
+# from then on) and listed once it is complete. Deleting a segment appends
+# {"evicted": "<file>"} instead of rewriting the file, so several encoder
+# processes can share one manifest.
+
+def manifest_path(directory):
+    return os.path.join(directory, MANIFEST_NAME)
+
+
+def append(directory, entry):
+    """Append one entry; a single write, so lines from several processes don't interleave."""
+    line = json.dumps(entry, separators=(",", ":")) + "\n"
+    with open(manifest_path(directory), "a", encoding="utf-8") as f:
+        f.write(line)
+
+
+def _entries(directory):
+    try:
+        with open(manifest_path(directory), encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue  # torn last line after a crash
+    except FileNotFoundError:
+        return
+
+
+def load(directory):
+    """Completed live segments, oldest first. Evicted and truncated (half-written) lines are skipped."""
+    segments = {}
+    for entry in _entries(directory):
+        if "evicted" in entry:
+            segments.pop(entry["evicted"], None)
+        elif "file" in entry:
+            segments[entry["file"]] = entry
+    return sorted(segments.values(), key=lambda s: s["start"])
+
+
+def in_progress(directory):
+    """Segments announced but not completed, oldest first: being written, or cut off by a crash."""
+    started, done = {}, set()
+    for entry in _entries(directory):
+        if "started" in entry:
+            started[entry["started"]] = entry
+        else:
+            done.add(entry.get("file") or entry.get("evicted"))
+    return sorted((e for name, e in started.items() if name not in done), key=lambda e: e["start"])
+
+
+def find(directory, start, end, source=None):
+    """Segments of ``source`` overlapping the wall-clock range [start, end)."""
+    return [s for s in load(directory)
+            if s.get("source") == source and s["start"] < end and s["end"] > start]
+
+
+# --- RETENTION ---
+
+def enforce_budget(directory, max_bytes):
+    """Delete the oldest segments until the recorded ones fit in ``max_bytes``.
+
+    Returns the evicted file names. The newest segment is never deleted;
+    a segment's stats file (<segment>.json) goes with it.
+    """
+    segments = load(directory)
+    total = sum(s.get("size", 0) for s in segments)
+    evicted = []
+    for seg in segments[:-1]:
+        if total <= max_bytes:
+            break
+        path = os.path.join(directory, seg["file"])
+        for victim in (path, os.path.splitext(path)[0] + ".json"):
+            try:
+                os.remove(victim)
+            except FileNotFoundError:
+                pass  # already gone (deleted by hand, or by another encoder process)
+        append(directory, {"evicted": seg["file"]})
+        total -= seg.get("size", 0)
+        evicted.append(seg["file"])
+    return evicted
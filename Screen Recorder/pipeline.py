@@ -0,0 +1,309 @@
+import queue
+import threading
+import time
+
+# Policies for ticks that never reach the encoder (lost to a full queue or a
+# slow grab):
+#   "duplicate" - repeat the previous frame so the video keeps wall-clock time
+#   "drop"      - leave them out; the video plays back shorter than real time
+DROP_POLICIES = ("duplicate", "drop")
+
+_STOP = object()  # end-of-stream marker passed down the queues
+
+
+def sleep_until(deadline):
+    """Wait for the capture clock's next tick at ``deadline`` (perf_counter time);
+    the final 2 ms are spent yielding, since ``time.sleep`` overshoots."""
+    while True:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            return
+        time.sleep(remaining - 0.002 if remaining > 0.003 else 0)
+
+
+class Frame:
+    """One captured tick. ``index`` counts clock ticks since the capture started."""
+
+    __slots__ = ("index", "t", "data", "grab")
+
+    def __init__(self, index, t, data, grab=0.0):
+        self.index = index
+        self.t = t          # perf_counter time the tick was due
+        self.data = data
+        self.grab = grab    # seconds the grab took
+
+
+class PipelineStats:
+    """Frame counters. Each counter is only written by one stage thread.
+
+    Stages count with ``add(name, index)``. With ``track`` every count is also
+    logged against the tick it belongs to, and ``take(before)`` totals the
+    ones for ticks before a segment boundary, however far apart in time the
+    stages got to them.
+    """
+
+    FIELDS = ("captured", "skipped", "missed", "dropped_convert", "dropped_encode", "duplicated", "encoded")
+
+    def __init__(self, track=False):
+        self._log = [] if track else None
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        for name in self.FIELDS:
+            setattr(self, name, 0)
+
+    def add(self, name, index, n=1):
+        setattr(self, name, getattr(self, name) + n)
+        if self._log is not None:
+            with self._lock:
+                self._log.append((index, name, n))
+
+    def take(self, before):
+        """Counts logged for ticks < ``before`` (all of them for None), removed from the log."""
+        counts = dict.fromkeys(self.FIELDS, 0)
+        with self._lock:
+            log, self._log = self._log, []
+            for entry in log:
+                if before is None or entry[0] < before:
+                    counts[entry[1]] += entry[2]
+                else:
+                    self._log.append(entry)
+        return counts
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    @property
+    def dropped(self):
+        return self.missed + self.dropped_convert + self.dropped_encode
+
+
+def _offer(q, item):
+    """Non-blocking put; returns False if the queue is full."""
+    try:
+        q.put_nowait(item)
+        return True
+    except queue.Full:
+        return False
+
+
+class CaptureStage(threading.Thread):
+    """Grabs a frame on every tick of a fixed clock and hands it on.
+
+    The clock runs on ``perf_counter`` deadlines and never waits for later
+    stages: if the convert queue is full the frame is dropped, and ticks
+    missed because a grab overran are skipped. Both are counted.
+    """
+
+    def __init__(self, source, fps, out_queue, stats, stop_event):
+        super().__init__(name="Capture", daemon=True)
+        self.source = source
+        self.fps = fps
+        self.out_queue = out_queue
+        self.stats = stats
+        self.stop_event = stop_event
+
+    def run(self):
+        interval = 1.0 / self.fps
+        self.source.open()  # grab handles are per thread (mss)
+        try:
+            start = time.perf_counter()
+            index = 0
+            while not self.stop_event.is_set():
+                due = start + index * interval
+                sleep_until(due)
+                t0 = time.perf_counter()
+                data = self.source.grab()
+                grab = time.perf_counter() - t0
+                self.stats.add("captured", index)
+                if not _offer(self.out_queue, Frame(index, due, data, grab)):
+                    self.stats.add("dropped_convert", index)
+
+                # Next tick on the grid; ticks already in the past are missed
+                index += 1
+                behind = int((time.perf_counter() - (start + index * interval)) / interval)
+                for _ in range(behind):
+                    self.stats.add("missed", index)
+                    index += 1
+        finally:
+            self.source.close()
+            self.out_queue.put(_STOP)
+
+
+class ConvertStage(threading.Thread):
+    """Runs ``convert(data)`` on each frame (colour conversion, resize).
+
+    A frame is dropped before conversion when the encode queue is full, so
+    no work is wasted and ``convert`` may write into a fixed buffer pool: at
+    most ``queue_size + 3`` converted frames are referenced at any time.
+    With a ``detector`` (idle.ChangeDetector), frames identical to the last
+    kept one are skipped before any conversion work, as are ticks that are
+    not a multiple of ``keep_every`` (lowered frame rate). ``release(frame)``
+    is called once the input buffer is no longer needed (shared memory slots);
+    when ``convert`` hands the input buffer itself on, that is left to the
+    encode stage, after the frame is written.
+    ``last_index`` is the last tick that came in, kept or not. Once a tick at
+    or past ``wake_at`` is not passed on, an empty Frame (``data`` None) goes
+    down instead, so the encode stage learns of a segment boundary without
+    waiting for the next changed frame. Frames that come in without data
+    (ticks dropped upstream, see shm_ring) only move the clock on.
+    With a ``timer`` (timing.StageTimer) grab and convert times are recorded;
+    grab times travel with the frame, so capture may run in another process.
+    """
+
+    def __init__(self, convert, in_queue, out_queue, stats, detector=None, release=None, timer=None):
+        super().__init__(name="Convert", daemon=True)
+        self.convert = convert
+        self.in_queue = in_queue
+        self.out_queue = out_queue
+        self.stats = stats
+        self.detector = detector
+        self.release = release
+        self.timer = timer
+        self.keep_every = 1
+        self.last_index = None
+        self.wake_at = None
+        self._woken = None
+
+    def run(self):
+        while True:
+            frame = self.in_queue.get()
+            if frame is _STOP:
+                self.out_queue.put(_STOP)
+                return
+            self.last_index = frame.index
+            if frame.data is None:
+                self._wake(frame)
+                continue
+            if self.timer is not None:
+                self.timer.add("grab", frame.grab)
+            if frame.index % self.keep_every:
+                self.stats.add("skipped", frame.index)
+            elif self.out_queue.full():
+                self.stats.add("dropped_encode", frame.index)
+            elif self.detector is not None and not self.detector.changed(frame.data, frame.t):
+                self.stats.add("skipped", frame.index)
+            else:
+                if self.detector is not None:
+                    self.detector.mark(frame.data, frame.t)
+                t0 = time.perf_counter()
+                data = self.convert(frame.data)
+                if self.timer is not None:
+                    self.timer.add("convert", time.perf_counter() - t0)
+                if self.release is not None and data is not frame.data:
+                    self.release(frame)
+                frame.data = data
+                self.out_queue.put(frame)  # only this thread fills it, so it has room
+                continue
+            if self.release is not None:
+                self.release(frame)
+            self._wake(frame)
+
+    def _wake(self, frame):
+        wake = self.wake_at
+        if wake is not None and frame.index >= wake and self._woken != wake and \
+                _offer(self.out_queue, Frame(frame.index, frame.t, None)):
+            self._woken = wake
+
+
+class EncodeStage(threading.Thread):
+    """Feeds converted frames to the segment writer.
+
+    ``sink`` has ``write(frame)`` and ``close(last_tick)``, where ``last_tick``
+    is the last captured tick (from ``last_tick()``, e.g. the convert stage's
+    ``last_index``; None without it), plus ``tick(index)`` for the empty
+    frames a convert stage with ``wake_at`` sends. Gaps in the tick index
+    are handled according to ``policy`` (see ``DROP_POLICIES``), unless the
+    sink writes timestamps (``sink.vfr``): then a gap simply keeps the
+    previous frame on screen longer, and nothing is duplicated. With a
+    ``timer``, write time ("encode") and tick-to-written latency are recorded.
+    ``release(frame)`` is called for each frame once the sink is done with it,
+    i.e. after the next frame is written (the sink may repeat its previous
+    frame); releasing one the convert stage already released must be harmless.
+    """
+
+    def __init__(self, sink, in_queue, stats, policy="duplicate", timer=None, last_tick=None, release=None):
+        super().__init__(name="Encode", daemon=True)
+        if policy not in DROP_POLICIES:
+            raise ValueError(f"unknown drop policy {policy!r}")
+        self.sink = sink
+        self.in_queue = in_queue
+        self.stats = stats
+        self.policy = policy
+        self.timer = timer
+        self.last_tick = last_tick
+        self.release = release
+        self.error = None
+
+    def run(self):
+        last = None
+        try:
+            while True:
+                frame = self.in_queue.get()
+                if frame is _STOP:
+                    return
+                if frame.data is None:
+                    self.sink.tick(frame.index)
+                    continue
+                if last is not None and self.policy == "duplicate" and not getattr(self.sink, "vfr", False):
+                    for i in range(last.index + 1, frame.index):
+                        self.sink.write(Frame(i, last.t, last.data))
+                        self.stats.add("duplicated", i)
+                t0 = time.perf_counter()
+                self.sink.write(frame)
+                if self.timer is not None:
+                    t1 = time.perf_counter()
+                    self.timer.add("encode", t1 - t0)
+                    self.timer.add("latency", t1 - frame.t)
+                self.stats.add("encoded", frame.index)
+                if last is not None and self.release is not None:
+                    self.release(last)
+                last = frame
+        except Exception as e:
+            # Keep draining so capture and convert can still shut down
+            self.error = e
+            while frame is not _STOP:
+                if self.release is not None:
+                    self.release(frame)
+                frame = self.in_queue.get()
+        finally:
+            self.sink.close(self.last_tick() if self.last_tick is not None else None)
+            if last is not None and self.release is not None:
+                self.release(last)
+
+
+class Pipeline:
+    """capture -> [queue] -> convert -> [queue] -> encode, one thread each."""
+
+    def __init__(self, source, convert, sink, fps, queue_size=8, policy="duplicate", stats=None, detector=None,
+                 timer=None):
+        self.stats = stats if stats is not None else PipelineStats()
+        self.stop_event = threading.Event()
+        convert_queue = queue.Queue(maxsize=queue_size)
+        encode_queue = queue.Queue(maxsize=queue_size)
+        convert_stage = ConvertStage(convert, convert_queue, encode_queue, self.stats, detector, timer=timer)
+        self.stages = [
+            CaptureStage(source, fps, convert_queue, self.stats, self.stop_event),
+            convert_stage,
+            EncodeStage(sink, encode_queue, self.stats, policy, timer=timer,
+                        last_tick=lambda: convert_stage.last_index),
+        ]
+
+    def start(self):
+        for stage in self.stages:
+            stage.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def join(self, timeout=None):
+        for stage in self.stages:
+            stage.join(timeout)
+
+    def is_alive(self):
+        return any(stage.is_alive() for stage in self.stages)
+
+    @property
+    def error(self):
+        return self.stages[-1].error
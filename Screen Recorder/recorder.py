@@ -1,34 +1,78 @@
+import argparse
+import json
 import signal
-import mss
+import sys
 import numpy as np
 import datetime
+import multiprocessing as mp
 import os
+import queue
+import threading
 from PIL import Image
 import time
 import imageio
 
+from capture import make_source
+import manifest
+from adaptive import PRESETS, Level, QualityController, build_ladder
+from idle import ChangeDetector
+from pipeline import DROP_POLICIES, CaptureStage, ConvertStage, EncodeStage, PipelineStats
+from shm_ring import FrameRing, RingReader, RingWriter
+from timing import Reporter, StageTimer
+from writers import CONTAINERS, BoxReducer, BufferPool, Finalizer, RawVideoWriter, bgra_view, container_args
+
 # ---------------- Configuration ----------------
 FPS = 10                     # frames per second
 SEGMENT_DURATION = 60        # seconds per segment
-RESOLUTION = (1280, 720)     # downscale to HD
+RESOLUTION = (1280, 720)     # downscale to HD (None: keep the captured size)
+SOURCES = [                  # one recording per entry, each encoded in its own process:
+    {"monitor": 1},          #   {"monitor": n} - a whole monitor (1 = primary)
+]                            #   {"monitor": n, "region": (left, top, width, height)} - part of one
+                             #   {"window": "title text"} - a window (Windows, or X11 with xdotool)
+                             #   optional keys: "name" (used in file names), "resolution"
 OUTPUT_DIR = "recordings"    # folder to save recordings
+QUEUE_SIZE = 8               # frames buffered between capture, convert and encode
+DROP_POLICY = "duplicate"    # "duplicate" keeps real-time length, "drop" skips lost frames
+WRITER = "ffmpeg"            # "ffmpeg": raw BGRA piped to ffmpeg, "imageio": RGB frames via imageio
+PYTHON_DOWNSCALE = False     # ffmpeg writer: box-reduce by the integer factor in Python first
+                             # (less pipe bandwidth for 4K, more Python CPU)
+IDLE_SKIP = True             # ffmpeg writer: skip unchanged frames, write variable frame rate
+IDLE_ROW_STEP = 4            # compare every Nth row when looking for changes
+HEARTBEAT = 2.0              # seconds: write a frame at least this often, even when idle
+KEYFRAME_INTERVAL = 2.0      # seconds between forced keyframes (seekability)
+CONTAINER = "mp4"            # "mp4"; "fmp4" (fragmented) or "ts" survive a crash and
+                             # can be read while recording
+FRAGMENT_DURATION = 2.0      # fmp4/ts: seconds of video per fragment (and encoder lookahead cap)
+DISK_BUDGET_GB = None        # delete the oldest segments beyond this size (None: keep all)
+PRESET = "medium"            # x264 preset (speed vs. size)
+CRF = 23                     # x264 constant rate factor (higher = smaller, worse)
+THREADS = 0                  # x264 threads per encoder (0 = automatic)
+ADAPTIVE = True              # ffmpeg writer: lower preset, CRF, size, then FPS when the encoder
+                             # falls behind, and raise them again when it has headroom
+STATS_INTERVAL = 10          # seconds between summary lines (0: off)
+SEGMENT_STATS = True         # write <segment>.json with counters and stage timings
+# Every setting above can also be given in a JSON/TOML file (--config) or
+# on the command line; run with --help.
 # -----------------------------------------------
 
-running = True
-writer = None
-segment_start_time = None
-
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+# Settings handed to the encoder processes (they may not inherit module state)
+SETTINGS = ("FPS", "SEGMENT_DURATION", "RESOLUTION", "OUTPUT_DIR", "QUEUE_SIZE", "DROP_POLICY",
+            "WRITER", "PYTHON_DOWNSCALE", "IDLE_SKIP", "IDLE_ROW_STEP", "HEARTBEAT",
+            "KEYFRAME_INTERVAL", "CONTAINER", "FRAGMENT_DURATION", "DISK_BUDGET_GB",
+            "PRESET", "CRF", "THREADS", "ADAPTIVE", "STATS_INTERVAL", "SEGMENT_STATS")
 
-def get_filename():
-    ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    return os.path.join(OUTPUT_DIR, f"screen_{ts}.mp4")
+running = True
 
-def cleanup():
-    global writer
-    if writer is not None:
-        writer.close()
-        print("Segment saved safely.")
+def get_filename(start=None, name=None):
+    ts = (start or datetime.datetime.now()).strftime("%Y%m%d_%H%M%S")
+    prefix = f"screen_{name}_{ts}" if name else f"screen_{ts}"
+    ext = CONTAINERS[CONTAINER]
+    filename = os.path.join(OUTPUT_DIR, f"{prefix}{ext}")
+    n = 1
+    while os.path.exists(filename):  # never reuse the name of a segment still being finalized
+        filename = os.path.join(OUTPUT_DIR, f"{prefix}_{n}{ext}")
+        n += 1
+    return filename
 
 def handle_signal(sig, frame):
     global running
@@ -39,60 +83,414 @@ def handle_signal(sig, frame):
 signal.signal(signal.SIGINT, handle_signal)
 signal.signal(signal.SIGTERM, handle_signal)
 
-def main():
-    global running, writer, segment_start_time
-    with mss.mss() as sct:
-        monitor = sct.monitors[1]
-
-        frame_interval = 1.0 / FPS
-        next_frame_time = time.time()
-
-        try:
-            while running:
-                # Capture screen
-                img = sct.grab(monitor)
-                frame = np.array(img)
-                # Convert BGRA → RGB for imageio
-                frame = frame[:, :, :3][:, :, ::-1]
-                # Resize to target resolution
-                frame = np.array(imageio.core.util.Array(frame))
-                frame_pil = Image.fromarray(frame)
-                frame_pil = frame_pil.resize(RESOLUTION, Image.BILINEAR)
-                frame = np.array(frame_pil)
-
-                # Start new segment if needed
-                if writer is None:
-                    filename = get_filename()
-                    writer = imageio.get_writer(
-                        filename,
-                        fps=FPS,
-                        codec='libx264',        # H.264
-                        macro_block_size=None,  # avoid multiple-of-16 restriction
-                        ffmpeg_params=['-pix_fmt', 'yuv420p']
-                    )
-                    segment_start_time = time.time()
-                    print(f"Segment started: {filename}")
-
-                writer.append_data(frame)
-
-                # Rotate segment
-                if SEGMENT_DURATION and (time.time() - segment_start_time) >= SEGMENT_DURATION:
-                    writer.close()
-                    print(f"Segment saved: {filename}")
-                    writer = None
-                    segment_start_time = None
-
-                # Maintain FPS
-                next_frame_time += frame_interval
-                sleep_time = next_frame_time - time.time()
-                if sleep_time > 0:
-                    time.sleep(sleep_time)
-                else:
-                    next_frame_time = time.time()
-
-        finally:
-            cleanup()
-            print("Recorder stopped.")
+
+def convert_frame(img):
+    # Convert BGRA → RGB for imageio
+    frame = np.array(img)
+    frame = frame[:, :, :3][:, :, ::-1]
+    # Resize to target resolution
+    frame = np.array(imageio.core.util.Array(frame))
+    if RESOLUTION is None:
+        return frame
+    frame_pil = Image.fromarray(frame)
+    frame_pil = frame_pil.resize(RESOLUTION, Image.BILINEAR)
+    return np.array(frame_pil)
+
+
+class RawConverter:
+    """ffmpeg writer path: hands the grabbed BGRA buffer on without copying.
+
+    With PYTHON_DOWNSCALE, frames at least twice RESOLUTION are first box
+    reduced into a preallocated buffer pool (less data through the pipe);
+    ffmpeg still does the final scale and yuv420p conversion. With ``copy``
+    unreduced frames are copied into a pool as well, for callers that reuse
+    the input buffer as soon as it is converted; shared memory ring slots
+    are written from directly and released by the encode stage instead.
+    """
+
+    def __init__(self, copy=False):
+        self.copy = copy
+        self.reducer = None
+        self.pool = None
+        self.checked = False
+
+    def __call__(self, img):
+        frame = bgra_view(img)
+        if not self.checked:
+            self.checked = True
+            h, w = frame.shape[:2]
+            if PYTHON_DOWNSCALE and RESOLUTION is not None:
+                factor = min(w // RESOLUTION[0], h // RESOLUTION[1])
+                if factor >= 2:
+                    self.reducer = BoxReducer(w, h, factor, QUEUE_SIZE + 3)
+            if self.copy and self.reducer is None:
+                self.pool = BufferPool(frame.shape, QUEUE_SIZE + 3)
+        if self.reducer is not None:
+            return self.reducer.reduce(frame)
+        if self.pool is not None:
+            out = self.pool.get()
+            np.copyto(out, frame)
+            return out
+        return frame
+
+
+class SegmentWriter:
+    """Writes frames into SEGMENT_DURATION long files cut on the capture clock.
+
+    Segment k holds exactly ticks [k * n, (k + 1) * n) for n = SEGMENT_DURATION
+    * FPS, split into two files if the quality controller changes encoder
+    settings in between. At a boundary the next writer is opened first and the old one is
+    closed by a background Finalizer, so the encode thread never waits for a
+    file to be flushed and no tick is lost or written twice.
+
+    With IDLE_SKIP the files are variable frame rate: each frame is stamped
+    with its tick relative to the segment start, so skipped idle frames cost
+    nothing. A segment that starts or ends on an idle screen carries the
+    previous frame to its first/last tick, so every segment spans its full
+    duration; the convert stage wakes the writer at each boundary (``tick``),
+    so an idle segment is finished on time rather than at the next change.
+    Per-segment counters come from ``stats.take``: every tick is counted in
+    the segment that holds it.
+    """
+
+    def __init__(self, stats, name=None, controller=None, convert_stage=None, timer=None):
+        self.stats = stats
+        self.timer = timer
+        self.name = name
+        self.controller = controller
+        self.convert_stage = convert_stage  # gets the frame rate divisor
+        self.level = controller.level if controller is not None else Level(PRESET, CRF, 1.0, 1)
+        self.vfr = WRITER == "ffmpeg" and IDLE_SKIP
+        self.segment_ticks = max(1, round(SEGMENT_DURATION * FPS)) if SEGMENT_DURATION else None
+        self.finalizer = Finalizer(self.segment_done)
+        # perf_counter -> wall clock, for file names and logs
+        self.wall_offset = time.time() - time.perf_counter()
+
+        self.writer = None
+        self.filename = None
+        self.clock0 = None  # perf_counter time of tick 0
+        self.start_index = None
+        self.end_index = None
+        self.count = 0      # frames written to the current segment
+        self.last = None    # (index, data) of the last frame written
+        self.frame_size = None
+        self.split = False  # encoder settings changed: start a new file at the next frame
+
+    def wall_time(self, index):
+        return self.clock0 + index / FPS + self.wall_offset
+
+    def pts(self, index):
+        return round((index - self.start_index) * 1000 / FPS)
+
+    def output_size(self):
+        size = RESOLUTION or self.frame_size
+        if self.level.scale == 1.0:
+            return RESOLUTION
+        return tuple(int(n * self.level.scale) // 2 * 2 for n in size)
+
+    def open_writer(self, filename):
+        x264 = ['-preset', self.level.preset, '-crf', str(self.level.crf)]
+        if THREADS:
+            x264 += ['-threads', str(THREADS)]
+        if CONTAINER != "mp4":
+            # Frames sit in x264's lookahead before anything is written; keep it within a fragment
+            x264 += ['-rc-lookahead', str(max(1, min(40, round(FPS * FRAGMENT_DURATION))))]
+        x264 += container_args(CONTAINER, FRAGMENT_DURATION)
+        if WRITER == "ffmpeg":
+            return RawVideoWriter(filename, FPS, self.output_size(), codec='libx264', ffmpeg_params=x264,
+                                  vfr=self.vfr, keyframe_interval=KEYFRAME_INTERVAL)
+        return imageio.get_writer(
+            filename,
+            fps=FPS,
+            codec='libx264',        # H.264
+            macro_block_size=None,  # avoid multiple-of-16 restriction
+            ffmpeg_params=['-pix_fmt', 'yuv420p'] + x264
+        )
+
+    def write(self, frame):
+        # Start new segment if needed
+        if self.writer is None:
+            self.clock0 = frame.t - frame.index / FPS
+            self.frame_size = (frame.data.shape[1], frame.data.shape[0])
+            self.start(frame.index)
+        while self.end_index is not None and frame.index >= self.end_index:
+            self.rotate()
+        if self.split:
+            self.split = False
+            self.rotate(frame.index)
+        self.put(frame.index, frame.data)
+
+        if self.controller is not None:
+            now = time.perf_counter()
+            level = self.controller.observe(now - frame.t,
+                                            self.stats.dropped_convert + self.stats.dropped_encode, now)
+            if level is not None:
+                self.apply(level)
+
+    def tick(self, index):
+        # No new frame, but the clock passed the segment end: rotate now
+        while self.writer is not None and self.end_index is not None and index >= self.end_index:
+            self.rotate()
+
+    def apply(self, level):
+        old, self.level = self.level, level
+        if self.convert_stage is not None:
+            self.convert_stage.keep_every = level.fps_divisor
+        if old._replace(fps_divisor=1) != level._replace(fps_divisor=1):
+            self.split = True
+
+    def put(self, index, data):
+        if self.vfr:
+            if self.count == 0 and index > self.start_index and self.last is not None:
+                # Idle across the boundary: the previous frame is what was on screen at tick 0
+                self.writer.append_data(self.last[1], 0)
+            self.writer.append_data(data, self.pts(index))
+        else:
+            self.writer.append_data(data)
+        self.count += 1
+        self.last = (index, data)
+
+    def start(self, index):
+        self.start_index = index
+        # Segments end on the grid, wherever a split made them start
+        self.end_index = index - index % self.segment_ticks + self.segment_ticks if self.segment_ticks else None
+        wall = datetime.datetime.fromtimestamp(self.wall_time(index))
+        self.filename = get_filename(wall, self.name)
+        self.writer = self.open_writer(self.filename)
+        self.count = 0
+        if self.vfr and self.convert_stage is not None:
+            self.convert_stage.wake_at = self.end_index
+        # Announced right away, so readers can follow a fragmented segment while it is written
+        manifest.append(OUTPUT_DIR, {"started": os.path.basename(self.filename), "source": self.name,
+                                     "start": round(self.wall_time(index), 3)})
+        print(f"Segment started: {self.filename}")
+
+    def rotate(self, boundary=None):
+        # Next writer opens at the boundary tick (default: segment end); the
+        # old one is closed in the background
+        end_index = self.end_index if boundary is None else boundary
+        if self.vfr and self.last is not None and self.last[0] < end_index - 1:
+            # An idle tail still belongs to the old segment: repeat its last frame on the final tick
+            self.put(end_index - 1, self.last[1])
+        self.hand_off(self.writer, end_index)
+        self.start(end_index)
+
+    def hand_off(self, writer, end_index, final=False):
+        counts = self.stats.take(None if final else end_index)
+        if self.count == 0:
+            writer.close()  # nothing captured in this segment (CFR with the drop policy); no file
+            return
+        # The quality controller can change the encoded size between files
+        width, height = getattr(writer, "size", None) or self.last[1].shape[1::-1]
+        entry = {"file": os.path.basename(self.filename), "source": self.name,
+                 "start": round(self.wall_time(self.start_index), 3),
+                 "end": round(self.wall_time(end_index), 3), "frames": self.count, "fps": FPS,
+                 "width": width, "height": height,
+                 "keyframes": [round(t, 3) for t in getattr(writer, "keyframes", [0.0])]}
+        report = None
+        if SEGMENT_STATS:
+            duration = (end_index - self.start_index) / FPS
+            report = {"file": entry["file"], "source": self.name, "start": entry["start"],
+                      "end": entry["end"], "counters": counts,
+                      "fps": {"target": FPS, "captured": round(counts["captured"] / duration, 2),
+                              "written": round((counts["encoded"] + counts["duplicated"]) / duration, 2)},
+                      "encoder": self.level._asdict(),
+                      "stages": self.stage_stats()}
+        self.finalizer.submit(writer, (self.filename, self.start_index, end_index, counts, entry, report))
+
+    def stage_stats(self):
+        if self.timer is None:
+            return {}
+        # One endless segment (SEGMENT_DURATION 0) keeps no period samples: report the rolling window
+        return self.timer.take_period() if self.timer.period else self.timer.summary()
+
+    def segment_done(self, job, error):
+        filename, start, end, seg, entry, report = job
+        if error is not None:
+            print(f"Segment failed: {filename}: {error}")
+            return
+        entry["size"] = os.path.getsize(filename)
+        if report is not None:
+            report["size"] = entry["size"]
+            with open(os.path.splitext(filename)[0] + ".json", "w", encoding="utf-8") as fh:
+                json.dump(report, fh, indent=2)
+        manifest.append(OUTPUT_DIR, entry)
+        if DISK_BUDGET_GB is not None:
+            for name in manifest.enforce_budget(OUTPUT_DIR, DISK_BUDGET_GB * 1024 ** 3):
+                print(f"Segment deleted (disk budget): {name}")
+        ticks = f"ticks {start}-{end - 1}" if end is not None else f"from tick {start}"
+        print(f"Segment saved: {filename} ({ticks}, encoded {seg['encoded']}, skipped {seg['skipped']}, "
+              f"duplicated {seg['duplicated']}, missed {seg['missed']}, "
+              f"dropped {seg['dropped_convert'] + seg['dropped_encode']})")
+
+    def close(self, last_tick=None):
+        # Final segment ends wherever capture stopped: with VFR an idle tail up
+        # to ``last_tick`` (the last captured tick) holds the last frame
+        if self.writer is not None:
+            end = self.last[0] + 1 if self.last is not None else self.start_index
+            if self.vfr and self.last is not None and last_tick is not None and last_tick >= end:
+                while self.end_index is not None and last_tick >= self.end_index:
+                    self.rotate()
+                self.put(last_tick, self.last[1])
+                end = last_tick + 1
+            self.hand_off(self.writer, end, final=True)
+            self.writer = None
+        self.finalizer.shutdown()
+
+
+def run_encoder(name, ring_spec, settings):
+    """Encoder process for one source: ring -> convert -> encode -> segments.
+
+    Stops when the capture side sends the end marker through the ring, so
+    Ctrl+C is left to the parent.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    globals().update(settings)
+    ring = FrameRing.attach(ring_spec)
+    stats = PipelineStats(track=True)
+    reader = RingReader(ring, stats)
+    vfr = WRITER == "ffmpeg" and IDLE_SKIP
+    detector = ChangeDetector(HEARTBEAT, IDLE_ROW_STEP) if vfr else None
+    convert = RawConverter() if WRITER == "ffmpeg" else convert_frame
+    encode_queue = queue.Queue(maxsize=QUEUE_SIZE)
+    timer = StageTimer(period=SEGMENT_STATS and bool(SEGMENT_DURATION))
+    convert_stage = ConvertStage(convert, reader, encode_queue, stats, detector,
+                                 release=reader.release, timer=timer)
+    label = f"[{name}] " if name else ""
+    controller = None
+    if ADAPTIVE and WRITER == "ffmpeg":
+        controller = QualityController(build_ladder(PRESET, CRF, vfr), FPS, depth=encode_queue.qsize,
+                                       capacity=QUEUE_SIZE, log=lambda msg: print(label + msg))
+    sink = SegmentWriter(stats, name, controller, convert_stage, timer)
+    stages = [convert_stage, EncodeStage(sink, encode_queue, stats, DROP_POLICY, timer=timer,
+                                         last_tick=lambda: convert_stage.last_index, release=reader.release)]
+    reporter = Reporter(timer, stats, STATS_INTERVAL, label) if STATS_INTERVAL else None
+    for stage in stages:
+        stage.start()
+    if reporter is not None:
+        reporter.start()
+    for stage in stages:
+        stage.join()
+    if reporter is not None:
+        reporter.stop()
+    ring.close()
+    if stages[-1].error is not None:
+        print(f"{label}Encoder failed: {stages[-1].error}")
+    print(f"{label}Recorder stopped. " + ", ".join(f"{k} {v}" for k, v in stats.as_dict().items()))
+    if stages[-1].error is not None:
+        raise SystemExit(1)
+
+
+def load_config(path):
+    """Settings from a JSON or TOML file; keys are setting names in any case."""
+    if path.lower().endswith(".toml"):
+        import tomllib
+        with open(path, "rb") as fh:
+            raw = tomllib.load(fh)
+    else:
+        with open(path, encoding="utf-8") as fh:
+            raw = json.load(fh)
+    config = {}
+    for key, value in raw.items():
+        key = key.upper()
+        if key not in SETTINGS and key != "SOURCES":
+            raise ValueError(f"{path}: unknown setting {key.lower()!r}")
+        if key == "RESOLUTION" and value is not None:
+            value = tuple(value)
+        config[key] = value
+    return config
+
+
+def parse_resolution(text):
+    if text.lower() in ("native", "none"):
+        return None
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+def parse_args(argv=None):
+    """Config file first, then command line flags on top; returns the settings to change."""
+    parser = argparse.ArgumentParser(description="Record the screen into H.264 segments.")
+    parser.add_argument("--config", metavar="PATH", help="settings file (.json or .toml)")
+    parser.add_argument("--fps", type=float)
+    parser.add_argument("--segment-duration", type=float, metavar="SECONDS")
+    parser.add_argument("--resolution", type=parse_resolution, metavar="WxH", help='output size or "native"')
+    parser.add_argument("--output-dir", metavar="DIR")
+    parser.add_argument("--queue-size", type=int)
+    parser.add_argument("--drop-policy", choices=DROP_POLICIES)
+    parser.add_argument("--writer", choices=("ffmpeg", "imageio"))
+    parser.add_argument("--preset", choices=PRESETS)
+    parser.add_argument("--crf", type=int)
+    parser.add_argument("--threads", type=int, help="x264 threads per encoder (0 = automatic)")
+    parser.add_argument("--container", choices=tuple(CONTAINERS))
+    parser.add_argument("--fragment-duration", type=float, metavar="SECONDS")
+    parser.add_argument("--keyframe-interval", type=float, metavar="SECONDS")
+    parser.add_argument("--disk-budget-gb", type=float)
+    parser.add_argument("--stats-interval", type=float, metavar="SECONDS", help="summary line period (0: off)")
+    parser.add_argument("--no-segment-stats", dest="segment_stats", action="store_false", default=None)
+    parser.add_argument("--no-idle-skip", dest="idle_skip", action="store_false", default=None)
+    parser.add_argument("--no-adaptive", dest="adaptive", action="store_false", default=None)
+    parser.add_argument("--monitor", type=int, action="append", help="record this monitor (repeatable)")
+    parser.add_argument("--window", action="append", help="record the window with this title (repeatable)")
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config) if args.config else {}
+    for key, value in vars(args).items():
+        if key.upper() in SETTINGS and value is not None:
+            config[key.upper()] = value
+    if args.monitor or args.window:
+        config["SOURCES"] = ([{"monitor": n} for n in args.monitor or []] +
+                             [{"window": title} for title in args.window or []])
+    return config
+
+
+def main(argv=None):
+    global running
+    globals().update(parse_args(argv))
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    # Capture stays in this process, one thread per source on its own clock.
+    # Converting and encoding run in one process per source, so several
+    # recordings use several cores; frames reach them through shared memory
+    # rings (shm_ring.py), and a full ring drops frames like a full queue.
+    # ffmpeg is fed straight from the ring, so a ring holds the frames
+    # waiting to be converted, those waiting to be encoded, the one being
+    # written and the previous one (repeated on an idle screen).
+    sources = [make_source(spec) for spec in SOURCES]
+    names = [source.name for source in sources]
+    if len(set(names)) != len(names):
+        raise ValueError(f"source names must be unique, got {names}")
+    multi = len(sources) > 1
+    stop_event = threading.Event()
+    recordings = []
+    try:
+        for spec, source in zip(SOURCES, sources):
+            width, height = source.size
+            ring = FrameRing((height, width, 4), QUEUE_SIZE * 2 + 2)
+            settings = {key: globals()[key] for key in SETTINGS}
+            settings["RESOLUTION"] = spec.get("resolution", RESOLUTION)
+            encoder = mp.Process(target=run_encoder, name=f"Encoder-{source.name}",
+                                 args=(source.name if multi else None, ring.spec(), settings))
+            stats = PipelineStats()
+            capture = CaptureStage(source, FPS, RingWriter(ring, stats), stats, stop_event)
+            recordings.append((source, ring, encoder, capture, stats))
+            print(f"Recording {source.name}: {width}x{height}")
+        for _, _, encoder, capture, _ in recordings:
+            encoder.start()
+            capture.start()
+
+        while running and all(r[2].is_alive() and r[3].is_alive() for r in recordings):
+            time.sleep(0.2)
+    finally:
+        stop_event.set()
+        for source, ring, encoder, capture, stats in recordings:
+            if capture.ident is not None:
+                capture.join()
+            if encoder.pid is not None:
+                encoder.join()
+            ring.close()
+            if multi:
+                print(f"[{source.name}] captured {stats.captured}, missed {stats.missed}, "
+                      f"dropped {stats.dropped_convert}")
 
 if __name__ == "__main__":
     main()
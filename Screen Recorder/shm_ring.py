@@ -0,0 +1,124 @@
+import multiprocessing as mp
+import queue
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from pipeline import _STOP, Frame
+
+
+class FrameRing:
+    """Fixed-size frame slots in one shared memory block, plus two queues.
+
+    ``free`` holds slot numbers the capture side may fill; ``ready`` carries
+    (slot, index, t, grab, counters) for filled slots to the encoder
+    process, which puts the slot back on ``free`` once it has copied or
+    skipped the frame; a tick dropped for want of a free slot is sent with
+    slot None. Only these small tuples cross the process boundary; pixels
+    never get pickled.
+    """
+
+    def __init__(self, shape, slots, name=None):
+        self.shape = tuple(shape)
+        self.slots = slots
+        size = int(np.prod(self.shape)) * slots
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+            self.owner = True
+            self.free = mp.Queue()
+            self.ready = mp.Queue()
+            for i in range(slots):
+                self.free.put(i)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            self.owner = False
+        self.frames = np.ndarray((slots,) + self.shape, dtype=np.uint8, buffer=self.shm.buf)
+
+    def spec(self):
+        """Arguments for attaching from another process (picklable)."""
+        return {"shape": self.shape, "slots": self.slots, "name": self.shm.name,
+                "free": self.free, "ready": self.ready}
+
+    @classmethod
+    def attach(cls, spec):
+        ring = cls(spec["shape"], spec["slots"], name=spec["name"])
+        ring.free = spec["free"]
+        ring.ready = spec["ready"]
+        return ring
+
+    def close(self):
+        self.frames = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+# Capture counters sent along with each tick, as they stand once that tick
+# is counted, so the encoder process can put every capture count in the
+# segment of its tick
+_CAPTURE_FIELDS = ("captured", "missed", "dropped_convert")
+
+
+class RingWriter:
+    """Capture side: queue-like ``put_nowait`` / ``put`` for CaptureStage."""
+
+    def __init__(self, ring, stats):
+        self.ring = ring
+        self.stats = stats
+
+    def put_nowait(self, frame):
+        counters = [getattr(self.stats, name) for name in _CAPTURE_FIELDS]
+        try:
+            slot = self.ring.free.get_nowait()
+        except queue.Empty:
+            # Encoder is behind: the capture stage counts the drop when we raise
+            counters[_CAPTURE_FIELDS.index("dropped_convert")] += 1
+            self.ring.ready.put((None, frame.index, frame.t, frame.grab, tuple(counters)))
+            raise queue.Full
+        np.copyto(self.ring.frames[slot], np.asarray(frame.data))
+        self.ring.ready.put((slot, frame.index, frame.t, frame.grab, tuple(counters)))
+
+    def put(self, item):
+        if item is _STOP:
+            self.ring.ready.put(None)
+        else:
+            self.put_nowait(item)
+
+
+class RingReader:
+    """Encoder side: ``get()`` returns Frames whose data is a view into the ring.
+
+    The view is only valid until ``release(frame)``; ConvertStage calls it
+    once the frame has been skipped or dropped, EncodeStage once a frame
+    passed on as is has been written (a second call is a no-op). A tick
+    the capture side dropped comes out as a Frame with ``data`` None.
+    Capture counts are taken from each tick's stamp and logged against that
+    tick, missed ones against the ticks just before it.
+    """
+
+    def __init__(self, ring, stats):
+        self.ring = ring
+        self.stats = stats
+        self._slots = {}
+
+    def get(self):
+        item = self.ring.ready.get()
+        if item is None:
+            return _STOP
+        slot, index, t, grab, counters = item
+        for name, value in zip(_CAPTURE_FIELDS, counters):
+            n = value - getattr(self.stats, name)
+            if name == "missed":
+                for missed in range(index - n, index):
+                    self.stats.add(name, missed)
+            elif n:
+                self.stats.add(name, index, n)
+        if slot is None:
+            return Frame(index, t, None, grab)
+        self._slots[index] = slot
+        return Frame(index, t, self.ring.frames[slot], grab)
+
+    def release(self, frame):
+        slot = self._slots.pop(frame.index, None)
+        if slot is not None:
+            self.ring.free.put(slot)
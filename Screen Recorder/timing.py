@@ -0,0 +1,102 @@
+import threading
+import time
+from collections import deque
+
+# Stage names, in pipeline order. "latency" is capture tick -> written to the encoder.
+STAGES = ("grab", "convert", "encode", "latency")
+
+
+def summarize(samples):
+    """{count, mean, p50, p95, max} in milliseconds for a list of seconds, or None."""
+    values = sorted(samples)
+    if not values:
+        return None
+    n = len(values)
+    return {
+        "count": n,
+        "mean": sum(values) / n * 1000,
+        "p50": values[int(0.50 * (n - 1))] * 1000,
+        "p95": values[int(0.95 * (n - 1))] * 1000,
+        "max": values[-1] * 1000,
+    }
+
+
+class StageTimer:
+    """Per-stage frame timings from several threads.
+
+    Keeps a bounded rolling window per stage for the periodic summary line,
+    and with ``period`` every sample since the last ``take_period()`` for
+    per-segment stats; leave it off when nothing calls ``take_period()``.
+    """
+
+    def __init__(self, window=600, period=False):
+        self.window = window
+        self.period = period
+        self._samples = {name: deque(maxlen=window) for name in STAGES}
+        self._period = {name: [] for name in STAGES} if period else None
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            self._samples[stage].append(seconds)
+            if self._period is not None:
+                self._period[stage].append(seconds)
+
+    def summary(self):
+        """{stage: {count, mean, p50, p95, max}} over the rolling window, times in ms."""
+        with self._lock:
+            samples = {stage: list(self._samples[stage]) for stage in STAGES}
+        result = {}
+        for stage in STAGES:
+            s = summarize(samples[stage])
+            if s is not None:
+                result[stage] = s
+        return result
+
+    def take_period(self):
+        """Summary of all samples since the previous call, then start a new period."""
+        if self._period is None:
+            return {}
+        with self._lock:
+            period, self._period = self._period, {name: [] for name in STAGES}
+        return {stage: s for stage, s in ((k, summarize(v)) for k, v in period.items()) if s is not None}
+
+
+class Reporter(threading.Thread):
+    """Prints one summary line every ``interval`` seconds until ``stop()``.
+
+    Frame rates come from the PipelineStats counters, stage times from the
+    StageTimer's rolling window.
+    """
+
+    def __init__(self, timer, stats, interval, label="", log=print):
+        super().__init__(name="Reporter", daemon=True)
+        self.timer = timer
+        self.stats = stats
+        self.interval = interval
+        self.label = label
+        self.log = log
+        self._done = threading.Event()
+
+    def run(self):
+        last, last_t = self.stats.as_dict(), time.perf_counter()
+        while not self._done.wait(self.interval):
+            now, now_t = self.stats.as_dict(), time.perf_counter()
+            d = {k: now[k] - last[k] for k in now}
+            elapsed = now_t - last_t
+            last, last_t = now, now_t
+            self.log(f"{self.label}{self.format_line(d, elapsed)}")
+
+    def format_line(self, d, elapsed):
+        dropped = d["missed"] + d["dropped_convert"] + d["dropped_encode"]
+        written = d["encoded"] + d["duplicated"]
+        line = (f"capture {d['captured'] / elapsed:.1f} fps, written {written / elapsed:.1f} fps "
+                f"(skipped {d['skipped']}, dropped {dropped})")
+        stages = self.timer.summary()
+        if stages:
+            line += " | p50/p95 " + ", ".join(f"{name} {s['p50']:.1f}/{s['p95']:.1f} ms"
+                                              for name, s in stages.items())
+        return line
+
+    def stop(self):
+        self._done.set()
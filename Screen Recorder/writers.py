@@ -0,0 +1,280 @@
+import queue
+import shutil
+import struct
+import subprocess
+import sys
+import threading
+
+import numpy as np
+
+
+def ffmpeg_exe():
+    """The ffmpeg binary bundled with imageio-ffmpeg, else the one on PATH."""
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except (ImportError, RuntimeError):
+        exe = shutil.which("ffmpeg")
+        if exe is None:
+            raise RuntimeError("ffmpeg not found: install imageio-ffmpeg or put ffmpeg on PATH")
+        return exe
+
+
+# Segment containers and their file extensions
+CONTAINERS = {"mp4": ".mp4", "fmp4": ".mp4", "ts": ".ts"}
+
+
+def container_args(container, fragment_duration=2.0):
+    """ffmpeg output options for a segment container.
+
+    "mp4" writes its index only when the file is closed, so a killed
+    encoder leaves an unplayable file. "fmp4" (fragmented MP4, a fragment
+    at each keyframe and at least every ``fragment_duration`` seconds) and
+    "ts" (MPEG-TS) are playable up to the last data written and can be read
+    while still being recorded.
+    """
+    if container == "mp4":
+        return []
+    if container == "fmp4":
+        return ["-movflags", "+frag_keyframe+empty_moov+default_base_moof",
+                "-frag_duration", str(int(fragment_duration * 1e6)), "-flush_packets", "1"]
+    if container == "ts":
+        return ["-f", "mpegts", "-flush_packets", "1"]
+    raise ValueError(f"unknown container {container!r}, expected one of {tuple(CONTAINERS)}")
+
+
+# Keep Ctrl+C in the terminal away from ffmpeg: the recorder closes its
+# input on shutdown, and ffmpeg must live long enough to finish the file
+if sys.platform == "win32":
+    _DETACH = {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+else:
+    _DETACH = {"start_new_session": True}
+
+
+def bgra_view(img):
+    """(h, w, 4) uint8 view over an mss ScreenShot's BGRA buffer, no copy."""
+    if isinstance(img, np.ndarray):
+        return img
+    width, height = img.size
+    frame = np.frombuffer(img.raw, dtype=np.uint8)
+    stride = len(img.raw) // (height * 4)  # rows can be padded on some platforms
+    return frame.reshape(height, stride, 4)[:, :width]
+
+
+class BufferPool:
+    """Fixed set of preallocated frame buffers handed out round-robin.
+
+    ``count`` must exceed the number of frames that can be in flight at once
+    (queued, being encoded, held for duplication), or a buffer is reused
+    while still referenced.
+    """
+
+    def __init__(self, shape, count, dtype=np.uint8):
+        self._buffers = [np.empty(shape, dtype=dtype) for _ in range(count)]
+        self._next = 0
+
+    def get(self):
+        buf = self._buffers[self._next]
+        self._next = (self._next + 1) % len(self._buffers)
+        return buf
+
+
+class BoxReducer:
+    """Integer-factor box downscale into preallocated buffers.
+
+    Averages ``factor`` x ``factor`` pixel blocks with numpy ufuncs writing
+    into fixed accumulators, so no per-frame arrays are allocated. Used to
+    cut pipe bandwidth (e.g. 4K -> 1080p) before ffmpeg does the final scale.
+    """
+
+    def __init__(self, src_w, src_h, factor, pool_size):
+        self.factor = factor
+        self.width, self.height = src_w // factor, src_h // factor
+        shape = (self.height, self.width, 4)
+        self._acc = np.empty(shape, dtype=np.uint16)
+        self._shift = factor.bit_length() * 2 - 2 if factor & (factor - 1) == 0 else None
+        self.pool = BufferPool(shape, pool_size)
+
+    def reduce(self, frame):
+        f, h, w = self.factor, self.height, self.width
+        acc = self._acc
+        np.copyto(acc, frame[0:h * f:f, 0:w * f:f])
+        for dy in range(f):
+            for dx in range(f):
+                if dx or dy:
+                    np.add(acc, frame[dy:h * f:f, dx:w * f:f], out=acc)
+        out = self.pool.get()
+        if self._shift is not None:
+            np.right_shift(acc, self._shift, out=out, casting="unsafe")
+        else:
+            np.floor_divide(acc, f * f, out=out, casting="unsafe")
+        return out
+
+
+# --- MATROSKA FRAMING ---
+# Just enough EBML to hand ffmpeg raw BGRA frames with their own timestamps
+# (V_UNCOMPRESSED, 1 ms timecodes, live stream of unknown length).
+
+_UNKNOWN_SIZE = b"\x01\xff\xff\xff\xff\xff\xff\xff"
+_CLUSTER_SPAN_MS = 30000  # SimpleBlock timecodes are int16 relative to the cluster
+
+
+def _ebml_size(n):
+    for length in range(1, 8):
+        if n < (1 << (7 * length)) - 1:
+            return ((1 << (7 * length)) | n).to_bytes(length, "big")
+    return ((1 << 56) | n).to_bytes(8, "big")
+
+
+def _element(eid, payload):
+    return eid + _ebml_size(len(payload)) + payload
+
+
+def _uint(eid, value):
+    return _element(eid, value.to_bytes(max(1, (value.bit_length() + 7) // 8), "big"))
+
+
+def _text(eid, value):
+    return _element(eid, value.encode("ascii"))
+
+
+def _matroska_header(width, height):
+    ebml = _element(b"\x1a\x45\xdf\xa3",
+                    _uint(b"\x42\x86", 1) + _uint(b"\x42\xf7", 1) + _uint(b"\x42\xf2", 4) +
+                    _uint(b"\x42\xf3", 8) + _text(b"\x42\x82", "matroska") +
+                    _uint(b"\x42\x87", 4) + _uint(b"\x42\x85", 2))
+    info = _element(b"\x15\x49\xa9\x66",
+                    _uint(b"\x2a\xd7\xb1", 1000000) +  # TimecodeScale: 1 ms
+                    _text(b"\x4d\x80", "recorder") + _text(b"\x57\x41", "recorder"))
+    video = _element(b"\xe0", _uint(b"\xb0", width) + _uint(b"\xba", height) +
+                     _element(b"\x2e\xb5\x24", b"BGRA"))  # ColourSpace fourcc
+    track = _element(b"\xae", _uint(b"\xd7", 1) + _uint(b"\x73\xc5", 1) + _uint(b"\x83", 1) +
+                     _text(b"\x86", "V_UNCOMPRESSED") + video)
+    return ebml + b"\x18\x53\x80\x67" + _UNKNOWN_SIZE + info + _element(b"\x16\x54\xae\x6b", track)
+
+
+class RawVideoWriter:
+    """Streams raw BGRA frames into an ffmpeg subprocess over stdin.
+
+    Scaling to ``out_size`` and conversion to yuv420p happen inside ffmpeg,
+    so Python only hands over the captured buffer. Frames are (h, w, 4)
+    uint8 arrays; the input size is taken from the first frame.
+
+    With ``vfr`` each frame carries its own timestamp (``pts`` in ms), so
+    unchanged frames need not be sent at all: frames are wrapped in a
+    minimal Matroska stream and ffmpeg keeps their timing. A keyframe is
+    forced every ``keyframe_interval`` seconds to keep the file seekable;
+    ``keyframes`` lists their times (seconds) as ffmpeg will place them.
+    ``size`` is the encoded (width, height), known once the first frame is in.
+    """
+
+    def __init__(self, filename, fps, out_size, codec="libx264", ffmpeg_params=(),
+                 vfr=False, keyframe_interval=None):
+        self.filename = filename
+        self.fps = fps
+        self.out_size = out_size
+        self.codec = codec
+        self.ffmpeg_params = list(ffmpeg_params)
+        self.vfr = vfr
+        self.keyframe_interval = keyframe_interval
+        self.proc = None
+        self.in_size = None
+        self.size = None
+        self.last_pts = None
+        self.frames = 0
+        self.keyframes = []
+        self._cluster = None
+
+    def _open(self, width, height):
+        self.in_size = (width, height)
+        cmd = [ffmpeg_exe(), "-hide_banner", "-loglevel", "error", "-y"]
+        if self.vfr:
+            cmd += ["-f", "matroska", "-i", "-", "-an", "-fps_mode", "passthrough"]
+        else:
+            cmd += ["-f", "rawvideo", "-pix_fmt", "bgra", "-s", f"{width}x{height}",
+                    "-framerate", str(self.fps), "-i", "-", "-an"]
+        # yuv420p needs even dimensions; native-size output is rounded down
+        out_size = tuple(self.out_size) if self.out_size else (width // 2 * 2, height // 2 * 2)
+        self.size = out_size
+        if out_size != self.in_size:
+            cmd += ["-vf", "scale={}:{}:flags=bilinear".format(*out_size)]
+        if self.keyframe_interval:
+            cmd += ["-force_key_frames", f"expr:gte(t,n_forced*{self.keyframe_interval})"]
+        cmd += ["-c:v", self.codec, "-pix_fmt", "yuv420p"] + self.ffmpeg_params + [self.filename]
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, **_DETACH)
+        if self.vfr:
+            self.proc.stdin.write(_matroska_header(width, height))
+
+    def append_data(self, frame, pts=None):
+        """Write one frame; ``pts`` (ms from segment start) is required with ``vfr``."""
+        if self.proc is None:
+            self._open(frame.shape[1], frame.shape[0])
+        elif (frame.shape[1], frame.shape[0]) != self.in_size:
+            raise ValueError(f"frame size changed from {self.in_size} to {frame.shape[1::-1]}")
+        if not frame.flags.c_contiguous:
+            frame = np.ascontiguousarray(frame)  # padded rows only
+        data = memoryview(frame).cast("B")
+
+        stdin = self.proc.stdin
+        if self.vfr:
+            if self._cluster is None or pts - self._cluster >= _CLUSTER_SPAN_MS:
+                self._cluster = pts
+                stdin.write(b"\x1f\x43\xb6\x75" + _UNKNOWN_SIZE + _uint(b"\xe7", pts))
+            # SimpleBlock: track 1, int16 relative timecode, keyframe flag
+            block = b"\x81" + struct.pack(">hB", pts - self._cluster, 0x80)
+            stdin.write(b"\xa3" + _ebml_size(len(block) + len(data)) + block)
+            self.last_pts = pts
+        stdin.write(data)
+
+        # Same rule as -force_key_frames in _open; the first frame is always a keyframe
+        t = pts / 1000 if self.vfr else self.frames / self.fps
+        if not self.keyframes or (self.keyframe_interval and
+                                  t >= len(self.keyframes) * self.keyframe_interval):
+            self.keyframes.append(t)
+        self.frames += 1
+
+    def close(self):
+        if self.proc is None:
+            return
+        self.proc.stdin.close()
+        code = self.proc.wait()
+        self.proc = None
+        if code != 0:
+            raise RuntimeError(f"ffmpeg exited with status {code} writing {self.filename}")
+
+
+class Finalizer(threading.Thread):
+    """Closes finished segment writers off the encode thread.
+
+    Closing flushes the encoder and writes the mp4 index, which can take a
+    while; meanwhile the next segment's writer is already taking frames.
+    ``done(job, error)`` is called after each close.
+    """
+
+    def __init__(self, done=None):
+        super().__init__(name="Finalizer", daemon=True)
+        self.done = done
+        self._jobs = queue.Queue()
+        self.start()
+
+    def submit(self, writer, job=None):
+        self._jobs.put((writer, job))
+
+    def run(self):
+        while True:
+            item = self._jobs.get()
+            if item is None:
+                return
+            writer, job = item
+            error = None
+            try:
+                writer.close()
+            except Exception as e:
+                error = e
+            if self.done is not None:
+                self.done(job, error)
+
+    def shutdown(self):
+        """Finish all pending closes and stop the thread."""
+        self._jobs.put(None)
+        self.join()
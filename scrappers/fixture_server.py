@@ -0,0 +1,200 @@
+"""Local stand-in for the Steam store pages steamlic.py visits, for offline runs.
+
+Usage: python fixture_server.py [--port 8000] [--accounts 20] [--licenses 50] [--delay 0.2]
+Then:  python steamlic.py --base-url http://127.0.0.1:8000 --accounts fixture_accounts.json
+
+Serves a login page shaped like the real one (a search box and search
+button ahead of the login form), a licenses page with ``table.account_table``
+behind a session cookie, and the page's ``Logout()`` function. Accounts are
+generated as userNNN / passNNN with a reproducible set of licenses each.
+"""
+import argparse
+import base64
+import html
+import json
+import random
+import secrets
+import sys
+import threading
+import time
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+SESSION_COOKIE = "steamLoginSecure"
+ACQUISITIONS = ("Steam Store", "Steam Store", "Retail", "Complimentary", "Gift/Guest Pass")
+
+LOGOUT_SCRIPT = """<script>
+function Logout() {
+  fetch('/logout', {method: 'POST'}).then(function () { window.location.href = '/login'; });
+}
+</script>"""
+
+LOGIN_PAGE = """<!DOCTYPE html>
+<html><head><title>Sign In</title>{logout}</head><body>
+<form id="store_search" action="/search" method="get">
+  <input type="text" name="term" value="" placeholder="search">
+  <button type="submit">Search</button>
+</form>
+<form id="login_form" action="/login" method="post">
+  <input type="text" name="username" value="">
+  <input type="text" value="" tabindex="-1" style="display:none">
+  <input type="password" name="password">
+  <button type="submit">Sign in</button>
+</form>
+{error}
+</body></html>"""
+
+LICENSES_PAGE = """<!DOCTYPE html>
+<html><head><title>Licenses and product key activations</title>{logout}</head><body>
+<div class="account_name">{username}</div>
+<table class="account_table">
+<tbody>
+<tr><th class="license_date_col">Date</th><th>Item</th><th class="license_acquisition_col">Acquisition method</th></tr>
+{rows}
+</tbody>
+</table>
+</body></html>"""
+
+
+def make_licenses(username, count):
+    """Reproducible (date, item, acquisition) rows for one account."""
+    rng = random.Random(username)
+    rows = []
+    for i in range(count):
+        day = rng.randrange(1, 28)
+        month = rng.choice(("Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"))
+        rows.append((f"{day} {month}, {rng.randrange(2010, 2025)}", f"Game {rng.randrange(1, 100000)}",
+                     rng.choice(ACQUISITIONS)))
+    return rows
+
+
+def make_accounts(n, licenses):
+    """{username: {"password": ..., "licenses": [...]}} for userNNN / passNNN."""
+    return {f"user{i:03d}": {"password": f"pass{i:03d}", "licenses": make_licenses(f"user{i:03d}", licenses)}
+            for i in range(1, n + 1)}
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    server_version = "SteamFixture/1.0"
+
+    def log_message(self, fmt, *args):
+        if self.server.verbose:
+            super().log_message(fmt, *args)
+
+    def _session_user(self):
+        cookie = SimpleCookie(self.headers.get("Cookie", ""))
+        morsel = cookie.get(SESSION_COOKIE)
+        return self.server.sessions.get(morsel.value) if morsel else None
+
+    def _send(self, status, body="", headers=()):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _redirect(self, location, headers=()):
+        self._send(302, "", [("Location", location)] + list(headers))
+
+    def do_GET(self):
+        time.sleep(self.server.delay)
+        path = self.path.split("?")[0]
+        if path in ("/", "/login", "/login/"):
+            if path == "/" and self._session_user():
+                self._send(200, f"<html><head>{LOGOUT_SCRIPT}</head><body>Store front</body></html>")
+            elif path == "/":
+                self._redirect("/login")
+            else:
+                self._send(200, LOGIN_PAGE.format(logout=LOGOUT_SCRIPT, error=""))
+        elif path == "/account/licenses/":
+            user = self._session_user()
+            if user is None:
+                self._redirect("/login")
+                return
+            rows = "\n".join(
+                f'<tr><td class="license_date_col">{html.escape(date)}</td><td>{html.escape(item)}</td>'
+                f'<td class="license_acquisition_col">{html.escape(acq)}</td></tr>'
+                for date, item, acq in self.server.accounts[user]["licenses"])
+            self._send(200, LICENSES_PAGE.format(logout=LOGOUT_SCRIPT, username=user, rows=rows))
+        else:
+            self._send(404, "<html><body>Not found</body></html>")
+
+    def do_POST(self):
+        time.sleep(self.server.delay)
+        length = int(self.headers.get("Content-Length") or 0)
+        form = parse_qs(self.rfile.read(length).decode("utf-8"))
+        if self.path == "/login":
+            username = form.get("username", [""])[0]
+            account = self.server.accounts.get(username)
+            if account is None or form.get("password", [""])[0] != account["password"]:
+                error = '<div id="login_error">The account name or password that you have entered is incorrect.</div>'
+                self._send(200, LOGIN_PAGE.format(logout=LOGOUT_SCRIPT, error=error))
+                return
+            token = secrets.token_hex(16)
+            self.server.sessions[token] = username
+            self._redirect("/", [("Set-Cookie", f"{SESSION_COOKIE}={token}; Path=/; HttpOnly")])
+        elif self.path == "/logout":
+            cookie = SimpleCookie(self.headers.get("Cookie", ""))
+            if SESSION_COOKIE in cookie:
+                self.server.sessions.pop(cookie[SESSION_COOKIE].value, None)
+            self._send(200, "", [("Set-Cookie", f"{SESSION_COOKIE}=; Path=/; Max-Age=0")])
+        else:
+            self._send(404, "")
+
+
+def make_server(accounts, host="127.0.0.1", port=8000, delay=0.0, verbose=False):
+    """ThreadingHTTPServer for ``accounts`` (see make_accounts); port 0 picks a free port."""
+    server = ThreadingHTTPServer((host, port), FixtureHandler)
+    server.accounts = accounts
+    server.sessions = {}
+    server.delay = delay
+    server.verbose = verbose
+    return server
+
+
+def start_background(accounts, **kw):
+    """Serve on a daemon thread; returns (server, base_url). Stop with server.shutdown()."""
+    server = make_server(accounts, **kw)
+    threading.Thread(target=server.serve_forever, name="FixtureServer", daemon=True).start()
+    host, port = server.server_address[:2]
+    return server, f"http://{host}:{port}"
+
+
+def write_accounts_file(accounts, path):
+    """accounts.json in the format steamlic.py reads (base64 passwords)."""
+    data = {user: base64.b64encode(a["password"].encode()).decode() for user, a in accounts.items()}
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(data, fh, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve fixture Steam login and licenses pages.")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--accounts", type=int, default=20, help="number of fixture accounts")
+    parser.add_argument("--licenses", type=int, default=50, help="licenses per account")
+    parser.add_argument("--delay", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--accounts-file", default="fixture_accounts.json",
+                        help="where to write the matching accounts.json")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args(argv)
+
+    accounts = make_accounts(args.accounts, args.licenses)
+    write_accounts_file(accounts, args.accounts_file)
+    server = make_server(accounts, port=args.port, delay=args.delay, verbose=args.verbose)
+    print(f"Serving {len(accounts)} fixture accounts on http://127.0.0.1:{server.server_address[1]} "
+          f"(accounts file: {args.accounts_file})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+from html.parser import HTMLParser
+from http.cookiejar import DefaultCookiePolicy
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Sent with every request; some pages differ for clients that don't look like a browser
+USER_AGENT = ("Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+              "(KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36")
+
+
+class LicensesTableParser(HTMLParser):
+    """Rows of the first ``table.account_table`` in the shape TABLE_ROWS_JS returns:
+    (acquisition cell text or None, [text of every td]) per ``tbody tr``.
+
+    ``found`` tells a page without the table (the login page) from an empty one.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.found = False
+        self.rows = []
+        self._depth = 0        # open <table> elements inside the licenses table
+        self._done = False
+        self._in_head = False  # inside <thead>/<tfoot>; rows outside any section count as tbody
+        self._row = None       # [acquisition, cells] of the open <tr>
+        self._cell = None      # text parts of the open <td>
+        self._acq_cell = False
+
+    def handle_starttag(self, tag, attrs):
+        if self._done:
+            return
+        if tag == "table":
+            if self._depth:
+                self._depth += 1
+            elif "account_table" in (dict(attrs).get("class") or "").split():
+                self.found = True
+                self._depth = 1
+            return
+        if self._depth != 1:
+            return
+        if tag in ("thead", "tfoot"):
+            self._end_row()
+            self._in_head = True
+        elif tag == "tbody":
+            self._end_row()
+            self._in_head = False
+        elif tag == "tr" and not self._in_head:
+            self._end_row()
+            self._row = [None, []]
+        elif tag == "td" and self._row is not None:
+            self._end_cell()
+            self._cell = []
+            self._acq_cell = "license_acquisition_col" in (dict(attrs).get("class") or "").split()
+        elif tag == "br" and self._cell is not None:
+            self._cell.append("\n")
+
+    def handle_endtag(self, tag):
+        if not self._depth:
+            return
+        if tag == "table":
+            self._depth -= 1
+            if not self._depth:
+                self._end_row()
+                self._done = True
+        elif self._depth != 1:
+            return
+        elif tag == "td":
+            self._end_cell()
+        elif tag == "tr":
+            self._end_row()
+        elif tag in ("thead", "tbody", "tfoot"):
+            self._end_row()
+            self._in_head = False
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell.append(data)
+
+    def _end_cell(self):
+        if self._cell is None:
+            return
+        # Whitespace collapsed per line, as a browser's innerText would show it
+        text = "\n".join(" ".join(line.split()) for line in "".join(self._cell).split("\n")).strip()
+        self._row[1].append(text)
+        if self._acq_cell and self._row[0] is None:
+            self._row[0] = text
+        self._cell = None
+
+    def _end_row(self):
+        self._end_cell()
+        if self._row is not None:
+            self.rows.append(tuple(self._row))
+            self._row = None
+
+
+def parse_licenses_table(page):
+    """Table rows from a licenses page's HTML, or None if the page has no licenses table."""
+    parser = LicensesTableParser()
+    parser.feed(page)
+    parser.close()
+    return parser.rows if parser.found else None
+
+
+class LicensePageClient:
+    """Fetches licenses pages over plain HTTP with cookies taken from a logged-in browser.
+
+    One requests.Session, safe to share between threads: its connection pool
+    keeps up to ``pool_size`` keep-alive connections to the store open. Each
+    account's cookies go out with its own request only; the session's cookie
+    jar accepts nothing, so one account's Set-Cookie never reaches another's
+    request.
+    """
+
+    def __init__(self, base_url, pool_size=16, timeout=30):
+        self.base_url = base_url
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        self.session.headers["User-Agent"] = USER_AGENT
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def fetch_page(self, cookies):
+        """HTML of /account/licenses/ for the session in ``cookies`` (WebDriver cookie dicts),
+        or None if the store sends it to the login page instead."""
+        header = "; ".join(f"{c['name']}={c['value']}" for c in cookies)
+        response = self.session.get(f"{self.base_url}/account/licenses/", headers={"Cookie": header},
+                                    allow_redirects=False, timeout=self.timeout)
+        if response.is_redirect or response.status_code in (401, 403):
+            return None
+        response.raise_for_status()
+        return response.text
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,100 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import Counter, namedtuple
+
+# --- SCHEMA ---
+# accounts: one row per account, with a hash of its sorted licenses
+# licenses: one row per (account, license); ``license`` is the table row's
+# cells, one per line (what the txt files held), split into date / item /
+# acquisition for queries such as
+#   SELECT item, SUM(copies) FROM licenses GROUP BY item ORDER BY 2 DESC
+# ``copies`` counts identical rows (the same package granted twice on one
+# day), so SUM(copies) per account is what the licenses page listed.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS accounts (
+    username TEXT PRIMARY KEY,
+    hash TEXT NOT NULL,
+    licenses INTEGER NOT NULL,
+    updated REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS licenses (
+    username TEXT NOT NULL,
+    license TEXT NOT NULL,
+    date TEXT,
+    item TEXT,
+    acquisition TEXT,
+    first_seen REAL NOT NULL,
+    copies INTEGER NOT NULL DEFAULT 1,
+    PRIMARY KEY (username, license)
+);
+"""
+
+# What update() found: a first run for the account, and the licenses added / removed since the
+# last one (a license listed twice as often as before is in ``added`` once more)
+Change = namedtuple("Change", "new added removed")
+
+
+def content_hash(licenses):
+    return hashlib.sha256("\n\n".join(sorted(licenses)).encode("utf-8")).hexdigest()
+
+
+def split_license(license):
+    """(date, item, acquisition) from a license's lines; the item is everything between."""
+    lines = license.split("\n")
+    if len(lines) < 3:
+        return None, license, None
+    return lines[0], "\n".join(lines[1:-1]), lines[-1]
+
+
+class ResultStore:
+    """Licenses per account in one SQLite file, updated incrementally.
+
+    An account whose licenses hash the same as last time is not written at
+    all; otherwise only the added and removed licenses are, in one
+    transaction. One connection shared by the worker threads, behind a lock.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(SCHEMA)
+        columns = [r[1] for r in self._db.execute("PRAGMA table_info(licenses)")]
+        if "copies" not in columns:  # database from before duplicates were counted
+            with self._db:
+                self._db.execute("ALTER TABLE licenses ADD COLUMN copies INTEGER NOT NULL DEFAULT 1")
+
+    def update(self, username, matches):
+        """Store ``username``'s licenses; returns a Change, or None if they are unchanged.
+
+        Identical rows in ``matches`` are kept as copies of one license, so
+        the stored total always equals ``len(matches)``.
+        """
+        licenses = Counter(matches)
+        digest = content_hash(matches)
+        with self._lock:
+            row = self._db.execute("SELECT hash FROM accounts WHERE username = ?", (username,)).fetchone()
+            if row is not None and row[0] == digest:
+                return None
+            old = dict(self._db.execute("SELECT license, copies FROM licenses WHERE username = ?", (username,)))
+            added = [lic for lic in sorted(licenses) for _ in range(licenses[lic] - old.get(lic, 0))]
+            removed = [lic for lic in sorted(old) for _ in range(old[lic] - licenses[lic])]
+            now = time.time()
+            with self._db:
+                self._db.executemany("DELETE FROM licenses WHERE username = ? AND license = ?",
+                                     [(username, lic) for lic in old if lic not in licenses])
+                self._db.executemany("UPDATE licenses SET copies = ? WHERE username = ? AND license = ?",
+                                     [(n, username, lic) for lic, n in licenses.items()
+                                      if lic in old and old[lic] != n])
+                self._db.executemany("INSERT INTO licenses VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                     [(username, lic, *split_license(lic), now, n)
+                                      for lic, n in licenses.items() if lic not in old])
+                self._db.execute("INSERT OR REPLACE INTO accounts VALUES (?, ?, ?, ?)",
+                                 (username, digest, len(matches), now))
+            return Change(row is None, added, removed)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
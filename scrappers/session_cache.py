@@ -0,0 +1,73 @@
+import json
+import os
+import threading
+import time
+
+from cryptography.fernet import Fernet, InvalidToken
+
+KEY_ENV = "STEAMLIC_CACHE_KEY"  # Fernet key; otherwise read from (or created in) the key file
+
+# Cookie fields WebDriver's add_cookie accepts
+COOKIE_FIELDS = ("name", "value", "domain", "path", "secure", "httpOnly", "expiry", "sameSite")
+
+
+def load_key(key_path):
+    key = os.environ.get(KEY_ENV)
+    if key:
+        return key.encode()
+    try:
+        with open(key_path, "rb") as fh:
+            return fh.read().strip()
+    except FileNotFoundError:
+        key = Fernet.generate_key()
+        fd = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(fd, "wb") as fh:
+            fh.write(key)
+        return key
+
+
+class SessionCache:
+    """Per-account browser cookies, kept in one Fernet-encrypted file.
+
+    The whole cache is decrypted once on load and re-encrypted on every
+    change (written to a temporary file, then renamed, so a crash never
+    leaves a half-written cache). The key comes from $STEAMLIC_CACHE_KEY
+    or a key file created next to the cache with owner-only permissions.
+    A cache that cannot be decrypted (other key, corrupted) starts empty.
+    """
+
+    def __init__(self, path, key_path=None):
+        self.path = path
+        self.fernet = Fernet(load_key(key_path or os.path.splitext(path)[0] + ".key"))
+        self._lock = threading.Lock()
+        self._entries = {}
+        try:
+            with open(path, "rb") as fh:
+                self._entries = json.loads(self.fernet.decrypt(fh.read()))
+        except FileNotFoundError:
+            pass
+        except (InvalidToken, ValueError):
+            print(f"Session cache {path} could not be decrypted; starting with an empty cache.")
+
+    def get(self, username):
+        """Saved entry for ``username`` ({"cookies", "saved", "login_seconds"}), or None."""
+        with self._lock:
+            return self._entries.get(username)
+
+    def put(self, username, cookies, login_seconds=None):
+        """Save cookies after a login that took ``login_seconds`` (reported as time saved on reuse)."""
+        cookies = [{k: c[k] for k in COOKIE_FIELDS if k in c} for c in cookies]
+        with self._lock:
+            self._entries[username] = {"cookies": cookies, "saved": time.time(), "login_seconds": login_seconds}
+            self._save()
+
+    def drop(self, username):
+        with self._lock:
+            if self._entries.pop(username, None) is not None:
+                self._save()
+
+    def _save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as fh:
+            fh.write(self.fernet.encrypt(json.dumps(self._entries).encode()))
+        os.replace(tmp, self.path)
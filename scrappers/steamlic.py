@@ -1,23 +1,72 @@
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
 from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from concurrent.futures import ThreadPoolExecutor
+from http_fetch import LicensePageClient, parse_licenses_table
+from result_store import ResultStore, split_license
+from telemetry import RunTelemetry, format_report, write_report
+from contextlib import contextmanager
+import argparse
 import os
+import queue
+import shutil
+import sys
+import tempfile
+import threading
 import time
 import json
 
 # ------------------------------
 # CONFIG
 # ------------------------------
+BASE_URL = "https://store.steampowered.com"
+WORKERS = 4              # browser sessions working through accounts in parallel
+ACCOUNT_TIMEOUT = 120    # seconds one attempt at an account may take
+RETRIES = 2              # extra attempts for an account that failed (fresh browser each time)
+HEADLESS = True
+RESULTS_DB = "steam_licenses.db"  # licenses of every account (result_store.py); txt files only with --txt
+SESSION_CACHE = os.path.join(os.path.dirname(__file__), "session_cache.bin")  # encrypted cookies per account
+STEP_TIMEOUT = 20        # seconds to wait for any one page condition
+PAGE_LOAD_STRATEGY = "eager"  # "normal" waits for every image, "eager" for the DOM only
+BLOCK = ("images", "css", "fonts")  # resource types the browser never downloads
+FETCH = "browser"        # "http": the browser only logs in, licenses pages come over plain HTTP
+HTTP_WORKERS = 16        # licenses pages fetched at once (keep-alive connections) with FETCH = "http"
+
+# URL patterns per blockable resource type
+BLOCK_PATTERNS = {
+    "images": ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico"],
+    "css": ["*.css"],
+    "fonts": ["*.woff", "*.woff2", "*.ttf", "*.otf"],
+}
+
+LOGIN_INPUTS_XPATH = "//input[@type='text' and @value='' and not(@tabindex='-1')]"
+LOGIN_ERROR_SELECTOR = "#login_error, [class*='FormError']"
+SESSION_COOKIE = "steamLoginSecure"
+
+# Whole licenses table in one WebDriver round trip: per row, the acquisition
+# cell's text (null if the row has none) and the text of every cell
+TABLE_ROWS_JS = """
+return Array.from(arguments[0].querySelectorAll('tbody tr'), function (tr) {
+  var acq = tr.querySelector('td.license_acquisition_col');
+  return [acq ? acq.innerText : null, Array.from(tr.querySelectorAll('td'), function (td) { return td.innerText; })];
+});
+"""
+
 # Load accounts from accounts.json (expects a JSON object mapping username -> password)
 _accounts_file = os.path.join(os.path.dirname(__file__), "accounts.json")
-try:
-    with open(_accounts_file, "r", encoding="utf-8") as f:
-        accounts = json.load(f)
-    if not isinstance(accounts, dict):
-        raise ValueError("accounts.json must contain a JSON object mapping usernames to passwords")
-except Exception as e:
-    print(f"Error loading accounts from {_accounts_file}: {e}")
-    accounts = {}
+
+
+def load_accounts(path=_accounts_file):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            accounts = json.load(f)
+        if not isinstance(accounts, dict):
+            raise ValueError("accounts.json must contain a JSON object mapping usernames to passwords")
+    except Exception as e:
+        print(f"Error loading accounts from {path}: {e}")
+        accounts = {}
+    return accounts
 
 import base64
 def b64(x): return base64.b64decode(x).decode()
@@ -25,68 +74,165 @@ def b64(x): return base64.b64decode(x).decode()
 # ------------------------------
 # SELENIUM SETUP
 # ------------------------------
-opts = Options()
-opts.add_argument("--no-sandbox")
-opts.add_argument("--disable-blink-features=AutomationControlled")
+def make_driver(profile_dir, headless=HEADLESS, page_load_strategy=PAGE_LOAD_STRATEGY, block=BLOCK):
+    opts = Options()
+    opts.add_argument("--no-sandbox")
+    opts.add_argument("--disable-blink-features=AutomationControlled")
+    # Own profile per session: separate cookie jar, cache and local storage
+    opts.add_argument(f"--user-data-dir={profile_dir}")
+    if headless:
+        opts.add_argument("--headless=new")
+    opts.page_load_strategy = page_load_strategy
+    driver = webdriver.Chrome(options=opts)
+    driver.set_page_load_timeout(ACCOUNT_TIMEOUT)
+    patterns = [p for kind in block for p in BLOCK_PATTERNS[kind]]
+    if patterns:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+    return driver
+
+
+class BrowserSession:
+    """One Chrome with a throwaway profile directory, removed again on close."""
+
+    def __init__(self, headless=HEADLESS, **browser):
+        self.profile = tempfile.mkdtemp(prefix="steamlic_")
+        try:
+            self.driver = make_driver(self.profile, headless, **browser)
+        except Exception:
+            shutil.rmtree(self.profile, ignore_errors=True)
+            raise
+
+    def close(self):
+        try:
+            self.driver.quit()
+        except Exception:
+            pass  # browser already gone
+        shutil.rmtree(self.profile, ignore_errors=True)
+
 
-driver = webdriver.Chrome(options=opts)
 # ------------------------------
-# MAIN LOOP
+# ONE ACCOUNT
 # ------------------------------
-all_results = {}
-
-for username, pwd in accounts.items():
-
-    print(f"Logging in: {username}")
-    driver.get("https://store.steampowered.com/login")
-    
-    time.sleep(3)
-
-    # Get all matching inputs
-    inputs = driver.find_elements(
-        By.XPATH, "//input[@type='text' and @value='' and not(@tabindex='-1')]"
-    )
-    # Pick the second one (index 1)
-    inputs[1].send_keys(username)
-
-    # Password
-    inputs = driver.find_element(By.XPATH, "//input[@type='password']").send_keys(b64(pwd))
-    time.sleep(2)
-    # Click login
-    inputs = driver.find_elements(By.XPATH, "//button[@type='submit']")
-    # pick the second one (index 1)
-    inputs[1].click()
-    time.sleep(3)  # wait for login to process
-    # Go to licenses page and collect Steam Store entries
-    driver.get("https://store.steampowered.com/account/licenses/")
-    time.sleep(3)
+class AccountTimeout(Exception):
+    pass
 
+
+@contextmanager
+def timed(phases, name):
+    """Add the time spent in the ``with`` block to ``phases[name]`` (seconds);
+    a telemetry.PhaseLog also keeps it as a span."""
+    t0 = time.perf_counter()
     try:
-        tables = driver.find_elements(By.CSS_SELECTOR, "table.account_table")
-        if not tables:
-            print(f"Password for {username} appears to be incorrect or no licenses found.")
-            continue
-        table = tables[0]
-        rows = table.find_elements(By.CSS_SELECTOR, "tbody tr")
-    except Exception as e:
-        print("Could not locate licenses table:", e)
-        rows = []
+        yield
+    finally:
+        seconds = time.perf_counter() - t0
+        phases[name] = phases.get(name, 0.0) + seconds
+        spans = getattr(phases, "spans", None)
+        if spans is not None:
+            spans.append((name, t0, seconds))
+
+
+def wait(driver, deadline, what, condition):
+    """Poll ``condition(driver)`` until it returns something truthy, at most STEP_TIMEOUT
+    and never past the account's ``deadline``; returns that value."""
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise AccountTimeout(f"timed out before {what}")
+    return WebDriverWait(driver, min(STEP_TIMEOUT, remaining), poll_frequency=0.1).until(
+        condition, message=f"waiting for {what}")
+
+
+def _login_inputs(driver):
+    # Steam's page has a search box ahead of the login form: need both text inputs
+    inputs = driver.find_elements(By.XPATH, LOGIN_INPUTS_XPATH)
+    if len(inputs) >= 2 and driver.find_elements(By.XPATH, "//input[@type='password']"):
+        return inputs
+    return False
+
+
+def _login_outcome(driver):
+    if "/login" not in driver.current_url:
+        return "ok"  # redirected away from the login page
+    if driver.find_elements(By.CSS_SELECTOR, LOGIN_ERROR_SELECTOR):
+        return "rejected"
+    return False
+
+
+def _licenses_table(driver):
+    tables = driver.find_elements(By.CSS_SELECTOR, "table.account_table")
+    if tables:
+        return tables[0]
+    if "/login" in driver.current_url:
+        return "no session"  # bounced back to the login page
+    return False
 
+
+def login(driver, username, pwd, base_url=BASE_URL, deadline=float("inf"), phases=None):
+    """Submit the login form; True once redirected, False if the credentials were rejected."""
+    phases = {} if phases is None else phases
+    with timed(phases, "login_page"):
+        driver.get(f"{base_url}/login")
+        inputs = wait(driver, deadline, "login form", _login_inputs)
+    with timed(phases, "login"):
+        # Pick the second one (index 1)
+        inputs[1].send_keys(username)
+        # Password
+        driver.find_element(By.XPATH, "//input[@type='password']").send_keys(b64(pwd))
+        # Click login; pick the second one (index 1)
+        driver.find_elements(By.XPATH, "//button[@type='submit']")[1].click()
+        return wait(driver, deadline, "login redirect", _login_outcome) == "ok"
+
+
+def fetch_licenses(driver, base_url=BASE_URL, deadline=float("inf"), phases=None):
+    """Load the licenses page and return the Steam Store license rows, or None if there is no table."""
+    phases = {} if phases is None else phases
+    with timed(phases, "licenses"):
+        # Go to licenses page and collect Steam Store entries
+        driver.get(f"{base_url}/account/licenses/")
+        table = wait(driver, deadline, "licenses table", _licenses_table)
+    if table == "no session":
+        return None
+
+    with timed(phases, "extract"):
+        rows = driver.execute_script(TABLE_ROWS_JS, table)
+        return select_licenses(rows)
+
+
+def select_licenses(rows):
+    """Steam Store licenses from (acquisition text or None, [cell texts]) table rows."""
     matches = []
-    for idx, row in enumerate(rows):
+    for idx, (acquisition, cells) in enumerate(rows):
         # ignore the first tr
         if idx == 0:
             continue
-        try:
-            acq_td = row.find_element(By.CSS_SELECTOR, "td.license_acquisition_col")
-            if "steam" in acq_td.text.lower():
-                # save each td as a separate line for this tr
-                cells = [td.text.strip() for td in row.find_elements(By.TAG_NAME, "td")]
-                matches.append("\n".join(cells))
-        except Exception:
-            # skip rows that don't match the expected structure
+        # skip rows that don't match the expected structure
+        if acquisition is None:
             continue
+        if "steam" in acquisition.lower():
+            # save each td as a separate line for this tr
+            matches.append("\n".join(cell.strip() for cell in cells))
+    return matches
+
 
+def restore_session(driver, cookies, base_url=BASE_URL, phases=None):
+    """Put saved cookies into the browser; it has to be on the site's domain to accept them."""
+    phases = {} if phases is None else phases
+    with timed(phases, "restore"):
+        driver.get(f"{base_url}/robots.txt")
+        for cookie in cookies:
+            driver.add_cookie(cookie)
+
+
+def logout(driver, deadline=float("inf"), phases=None):
+    """Logout / reset session for next account; returns once the session cookie is gone."""
+    phases = {} if phases is None else phases
+    with timed(phases, "logout"):
+        driver.execute_script("Logout();")
+        wait(driver, deadline, "logout", lambda d: d.get_cookie(SESSION_COOKIE) is None)
+
+
+def write_results(username, matches):
     # write results to a per-account txt file
     out_file = f"{username}_licenses.txt"
     with open(out_file, "w", encoding="utf-8") as fh:
@@ -94,12 +240,296 @@ for username, pwd in accounts.items():
             fh.write("\n\n".join(matches))
         else:
             fh.write("No Steam Store licenses found.")
+    return out_file
+
+
+# ------------------------------
+# WORKER POOL
+# ------------------------------
+class AccountPool:
+    """Works through accounts with at most ``workers`` browser sessions open at once.
+
+    Browsers are lent to one account attempt at a time and kept for the next.
+    An attempt that raises or runs past ``timeout`` is retried up to
+    ``retries`` times on a fresh browser (the old one may be stuck
+    mid-login); an account that still fails is reported and the run carries
+    on.
+
+    With a ``cache``, an account's saved cookies are tried first and the
+    form login only runs when the site rejects them. Cached sessions are
+    not logged out afterwards (that would end them on the server); the
+    browser's cookies are just cleared for the next account.
+
+    With an ``http`` client (http_fetch.LicensePageClient) the browser only
+    logs in: the licenses page is fetched and parsed over plain HTTP with
+    the browser's cookies, on up to the client's ``pool_size`` threads. A
+    cached session needs no browser at all, and after a form login the
+    browser goes back to the pool before the page is fetched.
+
+    Licenses go to the ``store`` (result_store.ResultStore) if there is one,
+    and to a ``{username}_licenses.txt`` per account with ``txt``.
+
+    Every attempt's phase spans, and the retry, failure and browser
+    counters, are collected in ``telemetry`` (telemetry.RunTelemetry).
+    """
+
+    def __init__(self, workers=WORKERS, timeout=ACCOUNT_TIMEOUT, retries=RETRIES,
+                 base_url=BASE_URL, headless=HEADLESS, cache=None, http=None, store=None, txt=True,
+                 telemetry=None, **browser):
+        self.workers = workers
+        self.telemetry = telemetry if telemetry is not None else RunTelemetry()
+        self.store = store  # ResultStore, or None
+        self.txt = txt
+        self.cache = cache  # SessionCache, or None to log in (and out) every time
+        self.http = http    # LicensePageClient, or None to load the licenses page in the browser
+        self.timeout = timeout
+        self.retries = retries
+        self.base_url = base_url
+        self.headless = headless
+        self.browser = browser  # make_driver options: page_load_strategy, block
+        self._slots = threading.BoundedSemaphore(workers)
+        self._idle = queue.LifoQueue()
+        self._sessions = []
+        self._lock = threading.Lock()
+
+    def _acquire(self, phases):
+        """An idle browser, or a new one while fewer than ``workers`` are open.
+
+        Waiting for a free browser is timed as "queue", starting one as "browser_start".
+        """
+        with timed(phases, "queue"):
+            self._slots.acquire()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            with timed(phases, "browser_start"):
+                session = BrowserSession(self.headless, **self.browser)
+        except Exception:
+            self._slots.release()
+            raise
+        session.driver.set_page_load_timeout(self.timeout)
+        with self._lock:
+            self._sessions.append(session)
+        self.telemetry.count("browsers_started")
+        return session
+
+    def _release(self, session, broken=False):
+        if broken:
+            with self._lock:
+                self._sessions.remove(session)
+            session.close()
+            self.telemetry.count("browsers_discarded")
+        else:
+            self._idle.put(session)
+        self._slots.release()
+
+    def _fetch_http(self, cookies, deadline, phases):
+        """fetch_licenses over HTTP: the Steam Store license rows, or None if the session is not accepted."""
+        if time.monotonic() >= deadline:
+            raise AccountTimeout("timed out before licenses page")
+        with timed(phases, "licenses"):
+            page = self.http.fetch_page(cookies)
+        if page is None:
+            return None
+        with timed(phases, "extract"):
+            rows = parse_licenses_table(page)
+            return None if rows is None else select_licenses(rows)
+
+    def process(self, username, pwd):
+        """One account, with retries; returns a result dict, never raises."""
+        result = {"username": username, "status": "failed", "attempts": 0, "licenses": 0, "error": None,
+                  "phases": {}, "session": None, "login_saved": 0.0, "change": None}
+        for attempt in range(1 + self.retries):
+            result["attempts"] = attempt + 1
+            phases = result["phases"] = self.telemetry.attempt(username, attempt + 1)
+            session = None
+            try:
+                deadline = time.monotonic() + self.timeout
+                matches = None
+                entry = self.cache.get(username) if self.cache is not None else None
+                if entry is not None:
+                    if self.http is not None:
+                        matches = self._fetch_http(entry["cookies"], deadline, phases)
+                    else:
+                        session = self._acquire(phases)
+                        restore_session(session.driver, entry["cookies"], self.base_url, phases)
+                        matches = fetch_licenses(session.driver, self.base_url, deadline, phases)
+                    if matches is None:
+                        result["session"] = "rejected"  # expired or logged out elsewhere
+                        self.cache.drop(username)
+                        if session is not None:
+                            session.driver.delete_all_cookies()
+                    else:
+                        result["session"] = "hit"
+                        result["login_saved"] = (entry.get("login_seconds") or 0.0) - phases.get("restore", 0.0)
+                elif self.cache is not None:
+                    result["session"] = "miss"
+
+                if matches is None:
+                    if session is None:
+                        session = self._acquire(phases)
+                    driver = session.driver
+                    print(f"Logging in: {username}" + (f" (attempt {attempt + 1})" if attempt else ""))
+                    if not login(driver, username, pwd, self.base_url, deadline, phases):
+                        print(f"Password for {username} appears to be incorrect.")
+                        result.update(status="bad_login", error=None)
+                        return result
+                    if self.http is None:
+                        matches = fetch_licenses(driver, self.base_url, deadline, phases)
+                        cookies = driver.get_cookies()
+                    else:
+                        cookies = driver.get_cookies()
+                        if self.cache is not None:
+                            # The session lives on in ``cookies``: the browser is free for the next login
+                            driver.delete_all_cookies()
+                            self._release(session)
+                            session = None
+                        matches = self._fetch_http(cookies, deadline, phases)
+                    if matches is None:
+                        print(f"No licenses page for {username} (session not accepted).")
+                        result.update(status="no_table", error=None)
+                        return result
+                    if self.cache is not None:
+                        self.cache.put(username, cookies, phases["login_page"] + phases["login"])
+                written = []
+                with timed(phases, "write"):
+                    if self.store is not None:
+                        result["change"] = change = self.store.update(username, matches)
+                        if change is None:
+                            written.append("store (unchanged)")
+                        else:
+                            written.append(f"store (+{len(change.added)} -{len(change.removed)})")
+                    if self.txt:
+                        written.append(write_results(username, matches))
+                if session is not None:
+                    if self.cache is not None:
+                        session.driver.delete_all_cookies()  # keep the session alive on the server for next time
+                    else:
+                        logout(session.driver, deadline, phases)
+                print(f"{username}: {len(matches)} Steam Store license(s) to {', '.join(written)} "
+                      f"({', '.join(f'{k} {v:.2f}s' for k, v in phases.items())})")
+                result.update(status="ok", licenses=len(matches), error=None)
+                return result
+            except Exception as e:
+                result["error"] = f"{type(e).__name__}: {e}"
+                print(f"Attempt {attempt + 1} for {username} failed: {result['error']}")
+                if session is not None:
+                    self._release(session, broken=True)
+                    session = None
+            finally:
+                if session is not None:
+                    self._release(session)
+                self.telemetry.finish(phases, result["status"], result["error"])
+        return result
+
+    def run(self, accounts):
+        """Process all ``accounts`` (username -> base64 password); returns one result per account."""
+        try:
+            threads = self.workers if self.http is None else max(self.workers, self.http.pool_size)
+            with ThreadPoolExecutor(max_workers=threads, thread_name_prefix="Account") as executor:
+                return list(executor.map(lambda item: self.process(*item), accounts.items()))
+        finally:
+            with self._lock:
+                sessions, self._sessions = self._sessions, []
+            for session in sessions:
+                session.close()
+
+
+# ------------------------------
+# MAIN
+# ------------------------------
+def session_report(results):
+    """Cache hits/misses, and the time hits saved (each account's last form login, minus restoring)."""
+    counts = {k: sum(r["session"] == k for r in results) for k in ("hit", "miss", "rejected")}
+    saved = sum(r["login_saved"] for r in results)
+    return (f"Session cache: {counts['hit']} hit(s), {counts['miss']} miss(es), {counts['rejected']} rejected, "
+            f"about {saved:.1f}s of logins saved")
+
+
+def diff_report(results):
+    """Licenses added and removed since the last run: one line per changed account, items only."""
+    changes = [(r["username"], r["change"]) for r in results if r["change"] is not None]
+    unchanged = sum(r["status"] == "ok" and r["change"] is None for r in results)
+    new = sum(change.new for _, change in changes)
+    lines = [f"Changes: {new} new account(s), {len(changes) - new} changed, {unchanged} unchanged"]
+    for username, change in changes:
+        if change.new:
+            lines.append(f"  {username}: new, {len(change.added)} license(s)")
+        else:
+            items = ([f"+{split_license(lic)[1]}" for lic in change.added]
+                     + [f"-{split_license(lic)[1]}" for lic in change.removed])
+            lines.append(f"  {username}: {', '.join(items)}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Collect Steam Store licenses for a list of accounts.")
+    parser.add_argument("--accounts", default=_accounts_file, help="accounts JSON (username -> base64 password)")
+    parser.add_argument("--workers", type=int, default=WORKERS, help="parallel browser sessions")
+    parser.add_argument("--timeout", type=float, default=ACCOUNT_TIMEOUT, help="seconds per account attempt")
+    parser.add_argument("--retries", type=int, default=RETRIES, help="extra attempts per failed account")
+    parser.add_argument("--base-url", default=BASE_URL, help="store URL (a fixture_server.py for offline runs)")
+    parser.add_argument("--show", action="store_true", help="show the browser windows")
+    parser.add_argument("--store", default=RESULTS_DB, help="SQLite file the licenses are kept in")
+    parser.add_argument("--txt", action="store_true", help="also write {username}_licenses.txt per account")
+    parser.add_argument("--diff", metavar="PATH", help="write the added/removed licenses per account as JSON")
+    parser.add_argument("--telemetry", metavar="PATH",
+                        help="write the run's spans, counters and per-phase percentiles as JSON")
+    parser.add_argument("--session-cache", default=SESSION_CACHE,
+                        help="encrypted cookie cache; key from $STEAMLIC_CACHE_KEY or a .key file beside it")
+    parser.add_argument("--no-session-cache", action="store_true", help="log in and out every time")
+    parser.add_argument("--fetch", choices=("browser", "http"), default=FETCH,
+                        help="load the licenses page in the browser, or over HTTP with its cookies")
+    parser.add_argument("--http-workers", type=int, default=HTTP_WORKERS,
+                        help="licenses pages fetched at once with --fetch http")
+    parser.add_argument("--page-load", choices=("normal", "eager", "none"), default=PAGE_LOAD_STRATEGY,
+                        help="page load strategy")
+    parser.add_argument("--block", default=",".join(BLOCK),
+                        help=f"resources not to download, comma-separated from {', '.join(BLOCK_PATTERNS)} "
+                             "('' to load everything)")
+    args = parser.parse_args(argv)
+    block = tuple(b for b in args.block.split(",") if b)
+    unknown = [b for b in block if b not in BLOCK_PATTERNS]
+    if unknown:
+        parser.error(f"unknown resource type(s): {', '.join(unknown)}")
+
+    accounts = load_accounts(args.accounts)
+    cache = None
+    if not args.no_session_cache:
+        from session_cache import SessionCache
+        cache = SessionCache(args.session_cache)
+    base_url = args.base_url.rstrip("/")
+    http = LicensePageClient(base_url, args.http_workers, args.timeout) if args.fetch == "http" else None
+    store = ResultStore(args.store)
+    pool = AccountPool(args.workers, args.timeout, args.retries, base_url, not args.show, cache=cache,
+                       http=http, store=store, txt=args.txt, page_load_strategy=args.page_load, block=block)
+    try:
+        results = pool.run(accounts)
+    finally:
+        store.close()
+        if http is not None:
+            http.close()
 
-    print(f"Wrote {len(matches)} Steam Store license(s) to {out_file}")
+    failed = [r for r in results if r["status"] == "failed"]
+    for r in failed:
+        print(f"FAILED {r['username']} after {r['attempts']} attempt(s): {r['error']}")
+    report = pool.telemetry.report(results)
+    print(format_report(report))
+    if args.telemetry:
+        write_report(report, args.telemetry)
+    if cache is not None:
+        print(session_report(results))
+    print(diff_report(results))
+    if args.diff:
+        diff = {r["username"]: {"new": r["change"].new, "added": r["change"].added, "removed": r["change"].removed}
+                for r in results if r["change"] is not None}
+        with open(args.diff, "w", encoding="utf-8") as fh:
+            json.dump(diff, fh, indent=2)
+    print(f"ALL DONE! {len(results) - len(failed)} of {len(results)} account(s) processed.")
+    return 1 if failed else 0
 
-    # Logout / reset session for next account: clear cookies and go back to login
-    driver.execute_script("Logout();")
-    time.sleep(4)  # wait for reload after clearing cookies
 
-driver.quit()
-print("ALL DONE!")
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+import json
+import threading
+import time
+from collections import Counter
+
+# Phases in the order an attempt goes through them (steamlic.py's timed() names)
+PHASES = ("queue", "browser_start", "restore", "login_page", "login", "licenses", "extract", "write", "logout")
+
+
+def summarize(samples):
+    """{count, mean, p50, p95, max, total} in seconds for a list of seconds, or None."""
+    values = sorted(samples)
+    if not values:
+        return None
+    n = len(values)
+    return {
+        "count": n,
+        "mean": sum(values) / n,
+        "p50": values[int(0.50 * (n - 1))],
+        "p95": values[int(0.95 * (n - 1))],
+        "max": values[-1],
+        "total": sum(values),
+    }
+
+
+class PhaseLog(dict):
+    """Phase totals of one account attempt (what timed() adds to), plus every
+    timed span as (phase, perf_counter start, seconds)."""
+
+    def __init__(self, username, attempt):
+        super().__init__()
+        self.username = username
+        self.attempt = attempt
+        self.started = time.perf_counter()
+        self.spans = []
+
+
+class RunTelemetry:
+    """Spans and counters for one run, from all worker threads.
+
+    Every attempt is kept, failed ones included, so a slow or flaky run can
+    be taken apart afterwards: ``report()`` has the spans per attempt (start
+    times relative to the run start), the counters, and p50/p95 per phase
+    over the attempts that went through it.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self._t0 = time.perf_counter()
+        self.counters = Counter()
+        self.attempts = []
+        self._lock = threading.Lock()
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def attempt(self, username, attempt):
+        """PhaseLog for an attempt starting now; hand it back to finish()."""
+        return PhaseLog(username, attempt)
+
+    def finish(self, log, status, error=None):
+        end = time.perf_counter()
+        record = {
+            "username": log.username,
+            "attempt": log.attempt,
+            "status": status,
+            "error": error,
+            "start": log.started - self._t0,
+            "seconds": end - log.started,
+            "phases": dict(log),
+            "spans": [{"phase": name, "start": t0 - self._t0, "seconds": seconds} for name, t0, seconds in log.spans],
+        }
+        with self._lock:
+            self.attempts.append(record)
+            self.counters["attempts"] += 1
+            if log.attempt > 1:
+                self.counters["retries"] += 1
+            if status == "failed":
+                self.counters["failed_attempts"] += 1
+
+    def report(self, results):
+        """Everything as one JSON-serialisable dict; ``results`` are the pool's per-account results."""
+        wall = time.perf_counter() - self._t0
+        with self._lock:
+            attempts = sorted(self.attempts, key=lambda a: a["start"])
+            counters = dict(self.counters)
+        for r in results:
+            counters[r["status"]] = counters.get(r["status"], 0) + 1
+        phases = {}
+        for name in PHASES + tuple(sorted({p for a in attempts for p in a["phases"]} - set(PHASES))):
+            s = summarize([a["phases"][name] for a in attempts if name in a["phases"]])
+            if s is not None:
+                phases[name] = s
+        return {
+            "started": self.started,
+            "wall_seconds": wall,
+            "accounts": len(results),
+            "accounts_per_min": len(results) / wall * 60 if wall > 0 else 0.0,
+            "counters": counters,
+            "phases": phases,
+            "attempt_seconds": summarize([a["seconds"] for a in attempts]),
+            "attempts": attempts,
+        }
+
+
+def format_report(report):
+    """End-of-run summary: throughput, counters, and a p50/p95 line per phase."""
+    c = report["counters"]
+    lines = [f"{report['accounts']} account(s) in {report['wall_seconds']:.1f}s "
+             f"({report['accounts_per_min']:.1f}/min); {c.get('attempts', 0)} attempt(s), "
+             f"{c.get('retries', 0)} retried, {c.get('failed_attempts', 0)} failed attempt(s), "
+             f"{c.get('browsers_started', 0)} browser(s) started, {c.get('browsers_discarded', 0)} discarded"]
+    width = max([len(name) for name in report["phases"]] + [len("attempt")])
+    rows = list(report["phases"].items())
+    if report["attempt_seconds"] is not None:
+        rows.append(("attempt", report["attempt_seconds"]))
+    for name, s in rows:
+        lines.append(f"  {name.ljust(width)}  n={s['count']:<4d} p50 {s['p50']:6.2f}s  p95 {s['p95']:6.2f}s  "
+                     f"max {s['max']:6.2f}s  total {s['total']:7.1f}s")
+    return "\n".join(lines)
+
+
+def write_report(report, path):
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2)
@@ -0,0 +1,101 @@
+"""result_store.py against a temporary SQLite file.
+
+Run from this folder: python -m pytest -q
+"""
+import sqlite3
+
+import pytest
+
+from result_store import Change, ResultStore, split_license
+
+GAME = "1 Jan, 2024\nSome Game\nSteam Store"
+DLC = "2 Jan, 2024\nSome Game - Soundtrack\nSteam Store"
+BUNDLE = "3 Jan, 2024\nBig Bundle\nSteam Store"
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ResultStore(str(tmp_path / "licenses.db"))
+    yield store
+    store.close()
+
+
+def stored(path, username):
+    db = sqlite3.connect(path)
+    try:
+        rows = db.execute("SELECT license, copies FROM licenses WHERE username = ?", (username,)).fetchall()
+        total = db.execute("SELECT licenses FROM accounts WHERE username = ?", (username,)).fetchone()
+    finally:
+        db.close()
+    return dict(rows), total[0] if total else None
+
+
+def test_first_run_adds_everything(store):
+    change = store.update("alice", [GAME, DLC])
+    assert change == Change(True, [GAME, DLC], [])
+    assert stored(store.path, "alice") == ({GAME: 1, DLC: 1}, 2)
+
+
+def test_unchanged_licenses_are_not_written(store):
+    store.update("alice", [GAME, DLC])
+    assert store.update("alice", [DLC, GAME]) is None
+
+
+def test_added_and_removed_licenses(store):
+    store.update("alice", [GAME, DLC])
+    change = store.update("alice", [GAME, BUNDLE])
+    assert change == Change(False, [BUNDLE], [DLC])
+    assert stored(store.path, "alice") == ({GAME: 1, BUNDLE: 1}, 2)
+
+
+def test_identical_rows_are_kept_as_copies(store):
+    assert store.update("alice", [GAME, GAME, DLC]) == Change(True, [GAME, GAME, DLC], [])
+    assert stored(store.path, "alice") == ({GAME: 2, DLC: 1}, 3)
+
+    # A second grant of the same license is a change, and so is losing it again
+    assert store.update("alice", [GAME, GAME, GAME, DLC]) == Change(False, [GAME], [])
+    assert store.update("alice", [GAME, DLC]) == Change(False, [], [GAME, GAME])
+    assert stored(store.path, "alice") == ({GAME: 1, DLC: 1}, 2)
+
+
+def test_accounts_are_separate_and_persist(tmp_path):
+    path = str(tmp_path / "licenses.db")
+    store = ResultStore(path)
+    store.update("alice", [GAME])
+    store.update("bob", [DLC])
+    store.close()
+
+    store = ResultStore(path)
+    try:
+        assert store.update("alice", [GAME]) is None
+        assert store.update("bob", []) == Change(False, [], [DLC])
+        assert store.update("carol", []) == Change(True, [], [])
+    finally:
+        store.close()
+
+
+def test_database_without_copies_column_is_upgraded(tmp_path):
+    path = str(tmp_path / "licenses.db")
+    with sqlite3.connect(path) as db:
+        db.executescript("""
+            CREATE TABLE accounts (username TEXT PRIMARY KEY, hash TEXT NOT NULL,
+                                   licenses INTEGER NOT NULL, updated REAL NOT NULL);
+            CREATE TABLE licenses (username TEXT NOT NULL, license TEXT NOT NULL, date TEXT, item TEXT,
+                                   acquisition TEXT, first_seen REAL NOT NULL, PRIMARY KEY (username, license));
+        """)
+        db.execute("INSERT INTO licenses VALUES (?, ?, ?, ?, ?, ?)", ("alice", GAME, *split_license(GAME), 0.0))
+        db.execute("INSERT INTO accounts VALUES (?, ?, ?, ?)", ("alice", "old", 1, 0.0))
+    db.close()
+
+    store = ResultStore(path)
+    try:
+        assert store.update("alice", [GAME, GAME]) == Change(False, [GAME], [])
+    finally:
+        store.close()
+    assert stored(path, "alice") == ({GAME: 2}, 2)
+
+
+def test_split_license():
+    assert split_license(GAME) == ("1 Jan, 2024", "Some Game", "Steam Store")
+    assert split_license("A\nB\nC\nD") == ("A", "B\nC", "D")
+    assert split_license("odd row") == (None, "odd row", None)
@@ -0,0 +1,84 @@
+"""session_cache.py: encrypted round trip, unreadable caches, the key file.
+
+Run from this folder: python -m pytest -q
+"""
+import os
+import stat
+import sys
+
+import pytest
+from cryptography.fernet import Fernet
+
+import session_cache
+from session_cache import SessionCache, load_key
+
+COOKIES = [
+    {"name": "steamLoginSecure", "value": "abc", "domain": "store.steampowered.com", "path": "/",
+     "secure": True, "httpOnly": True, "expiry": 1900000000, "sameSite": "None"},
+    {"name": "sessionid", "value": "xyz", "path": "/"},
+]
+
+
+@pytest.fixture(autouse=True)
+def no_env_key(monkeypatch):
+    monkeypatch.delenv(session_cache.KEY_ENV, raising=False)
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "cache.bin")
+    cache = SessionCache(path)
+    cache.put("alice", [dict(COOKIES[0], size=42)] + COOKIES[1:], login_seconds=3.5)
+    cache.put("bob", COOKIES[1:])
+
+    reopened = SessionCache(path)
+    entry = reopened.get("alice")
+    assert entry["cookies"] == COOKIES  # fields add_cookie doesn't take are dropped, expiry kept
+    assert entry["login_seconds"] == 3.5
+    assert reopened.get("bob")["login_seconds"] is None
+    assert reopened.get("carol") is None
+    assert COOKIES[0]["value"].encode() not in (tmp_path / "cache.bin").read_bytes()
+    assert not (tmp_path / "cache.bin.tmp").exists()
+
+
+def test_drop(tmp_path):
+    path = str(tmp_path / "cache.bin")
+    cache = SessionCache(path)
+    cache.put("alice", COOKIES)
+    cache.drop("alice")
+    cache.drop("nobody")
+    assert SessionCache(path).get("alice") is None
+
+
+def test_other_key_starts_empty(tmp_path, capsys):
+    path = str(tmp_path / "cache.bin")
+    SessionCache(path).put("alice", COOKIES)
+
+    cache = SessionCache(path, key_path=str(tmp_path / "other.key"))
+    assert cache.get("alice") is None
+    assert "could not be decrypted" in capsys.readouterr().out
+    cache.put("bob", COOKIES)  # and it is usable again, under the new key
+    assert SessionCache(path, key_path=str(tmp_path / "other.key")).get("bob") is not None
+
+
+def test_corrupt_file_starts_empty(tmp_path):
+    path = tmp_path / "cache.bin"
+    key = load_key(str(tmp_path / "cache.key"))
+    # Empty, not a Fernet token, and decrypting to something that isn't JSON
+    for content in (b"", b"not a fernet token", Fernet(key).encrypt(b"{not json")):
+        path.write_bytes(content)
+        assert SessionCache(str(path)).get("alice") is None
+
+
+def test_key_from_environment(tmp_path, monkeypatch):
+    key = Fernet.generate_key()
+    monkeypatch.setenv(session_cache.KEY_ENV, key.decode())
+    assert load_key(str(tmp_path / "cache.key")) == key
+    assert not (tmp_path / "cache.key").exists()
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="POSIX permissions")
+def test_generated_key_file_is_owner_only(tmp_path):
+    key_path = tmp_path / "cache.key"
+    key = load_key(str(key_path))
+    assert stat.S_IMODE(os.stat(key_path).st_mode) == 0o600
+    assert load_key(str(key_path)) == key  # read back, not regenerated
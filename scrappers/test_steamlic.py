@@ -0,0 +1,369 @@
+"""steamlic.py against fixture_server.py, with a stub in place of Chrome.
+
+The stub runs no JavaScript, so TABLE_ROWS_JS and Logout() only run in the
+real-Chrome tests at the end, which are skipped where Chrome can't start.
+
+Run from this folder: python -m pytest -q
+"""
+import base64
+import shutil
+import sys
+import time
+
+import pytest
+import requests
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+import fixture_server
+import session_cache
+import steamlic
+from http_fetch import LicensePageClient, LicensesTableParser, parse_licenses_table
+from session_cache import SessionCache
+
+
+class StubElement:
+    def __init__(self, driver, name=None):
+        self.driver = driver
+        self.name = name
+
+    def send_keys(self, value):
+        self.driver.form[self.name] = value
+
+    def click(self):
+        self.driver.submit()
+
+
+class StubDriver:
+    """The part of selenium's WebDriver steamlic.py uses, over plain HTTP.
+
+    Scripts are not run: TABLE_ROWS_JS is answered by http_fetch's parser
+    and Logout() by posting to /logout. Tests on this stub say nothing about
+    the JavaScript itself.
+    """
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.http = requests.Session()
+        self.current_url = ""
+        self.page = ""
+        self.form = {}
+
+    def _load(self, response):
+        self.current_url, self.page, self.form = response.url, response.text, {}
+
+    def set_page_load_timeout(self, seconds):
+        pass
+
+    def get(self, url):
+        self._load(self.http.get(url))
+
+    def submit(self):
+        self._load(self.http.post(f"{self.base_url}/login", data=self.form))
+
+    def find_elements(self, by, selector):
+        login_page = 'id="login_form"' in self.page
+        if selector == steamlic.LOGIN_INPUTS_XPATH:
+            return [StubElement(self, "term"), StubElement(self, "username")] if login_page else []
+        if selector == "//input[@type='password']":
+            return [StubElement(self, "password")] if login_page else []
+        if selector == "//button[@type='submit']":
+            return [StubElement(self), StubElement(self)] if login_page else []
+        if selector == steamlic.LOGIN_ERROR_SELECTOR:
+            return [StubElement(self)] if 'id="login_error"' in self.page else []
+        if selector == "table.account_table":
+            return [self.page] if 'class="account_table"' in self.page else []
+        raise AssertionError(f"unexpected selector {selector!r}")
+
+    def find_element(self, by, selector):
+        return self.find_elements(by, selector)[0]
+
+    def execute_script(self, script, *args):
+        if script == steamlic.TABLE_ROWS_JS:
+            return [list(row) for row in parse_licenses_table(args[0])]
+        if script == "Logout();":
+            self.http.post(f"{self.base_url}/logout")
+            return None
+        raise AssertionError(f"unexpected script {script!r}")
+
+    def get_cookie(self, name):
+        value = self.http.cookies.get(name)
+        return None if value is None else {"name": name, "value": value}
+
+    def get_cookies(self):
+        return [{"name": c.name, "value": c.value, "path": c.path} for c in self.http.cookies]
+
+    def add_cookie(self, cookie):
+        self.http.cookies.set(cookie["name"], cookie["value"])
+
+    def delete_all_cookies(self):
+        self.http.cookies.clear()
+
+    def quit(self):
+        self.http.close()
+
+
+@pytest.fixture
+def fixture_site():
+    accounts = fixture_server.make_accounts(4, 30)
+    server, base_url = fixture_server.start_background(accounts, port=0)
+    yield accounts, base_url
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def stub_browser(monkeypatch, fixture_site):
+    drivers = []
+
+    def make_driver(*args, **kwargs):
+        drivers.append(StubDriver(fixture_site[1]))
+        return drivers[-1]
+
+    monkeypatch.setattr(steamlic, "make_driver", make_driver)
+    return drivers
+
+
+def expected_matches(licenses):
+    return ["\n".join(row) for row in licenses if "steam" in row[2].lower()]
+
+
+def encoded(accounts):
+    return {user: base64.b64encode(a["password"].encode()).decode() for user, a in accounts.items()}
+
+
+@pytest.fixture
+def driver(fixture_site):
+    driver = StubDriver(fixture_site[1])
+    yield driver
+    driver.quit()
+
+
+@pytest.fixture
+def short_steps(monkeypatch):
+    monkeypatch.setattr(steamlic, "STEP_TIMEOUT", 0.3)
+
+
+def test_conditions_on_the_login_page(fixture_site, driver):
+    driver.get(f"{fixture_site[1]}/login")
+    assert len(steamlic._login_inputs(driver)) == 2
+    assert steamlic._login_outcome(driver) is False  # still on the form, no error yet
+    assert steamlic._licenses_table(driver) == "no session"
+
+
+def test_conditions_after_a_rejected_login(fixture_site, driver):
+    driver.get(f"{fixture_site[1]}/login")
+    assert steamlic.login(driver, "user001", base64.b64encode(b"wrong").decode(), fixture_site[1]) is False
+    assert steamlic._login_outcome(driver) == "rejected"
+
+
+def test_conditions_after_a_login(fixture_site, driver):
+    accounts, base_url = fixture_site
+    password = encoded(accounts)["user001"]
+    assert steamlic.login(driver, "user001", password, base_url) is True
+    assert steamlic._login_outcome(driver) == "ok"
+    assert steamlic._login_inputs(driver) is False
+
+    driver.get(f"{base_url}/account/licenses/")
+    assert 'class="account_table"' in steamlic._licenses_table(driver)
+
+    assert driver.get_cookie(steamlic.SESSION_COOKIE) is not None
+    steamlic.logout(driver)
+    assert driver.get_cookie(steamlic.SESSION_COOKIE) is None
+
+
+@pytest.mark.parametrize("page, condition", [
+    ("/not-a-page", steamlic._login_inputs),
+    ("/login", steamlic._login_outcome),  # form never submitted
+    ("/not-a-page", steamlic._licenses_table),
+])
+def test_wait_times_out_after_step_timeout(fixture_site, driver, short_steps, page, condition):
+    driver.get(fixture_site[1] + page)
+    t0 = time.monotonic()
+    with pytest.raises(TimeoutException):
+        steamlic.wait(driver, float("inf"), "never", condition)
+    assert 0.3 <= time.monotonic() - t0 < 2
+
+
+def test_wait_stops_at_the_account_deadline(fixture_site, driver):
+    driver.get(f"{fixture_site[1]}/not-a-page")
+    with pytest.raises(steamlic.AccountTimeout):
+        steamlic.wait(driver, time.monotonic() - 1, "login form", steamlic._login_inputs)
+
+    t0 = time.monotonic()
+    with pytest.raises(TimeoutException):
+        steamlic.wait(driver, t0 + 0.2, "login form", steamlic._login_inputs)
+    assert time.monotonic() - t0 < steamlic.STEP_TIMEOUT / 2
+
+
+def test_pool_collects_steam_licenses(fixture_site, stub_browser, tmp_path, monkeypatch):
+    accounts, base_url = fixture_site
+    monkeypatch.chdir(tmp_path)
+    pool = steamlic.AccountPool(workers=2, retries=0, base_url=base_url)
+    results = pool.run(encoded(accounts))
+
+    assert [r["status"] for r in results] == ["ok"] * len(accounts)
+    assert len(stub_browser) <= 2
+    for user, account in accounts.items():
+        matches = expected_matches(account["licenses"])
+        text = (tmp_path / f"{user}_licenses.txt").read_text(encoding="utf-8")
+        assert text == ("\n\n".join(matches) if matches else "No Steam Store licenses found.")
+
+
+def test_pool_reports_rejected_password(fixture_site, stub_browser, tmp_path, monkeypatch):
+    accounts, base_url = fixture_site
+    monkeypatch.chdir(tmp_path)
+    pool = steamlic.AccountPool(workers=1, retries=0, base_url=base_url, txt=False)
+    [result] = pool.run({"user001": base64.b64encode(b"wrong").decode()})
+    assert result["status"] == "bad_login"
+
+
+def test_pool_retries_on_a_fresh_browser(fixture_site, stub_browser, tmp_path, monkeypatch):
+    accounts, base_url = fixture_site
+    monkeypatch.chdir(tmp_path)
+    original = StubDriver.get
+    calls = []
+
+    def flaky_get(self, url):
+        calls.append(url)
+        if len(calls) == 1:
+            raise RuntimeError("browser crashed")
+        original(self, url)
+
+    monkeypatch.setattr(StubDriver, "get", flaky_get)
+    pool = steamlic.AccountPool(workers=1, retries=1, base_url=base_url, txt=False)
+    [result] = pool.run({"user002": encoded(accounts)["user002"]})
+
+    assert result["status"] == "ok" and result["attempts"] == 2
+    assert len(stub_browser) == 2
+    assert pool.telemetry.counters["browsers_discarded"] == 1
+
+
+def test_pool_reuses_cached_sessions(fixture_site, stub_browser, tmp_path, monkeypatch):
+    accounts, base_url = fixture_site
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv(session_cache.KEY_ENV, raising=False)
+    path = str(tmp_path / "sessions.bin")
+
+    pool = steamlic.AccountPool(workers=2, retries=0, base_url=base_url, cache=SessionCache(path), txt=False)
+    assert [r["session"] for r in pool.run(encoded(accounts))] == ["miss"] * len(accounts)
+
+    pool = steamlic.AccountPool(workers=2, retries=0, base_url=base_url, cache=SessionCache(path), txt=False)
+    results = pool.run(encoded(accounts))
+    assert [r["session"] for r in results] == ["hit"] * len(accounts)
+    assert [r["licenses"] for r in results] == [len(expected_matches(a["licenses"])) for a in accounts.values()]
+    assert "login" not in pool.telemetry.report(results)["phases"]
+
+
+def test_pool_logs_in_again_when_the_cached_session_expired(fixture_site, stub_browser, tmp_path, monkeypatch):
+    accounts, base_url = fixture_site
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv(session_cache.KEY_ENV, raising=False)
+    cache = SessionCache(str(tmp_path / "sessions.bin"))
+    cache.put("user001", [{"name": fixture_server.SESSION_COOKIE, "value": "expired", "path": "/"}])
+
+    pool = steamlic.AccountPool(workers=1, retries=0, base_url=base_url, cache=cache, txt=False)
+    [result] = pool.run({"user001": encoded(accounts)["user001"]})
+
+    assert result["status"] == "ok" and result["session"] == "rejected"
+    assert result["licenses"] == len(expected_matches(accounts["user001"]["licenses"]))
+    [cookie] = cache.get("user001")["cookies"]
+    assert cookie["name"] == fixture_server.SESSION_COOKIE and cookie["value"] != "expired"
+
+
+def login_cookies(base_url, username, password):
+    with requests.Session() as http:
+        http.post(f"{base_url}/login", data={"username": username, "password": password})
+        return [{"name": c.name, "value": c.value} for c in http.cookies]
+
+
+def test_http_client_parses_licenses_table(fixture_site):
+    accounts, base_url = fixture_site
+    client = LicensePageClient(base_url, pool_size=2)
+    try:
+        for user, account in accounts.items():
+            page = client.fetch_page(login_cookies(base_url, user, account["password"]))
+            parser = LicensesTableParser()
+            parser.feed(page)
+            parser.close()
+
+            assert parser.found
+            header, *rows = parser.rows
+            assert header == (None, [])  # <th> cells only
+            assert [(acq, tuple(cells)) for acq, cells in rows] == \
+                [(row[2], row) for row in account["licenses"]]
+            assert steamlic.select_licenses(parser.rows) == expected_matches(account["licenses"])
+    finally:
+        client.close()
+
+
+def test_http_client_returns_none_when_sent_to_login(fixture_site):
+    accounts, base_url = fixture_site
+    client = LicensePageClient(base_url)
+    try:
+        assert client.fetch_page([]) is None
+        assert client.fetch_page([{"name": fixture_server.SESSION_COOKIE, "value": "expired"}]) is None
+    finally:
+        client.close()
+    assert parse_licenses_table("<html><body>Sign In</body></html>") is None
+
+
+def test_pool_http_mode_matches_browser_mode(fixture_site, stub_browser, tmp_path, monkeypatch):
+    accounts, base_url = fixture_site
+    monkeypatch.chdir(tmp_path)
+    client = LicensePageClient(base_url, pool_size=4)
+    try:
+        pool = steamlic.AccountPool(workers=1, retries=0, base_url=base_url, http=client)
+        results = pool.run(encoded(accounts))
+    finally:
+        client.close()
+
+    assert [r["status"] for r in results] == ["ok"] * len(accounts)
+    for user, account in accounts.items():
+        matches = expected_matches(account["licenses"])
+        text = (tmp_path / f"{user}_licenses.txt").read_text(encoding="utf-8")
+        assert text == ("\n\n".join(matches) if matches else "No Steam Store licenses found.")
+
+
+# --- REAL CHROME ---
+# The JavaScript steamlic.py sends to the browser, run for real
+
+CHROME_BINARIES = ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser")
+
+
+@pytest.fixture(scope="module")
+def chrome():
+    if sys.platform.startswith("linux") and not any(shutil.which(name) for name in CHROME_BINARIES):
+        pytest.skip("Chrome is not installed")
+    try:
+        session = steamlic.BrowserSession(headless=True)
+    except WebDriverException as e:
+        pytest.skip(f"Chrome could not start: {e.msg}")
+    yield session
+    session.close()
+
+
+def test_table_rows_js_in_chrome(fixture_site, chrome):
+    accounts, base_url = fixture_site
+    driver = chrome.driver
+    for user, account in list(accounts.items())[:2]:
+        assert steamlic.login(driver, user, encoded(accounts)[user], base_url, time.monotonic() + 30)
+        driver.get(f"{base_url}/account/licenses/")
+        table = steamlic.wait(driver, time.monotonic() + 30, "licenses table", steamlic._licenses_table)
+        rows = driver.execute_script(steamlic.TABLE_ROWS_JS, table)
+
+        assert [tuple(row) for row in rows] == parse_licenses_table(driver.page_source)
+        assert steamlic.select_licenses(rows) == expected_matches(account["licenses"])
+        steamlic.logout(driver, time.monotonic() + 30)
+
+
+def test_pool_in_chrome(fixture_site, chrome, tmp_path, monkeypatch):
+    accounts, base_url = fixture_site
+    monkeypatch.chdir(tmp_path)
+    pool = steamlic.AccountPool(workers=2, retries=0, base_url=base_url, headless=True)
+    results = pool.run(encoded(accounts))
+
+    assert [r["status"] for r in results] == ["ok"] * len(accounts)
+    for user, account in accounts.items():
+        matches = expected_matches(account["licenses"])
+        text = (tmp_path / f"{user}_licenses.txt").read_text(encoding="utf-8")
+        assert text == ("\n\n".join(matches) if matches else "No Steam Store licenses found.")
@@ -0,0 +1,71 @@
+"""telemetry.py: per-phase summaries and the end-of-run report.
+
+Run from this folder: python -m pytest -q
+"""
+import json
+
+from telemetry import RunTelemetry, format_report, summarize, write_report
+
+
+def record(telemetry, username, attempt, status, error=None, **phases):
+    log = telemetry.attempt(username, attempt)
+    log.update(phases)
+    log.spans.extend((name, log.started, seconds) for name, seconds in phases.items())
+    telemetry.finish(log, status, error)
+
+
+def run_two_accounts():
+    telemetry = RunTelemetry()
+    record(telemetry, "alice", 1, "ok", login_page=1.0, login=2.0, licenses=0.5)
+    record(telemetry, "bob", 1, "failed", "TimeoutException: waiting for login form", login_page=3.0)
+    record(telemetry, "bob", 2, "ok", login_page=2.0, login=4.0, licenses=1.5)
+    telemetry.count("browsers_started", 2)
+    telemetry.count("browsers_discarded")
+    results = [{"username": "alice", "status": "ok"}, {"username": "bob", "status": "ok"}]
+    return telemetry.report(results)
+
+
+def test_summarize():
+    assert summarize([]) is None
+    s = summarize([float(n) for n in range(100, 0, -1)])
+    assert (s["count"], s["p50"], s["p95"], s["max"], s["total"]) == (100, 50.0, 95.0, 100.0, 5050.0)
+    assert s["mean"] == 50.5
+
+
+def test_report_counts_every_attempt():
+    report = run_two_accounts()
+    assert report["accounts"] == 2
+    assert report["counters"] == {"attempts": 3, "retries": 1, "failed_attempts": 1,
+                                  "browsers_started": 2, "browsers_discarded": 1, "ok": 2}
+    assert [(a["username"], a["attempt"], a["status"]) for a in report["attempts"]] == \
+        [("alice", 1, "ok"), ("bob", 1, "failed"), ("bob", 2, "ok")]
+    assert report["attempts"][1]["error"] == "TimeoutException: waiting for login form"
+    assert [s["phase"] for s in report["attempts"][2]["spans"]] == ["login_page", "login", "licenses"]
+
+    # Phases in pipeline order, each over the attempts that went through it (the failed one included)
+    assert list(report["phases"]) == ["login_page", "login", "licenses"]
+    login_page = report["phases"]["login_page"]
+    assert (login_page["count"], login_page["p50"], login_page["p95"], login_page["max"], login_page["total"]) == \
+        (3, 2.0, 2.0, 3.0, 6.0)
+    assert report["phases"]["login"]["count"] == 2
+    assert report["attempt_seconds"]["count"] == 3
+
+
+def test_format_report():
+    lines = format_report(run_two_accounts()).splitlines()
+    assert lines[0].startswith("2 account(s) in ")
+    assert lines[0].endswith("; 3 attempt(s), 1 retried, 1 failed attempt(s), 2 browser(s) started, 1 discarded")
+    assert lines[1:4] == [
+        "  login_page  n=3    p50   2.00s  p95   2.00s  max   3.00s  total     6.0s",
+        "  login       n=2    p50   2.00s  p95   2.00s  max   4.00s  total     6.0s",
+        "  licenses    n=2    p50   0.50s  p95   0.50s  max   1.50s  total     2.0s",
+    ]
+    assert lines[4].startswith("  attempt     n=3    p50 ")
+    assert len(lines) == 5
+
+
+def test_write_report(tmp_path):
+    report = run_two_accounts()
+    path = tmp_path / "telemetry.json"
+    write_report(report, str(path))
+    assert json.loads(path.read_text(encoding="utf-8")) == report